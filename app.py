@@ -1,8 +1,15 @@
 import streamlit as st
+import pandas as pd
 from pages.home import home_page
 from pages.upload_page import upload_page
 from pages.dashboard_page import dashboard_page
 from components.auth import initialize_session, logout
+from components.dataset_cache import display_cache_stats
+from components.figure_cache import display_figure_cache_stats
+from components.instrumentation import start_rerun_trace, finish_rerun_trace, display_performance_panel
+
+# Copy-on-write: visões e seleções de colunas não copiam dados até serem modificadas
+pd.set_option("mode.copy_on_write", True)
 
 # Configurações da página
 st.set_page_config(
@@ -16,6 +23,10 @@ def main():
     # Inicializar variáveis de sessão
     initialize_session()
     
+    # Medição das etapas desta execução (exibida no painel de desempenho)
+    start_rerun_trace()
+    perf_panel = None
+    
     # Sidebar para navegação
     with st.sidebar:
         st.title("📊 Analítica Visual")
@@ -38,6 +49,15 @@ def main():
                 ["Home", "Upload de Arquivos", "Dashboards"]
             )
             
+            # Painel de administração do cache de dados
+            if user_role == 'admin':
+                with st.expander("🗄️ Cache de Dados"):
+                    display_cache_stats()
+                with st.expander("🖼️ Cache de Gráficos"):
+                    display_figure_cache_stats()
+                # Preenchido após a renderização da página, com os tempos desta execução
+                perf_panel = st.expander("⏱️ Desempenho")
+            
             # Botão de logout
             if st.button("Logout"):
                 logout()
@@ -46,12 +66,19 @@ def main():
             page = "Home"
     
     # Renderizar a página selecionada
-    if page == "Home":
-        home_page()
-    elif page == "Upload de Arquivos":
-        upload_page()
-    elif page == "Dashboards":
-        dashboard_page()
+    try:
+        if page == "Home":
+            home_page()
+        elif page == "Upload de Arquivos":
+            upload_page()
+        elif page == "Dashboards":
+            dashboard_page()
+    finally:
+        finish_rerun_trace()
+    
+    if perf_panel is not None:
+        with perf_panel:
+            display_performance_panel()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
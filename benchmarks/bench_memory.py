@@ -0,0 +1,104 @@
+"""
+Mede o pico de memória alocada por renderização de gráfico, comparando o
+fluxo anterior (cópias completas do DataFrame a cada etapa) com o fluxo atual
+(seleção de colunas, filtros pelo índice de bitmaps e copy-on-write).
+
+Uso:
+    python benchmarks/bench_memory.py [--rows 1000000] [--extra-columns 10]
+"""
+import argparse
+import logging
+import os
+import sys
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+
+# Fora do Streamlit, as mensagens st.* e avisos do Plotly apenas poluem a saída
+logging.disable(logging.WARNING)
+warnings.filterwarnings("ignore")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from components.dashboard import build_chart_frame, create_chart
+
+pd.set_option("mode.copy_on_write", True)
+
+# Tipos de gráfico e colunas usadas em cada um (x, y, cor)
+CHART_CASES = [
+    ("Barra", "categoria", "valor", None),
+    ("Linha", "indice", "valor", None),
+    ("Dispersão", "valor", "quantidade", "categoria"),
+    ("Histograma", "valor", None, None),
+    ("Pizza", "categoria", "valor", None),
+    ("Heatmap", "categoria", "valor", "regiao"),
+]
+
+def generate_dataframe(rows, extra_columns, seed=42):
+    """Gera um DataFrame sintético com colunas numéricas, categóricas e colunas extras não usadas nos gráficos."""
+    rng = np.random.default_rng(seed)
+    data = {
+        'indice': np.arange(rows, dtype=np.int64),
+        'valor': rng.normal(100, 15, rows),
+        'quantidade': rng.integers(0, 1000, rows).astype(np.float64),
+        'categoria': pd.Categorical(rng.choice(['A', 'B', 'C', 'D', 'E'], rows)),
+        'regiao': pd.Categorical(rng.choice(['Norte', 'Sul', 'Leste', 'Oeste'], rows)),
+    }
+    for i in range(extra_columns):
+        data[f'extra_{i}'] = rng.random(rows)
+    df = pd.DataFrame(data)
+    df.loc[df.sample(frac=0.01, random_state=seed).index, 'valor'] = np.nan
+    return df
+
+def legacy_chart_frame(df, x_col, y_col, color_col, filters):
+    """Reproduz o fluxo anterior: cópia do DataFrame, filtro com todas as colunas e nova cópia no gráfico."""
+    processed_df = df.copy()
+    filtered_df = processed_df.copy()
+    for col, values in filters.items():
+        filtered_df = filtered_df[filtered_df[col].isin(values)]
+    cols_to_check = [col for col in [x_col, y_col, color_col] if col is not None]
+    return filtered_df.copy().dropna(subset=cols_to_check)
+
+def measure_peak(func):
+    """Executa a função e retorna (resultado, pico de memória alocada em bytes)."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+def run(rows, extra_columns):
+    df = generate_dataframe(rows, extra_columns)
+    filters = {'regiao': ['Norte', 'Sul', 'Leste']}
+    dataset_mb = df.memory_usage(deep=True).sum() / (1024 * 1024)
+    print(f"Dataset: {rows} linhas, {df.shape[1]} colunas, {dataset_mb:.1f} MB")
+    print(f"{'Gráfico':<12}{'Antes (MB)':>12}{'Depois (MB)':>13}{'Redução':>10}")
+
+    for chart_type, x_col, y_col, color_col in CHART_CASES:
+        def render_legacy():
+            chart_df = legacy_chart_frame(df, x_col, y_col, color_col, filters)
+            return create_chart(chart_df, chart_type, x_col, y_col, color_col)
+
+        def render_current():
+            chart_df = build_chart_frame(df, x_col, y_col, color_col, filters)
+            return create_chart(chart_df, chart_type, x_col, y_col, color_col)
+
+        # Aquecimento: o índice de bitmaps e os módulos do Plotly são reutilizados entre renderizações
+        render_current()
+
+        _, before = measure_peak(render_legacy)
+        _, after = measure_peak(render_current)
+        reduction = 1 - after / before if before else 0
+        print(f"{chart_type:<12}{before / 2**20:>12.1f}{after / 2**20:>13.1f}{reduction:>10.0%}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--extra-columns", type=int, default=10)
+    args = parser.parse_args()
+    run(args.rows, args.extra_columns)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+Gerador de dados sintéticos no formato do dataset de anomalias de equipamentos
+(data/equipment_anomaly_data_processed_*.csv), para benchmarks em escala.
+
+Uso:
+    python benchmarks/data_generator.py 1000000 dados_1m.csv
+"""
+import argparse
+import numpy as np
+import pandas as pd
+
+# Tamanhos padrão usados nos benchmarks
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+EQUIPMENT = ['Compressor', 'Turbine', 'Pump']
+LOCATIONS = ['Atlanta', 'Chicago', 'Houston', 'New York', 'San Francisco']
+
+# Proporção de leituras com falha no dataset original
+FAULTY_RATIO = 0.1
+
+# Linhas geradas por bloco ao gravar arquivos grandes
+CHUNK_ROWS = 1_000_000
+
+def parse_size(size):
+    """Converte '10k', '1m', '10m' ou um número em quantidade de linhas."""
+    size = str(size).lower()
+    if size in SIZES:
+        return SIZES[size]
+    return int(size.replace('_', ''))
+
+def generate_equipment_data(rows, seed=42, missing_ratio=0.01, with_timestamp=True, start_row=0):
+    """
+    Gera leituras sintéticas de sensores com a mesma distribuição do dataset original.
+
+    Args:
+        rows: Número de linhas
+        seed: Semente do gerador aleatório
+        missing_ratio: Proporção de valores ausentes nas colunas numéricas
+        with_timestamp: Incluir uma coluna 'timestamp' (texto) para a detecção de datas
+        start_row: Posição da primeira linha (para gerar blocos consecutivos)
+
+    Returns:
+        DataFrame com as colunas do dataset de anomalias de equipamentos
+    """
+    rng = np.random.default_rng([seed, start_row])
+    faulty = rng.random(rows) < FAULTY_RATIO
+
+    # Leituras com falha têm temperatura, pressão e vibração mais altas
+    df = pd.DataFrame({
+        'temperature': rng.normal(68, 10, rows) + faulty * rng.normal(30, 20, rows),
+        'pressure': rng.normal(34, 7, rows) + faulty * rng.normal(15, 15, rows),
+        'vibration': np.abs(rng.normal(1.5, 0.4, rows) + faulty * rng.normal(1.2, 1.0, rows)),
+        'humidity': np.clip(rng.normal(50, 11.8, rows), 10, 90),
+        'equipment': rng.choice(EQUIPMENT, rows),
+        'location': rng.choice(LOCATIONS, rows),
+        'faulty': faulty.astype(np.float64)
+    })
+
+    if missing_ratio > 0:
+        for col in ['temperature', 'pressure', 'vibration', 'humidity']:
+            df.loc[rng.random(rows) < missing_ratio, col] = np.nan
+
+    if with_timestamp:
+        timestamps = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(start_row, start_row + rows), unit='min')
+        df.insert(0, 'timestamp', timestamps.strftime('%Y-%m-%d %H:%M:%S'))
+
+    return df
+
+def write_equipment_csv(path, rows, seed=42, chunk_rows=CHUNK_ROWS, **kwargs):
+    """Grava um CSV sintético em blocos, sem manter o arquivo inteiro em memória."""
+    for start in range(0, rows, chunk_rows):
+        chunk = generate_equipment_data(min(chunk_rows, rows - start), seed=seed, start_row=start, **kwargs)
+        chunk.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um CSV sintético de anomalias de equipamentos.")
+    parser.add_argument("rows", help="Número de linhas (ex.: 10k, 1m, 10m ou 250000)")
+    parser.add_argument("output", help="Arquivo CSV de saída")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    write_equipment_csv(args.output, parse_size(args.rows), seed=args.seed)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,220 @@
+"""
+Suíte de benchmarks dos caminhos críticos: leitura/processamento do CSV,
+limpeza, detecção de datas, preparação para visualização e criação dos seis
+tipos de gráfico. Mede o tempo (mediana e mínimo de várias execuções) e o pico
+de memória alocada (tracemalloc) de cada caso, para cada tamanho de dataset.
+
+Os resultados são acrescentados a um histórico em JSON e comparados com a
+execução anterior, destacando regressões.
+
+Uso:
+    python benchmarks/run_benchmarks.py [--sizes 10k,1m] [--repeat 3] [--only create_chart]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+import pandas as pd
+
+# Fora do Streamlit, as mensagens st.* e avisos do Plotly apenas poluem a saída
+logging.disable(logging.WARNING)
+warnings.filterwarnings("ignore")
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from benchmarks.data_generator import parse_size, write_equipment_csv
+from components.file_processor import (
+    process_csv_file, handle_missing_values, handle_outliers,
+    detect_date_columns, prepare_data_for_visualization
+)
+from components.statistics import iqr_bounds
+from components.cleaning import plan_outliers, apply_cleaning_plan
+from components.dashboard import build_chart_frame, create_chart
+
+pd.set_option("mode.copy_on_write", True)
+
+# Arquivo padrão do histórico de resultados
+HISTORY_FILE = os.path.join(BENCHMARKS_DIR, "history.json")
+
+# Aumento relativo de tempo (ou memória) em relação à execução anterior considerado regressão
+REGRESSION_THRESHOLD = 0.2
+
+# Tipos de gráfico e colunas usadas em cada um (x, y, cor)
+CHART_CASES = [
+    ("Barra", "equipment", "temperature", None),
+    ("Linha", "temperature", "pressure", None),
+    ("Dispersão", "temperature", "vibration", "equipment"),
+    ("Histograma", "temperature", None, None),
+    ("Pizza", "location", "faulty", None),
+    ("Heatmap", "equipment", "temperature", "location"),
+]
+
+def build_cases(csv_path):
+    """
+    Monta a lista de casos (nome, função) para um arquivo CSV gerado.
+    Os dados de entrada de cada caso são preparados antes da medição.
+    """
+    df, _ = process_csv_file(csv_path)
+    cols_with_missing = df.columns[df.isna().any()]
+
+    cases = [
+        ("process_csv_file", lambda: process_csv_file(csv_path)),
+        ("clean.missing_drop", lambda: handle_missing_values(df, "Remover linhas", cols_with_missing)),
+        ("clean.missing_mean_mode", lambda: handle_missing_values(df, "Preencher com média/moda", cols_with_missing)),
+        ("clean.missing_zero", lambda: handle_missing_values(df, "Preencher com zero", cols_with_missing)),
+        ("clean.outliers_iqr", lambda: handle_outliers(
+            df, 'temperature', "Limitar aos limites (capping)", *iqr_bounds(df['temperature'])
+        )),
+        ("clean.outliers_grouped", lambda: apply_cleaning_plan(df, [plan_outliers(
+            df, "Marcar (coluna outlier)", ['temperature', 'pressure', 'vibration', 'humidity'], group_by=['equipment', 'location']
+        )])),
+        ("clean.outliers_robust", lambda: apply_cleaning_plan(df, [plan_outliers(
+            df, "Marcar (coluna outlier)", ['temperature', 'pressure', 'vibration', 'humidity'], method='robust_covariance'
+        )])),
+        ("detect_date_columns", lambda: detect_date_columns(df)),
+        ("prepare_data_for_visualization", lambda: prepare_data_for_visualization(
+            df, columns=['equipment', 'location', 'temperature', 'pressure'], sample_size=10000
+        )),
+        ("prepare_data_for_visualization.time_series", lambda: prepare_data_for_visualization(df, time_series={
+            'time_column': 'timestamp', 'value_column': 'temperature', 'group_by': 'equipment',
+            'rule': 'h', 'function': 'mean', 'window': 'rolling_mean', 'window_size': 24,
+            'date_format': '%Y-%m-%d %H:%M:%S'
+        })),
+    ]
+
+    for chart_type, x_col, y_col, color_col in CHART_CASES:
+        def render(chart_type=chart_type, x_col=x_col, y_col=y_col, color_col=color_col):
+            chart_df = build_chart_frame(df, x_col, y_col, color_col)
+            return create_chart(chart_df, chart_type, x_col, y_col, color_col)
+        cases.append((f"create_chart.{chart_type}", render))
+
+    return cases
+
+def measure(func, repeat):
+    """
+    Mede um caso: tempos de `repeat` execuções e o pico de memória de uma
+    execução adicional com tracemalloc (que desacelera o código medido).
+    """
+    func()  # Aquecimento (imports, caches e índices construídos na primeira chamada)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+        'peak_mb': peak / (1024 * 1024)
+    }
+
+def environment_info():
+    """Informações do ambiente gravadas junto aos resultados."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCHMARKS_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    import numpy, plotly
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': numpy.__version__,
+        'plotly': plotly.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor() or None
+    }
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_history(history, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp_path, path)
+
+def find_previous(history, name, rows):
+    """Retorna o resultado mais recente do caso no histórico (ou None)."""
+    for run in reversed(history):
+        for result in run['results']:
+            if result['name'] == name and result['rows'] == rows:
+                return result
+    return None
+
+def compare(result, previous, threshold=REGRESSION_THRESHOLD):
+    """Descreve a variação em relação à execução anterior, marcando regressões."""
+    if previous is None:
+        return "novo"
+    notes = []
+    for key, label in [('median_s', 'tempo'), ('peak_mb', 'memória')]:
+        if previous[key] > 0:
+            change = result[key] / previous[key] - 1
+            flag = " REGRESSÃO" if change > threshold else ""
+            notes.append(f"{label} {change:+.0%}{flag}")
+    return ", ".join(notes)
+
+def run(sizes, repeat, only=None, history_path=HISTORY_FILE):
+    history = load_history(history_path)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            rows = parse_size(size)
+            csv_path = os.path.join(tmp_dir, f"equipment_{rows}.csv")
+            write_equipment_csv(csv_path, rows)
+
+            print(f"\n== {rows} linhas ==")
+            print(f"{'Caso':<34}{'Mediana (s)':>12}{'Mínimo (s)':>12}{'Pico (MB)':>11}  Variação")
+            for name, func in build_cases(csv_path):
+                if only and only not in name:
+                    continue
+                result = {'name': name, 'rows': rows, **measure(func, repeat)}
+                note = compare(result, find_previous(history, name, rows))
+                print(f"{name:<34}{result['median_s']:>12.4f}{result['min_s']:>12.4f}{result['peak_mb']:>11.1f}  {note}")
+                results.append(result)
+
+    history.append({
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'environment': environment_info(),
+        'repeat': repeat,
+        'results': results
+    })
+    save_history(history, history_path)
+    print(f"\nResultados gravados em {history_path}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa a suíte de benchmarks do dashboard.")
+    parser.add_argument("--sizes", default="10k,1m", help="Tamanhos separados por vírgula (10k, 1m, 10m ou número de linhas)")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções cronometradas por caso")
+    parser.add_argument("--only", help="Executa apenas os casos cujo nome contém este texto")
+    parser.add_argument("--history", default=HISTORY_FILE, help="Arquivo JSON do histórico de resultados")
+    args = parser.parse_args()
+    run(args.sizes.split(','), args.repeat, args.only, args.history)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
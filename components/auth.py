@@ -1,11 +1,50 @@
 import streamlit as st
 import yaml
 import os.path
-import streamlit_authenticator as stauth
+import sqlite3
+import threading
+import time
+import base64
+import hashlib
+import hmac
+import json
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+import bcrypt
+import streamlit.components.v1 as components
 
 # Caminho para o arquivo de configuração
 CONFIG_PATH = "config/auth.yaml"
 
+# Banco de credenciais (usuários cadastrados; o YAML é importado quando alterado)
+CREDENTIALS_DB = os.environ.get("AUTH_DB", "config/auth.db")
+
+# Custo do bcrypt para novas senhas
+BCRYPT_ROUNDS = 12
+
+# Verificações de senha (bcrypt) executadas ao mesmo tempo no servidor, somando todas as sessões
+AUTH_MAX_CONCURRENT = int(os.environ.get("AUTH_MAX_CONCURRENT", str(os.cpu_count() or 1)))
+
+# Tempo máximo de espera por uma vaga de verificação (acima disso o login é recusado)
+AUTH_WAIT_SECONDS = float(os.environ.get("AUTH_WAIT_SECONDS", "5"))
+
+# Tentativas de login com senha incorreta permitidas por usuário e IP na janela de tempo
+LOGIN_MAX_FAILURES = int(os.environ.get("LOGIN_MAX_FAILURES", "5"))
+LOGIN_WINDOW_SECONDS = int(os.environ.get("LOGIN_WINDOW_SECONDS", "300"))
+
+# Bloqueio aplicado ao par (usuário, IP) que atinge o limite de tentativas
+LOGIN_LOCKOUT_SECONDS = int(os.environ.get("LOGIN_LOCKOUT_SECONDS", "60"))
+
+# Número máximo de pares (usuário, IP) acompanhados (os mais antigos são descartados)
+LOGIN_MAX_TRACKED = int(os.environ.get("LOGIN_MAX_TRACKED", "10000"))
+
+# Usa o IP informado pelo proxy reverso (X-Forwarded-For / X-Real-Ip) em vez do IP da conexão;
+# habilite apenas atrás de um proxy confiável, pois o cabeçalho pode ser forjado pelo cliente
+AUTH_TRUST_PROXY = os.environ.get("AUTH_TRUST_PROXY", "0") == "1"
+
+# Chave de assinatura do cookie de login persistente (por padrão, a chave do config/auth.yaml)
+AUTH_COOKIE_KEY = os.environ.get("AUTH_COOKIE_KEY")
+
 def load_config():
     """Carrega a configuração do arquivo YAML."""
     if os.path.exists(CONFIG_PATH):
@@ -14,10 +53,364 @@ def load_config():
         return config
     return None
 
-def save_config(config):
-    """Salva a configuração no arquivo YAML."""
-    with open(CONFIG_PATH, 'w') as file:
-        yaml.dump(config, file)
+def _mtime(path):
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+class CredentialStore:
+    """
+    Usuários e hashes de senha em SQLite: cadastros são inserções atômicas
+    (a chave primária impede nomes duplicados, mesmo em cadastros simultâneos),
+    sem reescrever o arquivo inteiro.
+
+    A tabela de usuários é mantida em memória e relida apenas quando o banco
+    ou o arquivo YAML mudam (data de modificação). Alterações manuais no YAML
+    são importadas para o banco.
+    """
+
+    def __init__(self, db_path, yaml_path):
+        self.db_path = db_path
+        self.yaml_path = yaml_path
+        self._lock = threading.Lock()
+        self._users = None
+        self._signature = None
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "username TEXT PRIMARY KEY, name TEXT NOT NULL, email TEXT NOT NULL, "
+                "password TEXT NOT NULL, role TEXT NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _import_yaml(self):
+        """Importa os usuários do YAML se ele foi alterado desde a última importação (requer o lock)."""
+        yaml_mtime = _mtime(self.yaml_path)
+        if yaml_mtime is None:
+            return
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM settings WHERE key = 'yaml_mtime'").fetchone()
+            if row is not None and int(row[0]) == yaml_mtime:
+                return
+            config = load_config() or {}
+            usernames = (config.get('credentials') or {}).get('usernames') or {}
+            conn.executemany(
+                "INSERT INTO users (username, name, email, password, role) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (username) DO UPDATE SET name = excluded.name, email = excluded.email, "
+                "password = excluded.password, role = excluded.role",
+                [
+                    (username, user['name'], user.get('email', ''), user['password'], user.get('role', 'user'))
+                    for username, user in usernames.items()
+                ]
+            )
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('yaml_mtime', ?)", (str(yaml_mtime),))
+
+    def users(self):
+        """Tabela de usuários ({usuário: {name, email, password, role}}), do cache em memória."""
+        with self._lock:
+            signature = (_mtime(self.db_path), _mtime(self.yaml_path))
+            if self._users is None or signature != self._signature:
+                self._import_yaml()
+                with self._connect() as conn:
+                    rows = conn.execute("SELECT username, name, email, password, role FROM users").fetchall()
+                self._users = {
+                    username: {'name': name, 'email': email, 'password': password, 'role': role}
+                    for username, name, email, password, role in rows
+                }
+                # Assinatura lida depois da importação (que altera o banco)
+                self._signature = (_mtime(self.db_path), _mtime(self.yaml_path))
+            return self._users
+
+    def get_user(self, username):
+        """Retorna os dados de um usuário ou None."""
+        return self.users().get(username)
+
+    def add_user(self, username, name, email, password_hash, role='user'):
+        """
+        Cadastra um usuário.
+
+        Returns:
+            False se o nome de usuário já existe
+        """
+        with self._lock:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT INTO users (username, name, email, password, role) VALUES (?, ?, ?, ?, ?)",
+                        (username, name, email, password_hash, role)
+                    )
+            except sqlite3.IntegrityError:
+                return False
+            self._users = None
+        return True
+
+class LoginLimiter:
+    """
+    Limita as tentativas de login com senha incorreta (janela deslizante) por
+    usuário e IP do cliente: reconectar (nova sessão do navegador) não zera a
+    contagem, e tentativas erradas vindas de outro IP não bloqueiam o dono da
+    conta. Ao atingir o limite, o par fica bloqueado por um tempo curto.
+    O número de pares acompanhados é limitado (LRU), e os pares sem falhas
+    recentes são descartados.
+    """
+
+    def __init__(self, max_failures, window_seconds, lockout_seconds=LOGIN_LOCKOUT_SECONDS,
+                 max_tracked=LOGIN_MAX_TRACKED):
+        self.max_failures = max_failures
+        self.window_seconds = window_seconds
+        self.lockout_seconds = lockout_seconds
+        self.max_tracked = max_tracked
+        # (usuário, IP) -> {'failures': horários das falhas, 'locked_until': fim do bloqueio}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _trim(self, key, now):
+        """Descarta as falhas fora da janela e o par sem falhas nem bloqueio (requer o lock)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        failures = entry['failures']
+        while failures and now - failures[0] > self.window_seconds:
+            failures.popleft()
+        if not failures and entry['locked_until'] <= now:
+            del self._entries[key]
+            return None
+        return entry
+
+    def retry_after(self, username, client=None):
+        """Segundos até a próxima tentativa permitida (0 se permitida agora)."""
+        with self._lock:
+            now = time.monotonic()
+            entry = self._trim((username, client), now)
+            if entry is None or entry['locked_until'] <= now:
+                return 0
+            return int(entry['locked_until'] - now) + 1
+
+    def record_failure(self, username, client=None):
+        key = (username, client)
+        with self._lock:
+            now = time.monotonic()
+            entry = self._trim(key, now)
+            if entry is None:
+                entry = self._entries[key] = {'failures': deque(), 'locked_until': 0}
+            entry['failures'].append(now)
+            if len(entry['failures']) >= self.max_failures:
+                entry['locked_until'] = now + self.lockout_seconds
+                entry['failures'].clear()
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_tracked:
+                self._entries.popitem(last=False)
+
+    def reset(self, username, client=None):
+        with self._lock:
+            self._entries.pop((username, client), None)
+
+    def tracked(self):
+        """Número de pares (usuário, IP) com falhas ou bloqueio registrados."""
+        with self._lock:
+            return len(self._entries)
+
+class PasswordHasher:
+    """
+    Limita o número de operações bcrypt (verificação e geração de hashes)
+    executadas ao mesmo tempo no servidor, somando todas as sessões. O bcrypt
+    libera o GIL, então as verificações rodam em paralelo até o limite; uma
+    tentativa que não consegue vaga em AUTH_WAIT_SECONDS é recusada.
+    """
+
+    def __init__(self, max_concurrent, wait_seconds):
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrent))
+        self.wait_seconds = wait_seconds
+        # Hash usado para usuários inexistentes: o tempo de resposta não revela se o usuário existe
+        self._dummy_hash = bcrypt.hashpw(b"", bcrypt.gensalt(BCRYPT_ROUNDS))
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.wait_seconds):
+            return None
+        try:
+            return func(*args)
+        finally:
+            self._slots.release()
+
+    def _checkpw(self, password, hashed):
+        try:
+            return bcrypt.checkpw(password, hashed)
+        except ValueError:
+            # Hash armazenado malformado: conta como senha incorreta, no mesmo tempo de uma verificação normal
+            bcrypt.checkpw(password, self._dummy_hash)
+            return False
+
+    def verify(self, password, password_hash):
+        """
+        Returns:
+            True/False, ou None se o servidor estiver sobrecarregado
+        """
+        hashed = password_hash.encode() if password_hash else self._dummy_hash
+        result = self._run(self._checkpw, password.encode(), hashed)
+        if result is None:
+            return None
+        return result and password_hash is not None
+
+    def hash(self, password):
+        """Gera o hash bcrypt de uma senha (None se o servidor estiver sobrecarregado)."""
+        result = self._run(bcrypt.hashpw, password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS))
+        return result.decode() if result is not None else None
+
+def _token_signature(username, expires, password_hash, key):
+    # O hash da senha entra na chave: trocar a senha invalida os cookies já emitidos
+    message = f"{username}\n{expires}".encode()
+    return hmac.new(f"{key}:{password_hash}".encode(), message, hashlib.sha256).hexdigest()
+
+def create_login_token(username, password_hash, key, expiry_days):
+    """
+    Gera o token assinado (HMAC-SHA256) do cookie de login persistente.
+
+    Args:
+        username: Nome de usuário
+        password_hash: Hash da senha atual do usuário
+        key: Chave de assinatura
+        expiry_days: Validade do token em dias
+
+    Returns:
+        Token no formato usuário.expiração.assinatura (usuário em base64)
+    """
+    expires = int(time.time() + expiry_days * 86400)
+    encoded = base64.urlsafe_b64encode(username.encode()).decode()
+    return f"{encoded}.{expires}.{_token_signature(username, expires, password_hash, key)}"
+
+def verify_login_token(token, key, store):
+    """
+    Valida um token de login persistente.
+
+    Args:
+        token: Valor do cookie
+        key: Chave de assinatura
+        store: Banco de credenciais (CredentialStore)
+
+    Returns:
+        Tupla (nome de usuário, dados do usuário) ou (None, None) se o token é inválido ou expirou
+    """
+    try:
+        encoded, expires, signature = token.split(".")
+        username = base64.urlsafe_b64decode(encoded.encode()).decode()
+        expires = int(expires)
+    except (ValueError, UnicodeDecodeError):
+        return None, None
+    if expires < time.time():
+        return None, None
+    user = store.get_user(username)
+    if user is None:
+        return None, None
+    if not hmac.compare_digest(signature, _token_signature(username, expires, user['password'], key)):
+        return None, None
+    return username, user
+
+@st.cache_resource
+def get_credential_store():
+    """Retorna a instância única do banco de credenciais."""
+    return CredentialStore(CREDENTIALS_DB, CONFIG_PATH)
+
+@st.cache_resource
+def get_login_limiter():
+    """Retorna o limitador de tentativas de login do servidor."""
+    return LoginLimiter(LOGIN_MAX_FAILURES, LOGIN_WINDOW_SECONDS, LOGIN_LOCKOUT_SECONDS)
+
+@st.cache_resource
+def get_password_hasher():
+    """Retorna o pool de verificação de senhas do servidor."""
+    return PasswordHasher(AUTH_MAX_CONCURRENT, AUTH_WAIT_SECONDS)
+
+def _client_ip():
+    """IP do cliente que executa o script (None fora de uma sessão ou se não puder ser obtido)."""
+    if AUTH_TRUST_PROXY:
+        forwarded = st.context.headers.get("X-Forwarded-For") or st.context.headers.get("X-Real-Ip")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    try:
+        from streamlit.runtime.context import _get_request
+        request = _get_request()
+    except ImportError:
+        return None
+    return request.remote_ip if request is not None else None
+
+def _cookie_settings():
+    """Nome, chave de assinatura e validade (dias) do cookie de login, de config/auth.yaml."""
+    cookie = (load_config() or {}).get('cookie') or {}
+    name = cookie.get('name', 'analise_dados_cookie')
+    key = AUTH_COOKIE_KEY or cookie.get('key', 'analise_dados_auth')
+    return name, key, float(cookie.get('expiry_days', 30))
+
+def _set_cookie_script(name, value, max_age):
+    """Grava (ou remove, com max_age 0) o cookie no navegador a partir de um componente HTML."""
+    cookie = f"{name}={value}; max-age={int(max_age)}; path=/; SameSite=Strict"
+    components.html(f"<script>window.parent.document.cookie = {json.dumps(cookie)};</script>", height=0)
+
+def _start_session(username, user, source):
+    st.session_state.logged_in = True
+    st.session_state.username = username
+    st.session_state.user_info = {
+        'name': user['name'],
+        'role': user['role']
+    }
+    st.session_state.auth_source = source
+
+def _restore_login():
+    """Autentica pelo cookie de login persistente, sem verificar a senha (bcrypt)."""
+    # Após o logout, o cookie antigo continua nos cabeçalhos da conexão desta sessão
+    if st.session_state.get('login_cookie_cleared'):
+        return
+    name, key, _ = _cookie_settings()
+    token = st.context.cookies.get(name)
+    if not token:
+        return
+    username, user = verify_login_token(token, key, get_credential_store())
+    if username is not None:
+        _start_session(username, user, "cookie")
+
+def _sync_login_cookie():
+    """Grava ou remove o cookie pendente (a gravação não sobrevive a um st.rerun na mesma execução)."""
+    pending = st.session_state.pop('pending_login_cookie', None)
+    if pending is None:
+        return
+    name, _, expiry_days = _cookie_settings()
+    with st.sidebar:
+        _set_cookie_script(name, pending, expiry_days * 86400 if pending else 0)
+
+def authenticate(username, password, client=None):
+    """
+    Verifica as credenciais de um usuário, respeitando o limite de tentativas.
+
+    Args:
+        username: Nome de usuário
+        password: Senha informada
+        client: Cliente que faz a tentativa (por padrão, o IP da sessão atual)
+
+    Returns:
+        Tupla (dados do usuário ou None, mensagem de erro ou None)
+    """
+    if client is None:
+        client = _client_ip()
+    limiter = get_login_limiter()
+    retry_after = limiter.retry_after(username, client)
+    if retry_after:
+        return None, f"Muitas tentativas de login. Tente novamente em {retry_after} segundos."
+
+    user = get_credential_store().get_user(username)
+    valid = get_password_hasher().verify(password, user['password'] if user else None)
+    if valid is None:
+        return None, "Servidor ocupado. Tente novamente em instantes."
+    if not valid:
+        limiter.record_failure(username, client)
+        return None, "Usuário ou senha incorretos"
+    limiter.reset(username, client)
+    return user, None
 
 def initialize_session():
     """Inicializa as variáveis de sessão se não existirem."""
@@ -29,6 +422,9 @@ def initialize_session():
         st.session_state.user_info = None
     if 'auth_source' not in st.session_state:
         st.session_state.auth_source = None
+    if not st.session_state.logged_in:
+        _restore_login()
+    _sync_login_cookie()
 
 def login_form():
     """Renderiza o formulário de login com opções de autenticação."""
@@ -44,40 +440,27 @@ def login_form():
     
     # 1. Login tradicional
     with tab1:
-        config = load_config()
-        if config:
-            authenticator = stauth.Authenticate(
-                config['credentials'],
-                config['cookie']['name'],
-                config['cookie']['key'],
-                config['cookie']['expiry_days']
-            )
-            
-            # Chamamos o método login sem tentar desempacotar seu retorno
-            authenticator.login(location="main", key="login-auth-form")
-            
-            # Acessamos os valores do session_state
-            authentication_status = st.session_state.get("authentication_status")
-            name = st.session_state.get("name")
-            username = st.session_state.get("username")
-            
-            if authentication_status:
-                st.session_state.logged_in = True
-                st.session_state.username = username
-                st.session_state.user_info = {
-                    'name': config['credentials']['usernames'][username]['name'],
-                    'role': config['credentials']['usernames'][username]['role']
-                }
-                st.session_state.auth_source = "traditional"
+        with st.form("login_form"):
+            username = st.text_input("Usuário")
+            password = st.text_input("Senha", type="password")
+            login_submitted = st.form_submit_button("Entrar")
+        
+        if login_submitted and username and password:
+            user, error = authenticate(username, password)
+            if user is not None:
+                _start_session(username, user, "traditional")
+                # Cookie de login persistente, gravado na próxima execução
+                _, key, expiry_days = _cookie_settings()
+                st.session_state.pending_login_cookie = create_login_token(username, user['password'], key, expiry_days)
                 st.rerun()
-            elif authentication_status is False:
-                st.error("Usuário ou senha incorretos")
-                st.session_state.logged_in = False
-                st.session_state.user_info = None
-            elif authentication_status is None:
-                st.info("Por favor, insira suas credenciais")
+            else:
+                st.error(error)
                 st.session_state.logged_in = False
                 st.session_state.user_info = None
+        else:
+            st.info("Por favor, insira suas credenciais")
+            st.session_state.logged_in = False
+            st.session_state.user_info = None
     
     # 2. Formulário de cadastro
     with tab2:
@@ -95,43 +478,18 @@ def login_form():
                     st.error("Todos os campos são obrigatórios")
                 elif new_password != confirm_password:
                     st.error("As senhas não coincidem")
+                elif get_credential_store().get_user(new_username) is not None:
+                    st.error("Nome de usuário já existe. Escolha outro.")
                 else:
-                    config = load_config()
-                    if config and new_username in config['credentials']['usernames']:
+                    # Gera o hash da senha
+                    hashed_password = get_password_hasher().hash(new_password)
+                    
+                    if hashed_password is None:
+                        st.error("Servidor ocupado. Tente novamente em instantes.")
+                    # Adiciona o novo usuário (por padrão, novos usuários são "user")
+                    elif not get_credential_store().add_user(new_username, new_name, new_email, hashed_password):
                         st.error("Nome de usuário já existe. Escolha outro.")
                     else:
-                        # Vamos adicionar o novo usuário
-                        if config is None:
-                            # Cria uma configuração vazia se não existir
-                            config = {
-                                'credentials': {
-                                    'usernames': {}
-                                },
-                                'cookie': {
-                                    'expiry_days': 30,
-                                    'key': 'analise_dados_auth',
-                                    'name': 'analise_dados_cookie'
-                                },
-                                'preauthorized': {
-                                    'emails': []
-                                }
-                            }
-                        
-                        # Gera o hash da senha
-                        hasher = stauth.Hasher()
-                        hashed_password = hasher.hash(new_password)
-                        
-                        # Adiciona o novo usuário
-                        config['credentials']['usernames'][new_username] = {
-                            'email': new_email,
-                            'name': new_name,
-                            'password': hashed_password,
-                            'role': 'user'  # Por padrão, novos usuários são "user"
-                        }
-                        
-                        # Salva a configuração atualizada
-                        save_config(config)
-                        
                         st.success("Cadastro realizado com sucesso! Faça login para continuar.")
                         st.rerun()
     
@@ -143,6 +501,9 @@ def logout():
         if key in st.session_state:
             st.session_state[key] = None
     st.session_state.logged_in = False
+    # Remove o cookie de login persistente na próxima execução
+    st.session_state.login_cookie_cleared = True
+    st.session_state.pending_login_cookie = ""
     st.rerun()
 
 def login_required(func):
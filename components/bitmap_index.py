@@ -0,0 +1,144 @@
+import threading
+import weakref
+import numpy as np
+import pandas as pd
+
+# Colunas com até este número de valores distintos recebem filtros (e bitmaps no índice)
+FILTER_MAX_VALUES = 50
+
+class BitmapIndex:
+    """
+    Índice invertido para filtros categóricos: para cada valor de cada coluna
+    indexada, guarda um bitmap compactado (np.packbits) com as linhas em que o
+    valor aparece.
+
+    Uma combinação de filtros é avaliada com operações OR (valores de uma
+    coluna) e AND (entre colunas) sobre os bitmaps, e as linhas selecionadas
+    são copiadas uma única vez no final.
+    """
+
+    def __init__(self, df, columns=None, max_values=FILTER_MAX_VALUES):
+        self.n_rows = len(df)
+        self.bitmaps = {}
+        self.values = {}
+
+        if columns is None:
+            columns = df.select_dtypes(include=['object', 'category', 'bool']).columns
+        for col in columns:
+            self._index_column(col, df[col], max_values)
+
+    def _index_column(self, col, series, max_values):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            uniques = series.cat.categories
+            present = np.unique(codes[codes >= 0])
+            if len(present) > max_values:
+                return
+            pairs = [(uniques[code], code) for code in present]
+        else:
+            codes, uniques = pd.factorize(series)
+            if len(uniques) > max_values:
+                return
+            pairs = [(value, code) for code, value in enumerate(uniques)]
+
+        self.bitmaps[col] = {}
+        for value, code in pairs:
+            value = value.item() if isinstance(value, np.generic) else value
+            self.bitmaps[col][value] = np.packbits(codes == code)
+        self.values[col] = list(self.bitmaps[col].keys())
+
+    def _column_bitmap(self, col, selected):
+        """Bitmap das linhas cujo valor em `col` está entre os selecionados."""
+        bitmaps = self.bitmaps[col]
+        selected = {value for value in selected if value in bitmaps}
+        unselected = [value for value in bitmaps if value not in selected]
+
+        # Combinar o menor conjunto: OR dos selecionados ou complemento dos não selecionados
+        result = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        if len(selected) <= len(unselected):
+            for value in selected:
+                np.bitwise_or(result, bitmaps[value], out=result)
+        else:
+            for value in unselected:
+                np.bitwise_or(result, bitmaps[value], out=result)
+            # Linhas nulas não pertencem a nenhum valor e continuam excluídas
+            present = np.zeros_like(result)
+            for bitmap in bitmaps.values():
+                np.bitwise_or(present, bitmap, out=present)
+            result = np.bitwise_and(present, np.invert(result))
+        return result
+
+    def can_filter(self, filters):
+        """Indica se todas as colunas dos filtros estão indexadas."""
+        return all(col in self.bitmaps for col in filters)
+
+    def select_rows(self, filters):
+        """
+        Retorna as posições das linhas que atendem a todos os filtros.
+
+        Args:
+            filters: Dicionário coluna -> lista de valores permitidos
+        """
+        result = None
+        for col, selected in filters.items():
+            column_bitmap = self._column_bitmap(col, selected)
+            result = column_bitmap if result is None else np.bitwise_and(result, column_bitmap, out=result)
+
+        if result is None:
+            return np.arange(self.n_rows)
+        return np.flatnonzero(np.unpackbits(result, count=self.n_rows))
+
+    def apply(self, df, filters, columns=None):
+        """
+        Aplica os filtros ao DataFrame indexado, copiando apenas as linhas
+        selecionadas (e apenas as colunas em `columns`, se informadas).
+        """
+        result_df = df[columns] if columns is not None else df
+        if not filters:
+            return result_df
+        return result_df.take(self.select_rows(filters))
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_bitmap_index(df):
+    """
+    Retorna o índice de um DataFrame, construindo-o na primeira chamada.
+    O índice é descartado automaticamente quando o DataFrame deixa de existir.
+    """
+    key = id(df)
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+
+    index = BitmapIndex(df)
+    with _indexes_lock:
+        _indexes[key] = (weakref.ref(df, lambda _, key=key: _indexes.pop(key, None)), index)
+    return index
+
+def filter_dataframe(df, filters, use_index=True, columns=None):
+    """
+    Aplica filtros categóricos (coluna -> valores permitidos) usando o índice
+    de bitmaps; colunas não indexadas (ou `use_index=False`, para DataFrames
+    temporários) são filtradas com uma única máscara combinada.
+
+    Args:
+        df: DataFrame a ser filtrado
+        filters: Dicionário coluna -> lista de valores permitidos
+        use_index: Usar (e construir, se necessário) o índice de bitmaps
+        columns: Colunas a manter no resultado (opcional)
+    """
+    result_df = df[columns] if columns is not None else df
+    if not filters:
+        return result_df
+
+    if use_index:
+        index = get_bitmap_index(df)
+        if index.can_filter(filters):
+            return index.apply(df, filters, columns)
+
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in filters.items():
+        mask &= df[col].isin(values).to_numpy()
+    return result_df[mask]
\ No newline at end of file
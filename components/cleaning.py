@@ -0,0 +1,258 @@
+import json
+import os
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+import streamlit as st
+from components.dataset_cache import load_dataset
+from components.outliers import OUTLIER_COLUMN, fit_bounds, fit_robust_covariance, outlier_mask, clip_to_bounds
+from components.storage import get_storage_path, iter_dataset_batches, dataset_signature
+
+# Extensão do arquivo com o plano de limpeza gravado ao lado do dataset
+CLEANING_PLAN_EXTENSION = ".cleaning.json"
+
+# Número de datasets limpos mantidos em memória (compartilhados entre sessões)
+CLEANING_CACHE_ENTRIES = int(os.environ.get("CLEANING_CACHE_ENTRIES", "4"))
+
+# Tipos de destino das conversões (rótulo exibido -> tipo gravado no plano)
+TYPE_CONVERSIONS = {
+    "Numérico": "numeric",
+    "Texto": "text",
+    "Categoria": "category",
+    "Data/Hora": "datetime"
+}
+
+def _to_json_value(value):
+    """Converte valores numpy/pandas para tipos serializáveis em JSON."""
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+def plan_missing_values(df, strategy, columns):
+    """
+    Cria a etapa do plano que trata os valores ausentes. Os valores de
+    preenchimento são calculados aqui, uma única vez, e gravados no plano.
+
+    Args:
+        df: DataFrame usado no cálculo dos valores de preenchimento
+        strategy: "Manter", "Remover linhas", "Preencher com média/moda" ou "Preencher com zero"
+        columns: Colunas com valores ausentes
+
+    Returns:
+        Etapa do plano (dicionário) ou None
+    """
+    columns = list(columns)
+    if strategy == "Remover linhas":
+        return {'op': 'drop_missing', 'columns': columns}
+    if strategy == "Preencher com zero":
+        return {'op': 'fill_missing', 'values': {col: 0 for col in columns}}
+    if strategy == "Preencher com média/moda":
+        # Médias de todas as colunas numéricas em uma única operação; moda para as demais
+        numeric_cols = [col for col in columns if _is_numeric(df[col])]
+        values = {col: _to_json_value(value) for col, value in df[numeric_cols].mean().items()}
+        for col in columns:
+            if col not in values:
+                mode = df[col].mode()
+                if len(mode):
+                    values[col] = _to_json_value(mode.iloc[0])
+        return {'op': 'fill_missing', 'values': values}
+    return None
+
+def plan_outliers(df, strategy, columns, bounds=None, method='iqr', group_by=None):
+    """
+    Cria a etapa do plano que detecta e trata os outliers de várias colunas
+    numéricas de uma vez. Limites (IQR ou z-score, opcionalmente por grupo) e
+    parâmetros do modo multivariado são calculados aqui e gravados no plano.
+
+    Args:
+        df: DataFrame usado no cálculo dos limites
+        strategy: "Manter", "Marcar (coluna outlier)", "Remover" ou "Limitar aos limites (capping)"
+        columns: Colunas numéricas analisadas
+        bounds: Limites já calculados ({coluna: [inferior, superior]}, opcional)
+        method: "iqr", "zscore" ou "robust_covariance" (multivariado)
+        group_by: Colunas de agrupamento (limites calculados por grupo; opcional)
+
+    Returns:
+        Etapa do plano (dicionário) ou None
+    """
+    strategies = {"Marcar (coluna outlier)": 'flag', "Remover": 'remove', "Limitar aos limites (capping)": 'clip'}
+    if strategy not in strategies or not len(columns):
+        return None
+    step = {'op': 'outliers', 'strategy': strategies[strategy], 'method': method, 'columns': list(columns)}
+    if method == 'robust_covariance':
+        if step['strategy'] == 'clip':
+            raise ValueError("O modo multivariado não define limites por coluna: use marcar ou remover.")
+        step.update(fit_robust_covariance(df, columns))
+    elif group_by:
+        step['group_by'] = list(group_by)
+        step['groups'] = bounds if bounds is not None else fit_bounds(df, columns, method, group_by)
+    else:
+        if bounds is None:
+            bounds = fit_bounds(df, columns, method)
+        step['bounds'] = {col: list(bounds[col]) for col in columns}
+    return step
+
+def plan_conversions(columns, target_type):
+    """Cria a etapa do plano que converte o tipo de várias colunas (None se nada a converter)."""
+    if target_type not in TYPE_CONVERSIONS or not len(columns):
+        return None
+    return {'op': 'convert', 'types': {col: TYPE_CONVERSIONS[target_type] for col in columns}}
+
+def _fill_values(df, values):
+    """Ajusta os valores de preenchimento aos tipos das colunas (categorias e datas)."""
+    fill = {}
+    for col, value in values.items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+            df[col] = series.cat.add_categories([value])
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            value = pd.Timestamp(value)
+        fill[col] = value
+    return fill
+
+def _convert(series, target_type):
+    if target_type == 'numeric':
+        return pd.to_numeric(series, errors='coerce')
+    if target_type == 'text':
+        return series.astype(str)
+    if target_type == 'category':
+        return series.astype('category')
+    return pd.to_datetime(series, errors='coerce')
+
+def apply_cleaning_plan(df, plan):
+    """
+    Aplica um plano de limpeza a um DataFrame (o dataset inteiro ou um bloco).
+
+    Cada etapa atua em todas as suas colunas de uma vez (fillna com um
+    dicionário de valores, clip com vetores de limites por coluna ou por
+    grupo, distância de Mahalanobis no modo multivariado). As
+    remoções de linhas são combinadas em uma única máscara e aplicadas ao
+    final: como os valores do plano já foram calculados, o resultado é o
+    mesmo da aplicação etapa a etapa, sem cópias intermediárias.
+
+    Returns:
+        DataFrame limpo (o original não é alterado)
+    """
+    # Cópia rasa: as colunas tratadas são substituídas, não alteradas no lugar
+    result = df.copy(deep=False)
+    keep = None
+
+    def drop_rows(mask):
+        nonlocal keep
+        keep = mask if keep is None else keep & mask
+
+    for step in plan:
+        op = step['op']
+        if op == 'drop_missing':
+            columns = [col for col in step['columns'] if col in result.columns]
+            drop_rows(result[columns].notna().all(axis=1).to_numpy())
+        elif op == 'fill_missing':
+            result = result.fillna(_fill_values(result, step['values']))
+        elif op == 'outliers':
+            # Planos antigos não têm 'columns' nem 'method' (limites IQR por coluna)
+            columns = [col for col in step.get('columns', step.get('bounds', [])) if col in result.columns]
+            # Limites por grupo e o modo multivariado dependem de todas as colunas da etapa
+            if not columns or ('bounds' not in step and len(columns) < len(step['columns'])):
+                continue
+            step = dict(step, columns=columns)
+            if step['strategy'] == 'clip':
+                result[columns] = clip_to_bounds(result, step)
+            elif step['strategy'] == 'remove':
+                drop_rows(~outlier_mask(result, step))
+            else:
+                mask = outlier_mask(result, step)
+                if OUTLIER_COLUMN in result.columns:
+                    mask = mask | result[OUTLIER_COLUMN].to_numpy(dtype=bool)
+                result[OUTLIER_COLUMN] = mask
+        elif op == 'convert':
+            for col, target_type in step['types'].items():
+                if col in result.columns:
+                    result[col] = _convert(result[col], target_type)
+
+    if keep is not None:
+        result = result[keep]
+    return result
+
+def describe_cleaning_plan(plan):
+    """Descrição legível das etapas de um plano."""
+    descriptions = []
+    for step in plan:
+        op = step['op']
+        if op == 'drop_missing':
+            descriptions.append(f"Remover linhas com valores ausentes em {len(step['columns'])} coluna(s)")
+        elif op == 'fill_missing':
+            descriptions.append(f"Preencher valores ausentes em {len(step['values'])} coluna(s)")
+        elif op == 'outliers':
+            action = {'remove': "Remover", 'clip': "Limitar", 'flag': "Marcar"}[step['strategy']]
+            method = {'iqr': "IQR", 'zscore': "z-score", 'robust_covariance': "covariância robusta"}[step.get('method', 'iqr')]
+            description = f"{action} outliers ({method}) em {', '.join(step.get('columns', step.get('bounds', [])))}"
+            if step.get('group_by'):
+                description += f", por {', '.join(step['group_by'])}"
+            descriptions.append(description)
+        elif op == 'convert':
+            descriptions.append(f"Converter tipos de {', '.join(step['types'])}")
+    return descriptions
+
+def get_cleaning_plan_path(dataset_path, owner=None):
+    """
+    Retorna o caminho do plano de limpeza de um dataset. Com `owner`, o plano
+    é do usuário: o mesmo dataset pode ser compartilhado por vários usuários.
+    """
+    base_name = os.path.splitext(get_storage_path(dataset_path))[0]
+    if owner is not None:
+        base_name = f"{base_name}.{quote(owner, safe='')}"
+    return f"{base_name}{CLEANING_PLAN_EXTENSION}"
+
+def save_cleaning_plan(plan, dataset_path, owner=None):
+    """Grava o plano de limpeza ao lado do dataset."""
+    plan_path = get_cleaning_plan_path(dataset_path, owner)
+    tmp_path = f"{plan_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(plan, f)
+    os.replace(tmp_path, plan_path)
+    return plan_path
+
+def load_cleaning_plan(dataset_path, owner=None):
+    """Lê o plano de limpeza de um dataset (None se não existir)."""
+    plan_path = get_cleaning_plan_path(dataset_path, owner)
+    if not os.path.exists(plan_path):
+        return None
+    with open(plan_path, 'r') as f:
+        return json.load(f)
+
+def remove_cleaning_plan(dataset_path, owner=None):
+    """Descarta o plano de limpeza de um dataset."""
+    plan_path = get_cleaning_plan_path(dataset_path, owner)
+    if os.path.exists(plan_path):
+        os.remove(plan_path)
+
+@st.cache_resource(max_entries=CLEANING_CACHE_ENTRIES, show_spinner="Aplicando a limpeza dos dados...")
+def _cleaned_dataset(dataset_path, signature, plan_json):
+    return apply_cleaning_plan(load_dataset(dataset_path), json.loads(plan_json))
+
+def load_cleaned_dataset(dataset_path, plan):
+    """
+    Retorna o dataset com o plano de limpeza aplicado. O resultado é mantido
+    em memória por dataset e plano, e não é recalculado a cada interação.
+    Como no cache de datasets, o DataFrame retornado é compartilhado e não
+    deve ser modificado.
+    """
+    return _cleaned_dataset(dataset_path, dataset_signature(dataset_path), json.dumps(plan, sort_keys=True))
+
+def iter_cleaned_batches(dataset_path, plan, batch_size=65536):
+    """
+    Lê um dataset em blocos aplicando o plano de limpeza a cada bloco, para
+    arquivos maiores que a memória (todos os valores do plano já estão calculados).
+
+    Yields:
+        DataFrames limpos de cada bloco
+    """
+    for batch in iter_dataset_batches(dataset_path, batch_size=batch_size):
+        yield apply_cleaning_plan(batch, plan)
\ No newline at end of file
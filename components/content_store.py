@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+import streamlit as st
+from components.storage import dataset_signature
+
+# Diretório dos arquivos enviados (conteúdo armazenado uma única vez por hash)
+UPLOAD_STORE_DIR = os.environ.get("UPLOAD_STORE_DIR", "arquivos_enviados")
+
+# Índice de resultados de processamento por hash do arquivo de entrada
+PROCESSED_INDEX_FILE = os.path.join("data", "processed_index.json")
+
+# Tamanho dos blocos lidos ao calcular o hash
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def hash_file(file):
+    """
+    Calcula o SHA-256 de um arquivo (caminho ou objeto de arquivo) lendo-o em
+    blocos, sem carregá-lo inteiro em memória. Objetos de arquivo voltam ao início.
+    """
+    digest = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+    else:
+        file.seek(0)
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+        file.seek(0)
+    return digest.hexdigest()
+
+def _read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _write_json(path, data):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+class ContentStore:
+    """
+    Armazenamento endereçado por conteúdo dos arquivos enviados: cada
+    conteúdo é gravado uma única vez em objects/<hash>, e um índice associa
+    cada nome de arquivo às suas versões (hashes, em ordem de envio).
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, "index.json")
+        self._lock = threading.Lock()
+
+    def object_path(self, digest):
+        """Caminho do conteúdo de um hash."""
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _write_object(self, file, digest=None):
+        """Grava o conteúdo de `file` em objects/ (calculando o hash, se não for informado)."""
+        os.makedirs(self.objects_dir, exist_ok=True)
+        hasher = hashlib.sha256() if digest is None else None
+        tmp_path = os.path.join(self.objects_dir, f".upload-{threading.get_ident()}-{os.getpid()}.tmp")
+        file.seek(0)
+        with open(tmp_path, 'wb') as f:
+            for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+                if hasher is not None:
+                    hasher.update(block)
+                f.write(block)
+        file.seek(0)
+        if hasher is not None:
+            digest = hasher.hexdigest()
+
+        path = self.object_path(digest)
+        created = not os.path.exists(path)
+        if created:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        else:
+            os.remove(tmp_path)
+        return digest, created
+
+    def put(self, file, name, digest=None):
+        """
+        Grava um arquivo enviado, calculando o hash durante a cópia. Se o
+        conteúdo já existir, nada é gravado; se for diferente da última versão
+        do mesmo nome, uma nova versão é registrada.
+
+        Args:
+            file: Objeto de arquivo enviado
+            name: Nome do arquivo
+            digest: Hash já calculado do conteúdo (opcional; evita ler o arquivo
+                novamente quando o conteúdo já está armazenado)
+
+        Returns:
+            Tupla (hash, True se o conteúdo foi gravado agora)
+        """
+        if digest is not None and os.path.exists(self.object_path(digest)):
+            created = False
+        else:
+            digest, created = self._write_object(file, digest)
+        path = self.object_path(digest)
+
+        with self._lock:
+            index = _read_json(self.index_path, {})
+            versions = index.setdefault(name, [])
+            if not versions or versions[-1]['hash'] != digest:
+                versions.append({
+                    'hash': digest,
+                    'size': os.path.getsize(path),
+                    'saved_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                })
+                _write_json(self.index_path, index)
+        return digest, created
+
+    def versions(self, name):
+        """Versões registradas de um nome de arquivo (da mais antiga para a mais recente)."""
+        with self._lock:
+            return list(_read_json(self.index_path, {}).get(name, []))
+
+class ProcessedIndex:
+    """
+    Resultados de processamento (dataset e metadados) indexados pelo hash do
+    arquivo de entrada. Um resultado só é reutilizado enquanto o dataset
+    gravado não for alterado (ex.: por um acréscimo de dados).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        """
+        Returns:
+            Tupla (caminho do dataset, metadados) ou None
+        """
+        with self._lock:
+            entry = _read_json(self.path, {}).get(digest)
+        if entry is None or not os.path.exists(entry['path']):
+            return None
+        if list(dataset_signature(entry['path'])) != entry['signature']:
+            return None
+        return entry['path'], entry['metadata']
+
+    def paths(self):
+        """Caminhos dos datasets indexados."""
+        with self._lock:
+            return [entry['path'] for entry in _read_json(self.path, {}).values()]
+
+    def put(self, digest, dataset_path, metadata):
+        """Registra o resultado do processamento de um conteúdo."""
+        with self._lock:
+            index = _read_json(self.path, {})
+            index[digest] = {
+                'path': dataset_path,
+                'metadata': metadata,
+                'signature': list(dataset_signature(dataset_path))
+            }
+            _write_json(self.path, index)
+
+@st.cache_resource
+def get_content_store():
+    """Retorna a instância única do armazenamento de arquivos enviados."""
+    return ContentStore(UPLOAD_STORE_DIR)
+
+@st.cache_resource
+def get_processed_index():
+    """Retorna a instância única do índice de resultados de processamento."""
+    return ProcessedIndex(PROCESSED_INDEX_FILE)
\ No newline at end of file
@@ -7,6 +7,16 @@ import json
 import uuid
 import datetime
 from components.file_processor import prepare_data_for_visualization, detect_date_columns
+from components.figure_cache import get_or_create_figure, get_cached_figure
+from components.profile import column_types_from_profile, date_formats_from_profile
+from components.bitmap_index import FILTER_MAX_VALUES, get_bitmap_index, filter_dataframe
+from components.downsampling import DOWNSAMPLE_THRESHOLD_ROWS, downsample_line_data, create_density_scatter
+from components.instrumentation import span
+from components.rollup import query_rollup
+from components.query_engine import ChartQuery, execute_chart_query
+from components.schema import infer_date_schema, apply_date_schema, infer_date_format
+from components.timeseries import RESAMPLE_RULES, RESAMPLE_FUNCTIONS, WINDOW_FUNCTIONS, DEFAULT_WINDOW_SIZE
+from components.render_scheduler import DeferredMessages, RenderBatch, run_render_tasks
 
 def get_data_preview(df, num_rows=5):
     """Retorna uma prévia dos dados."""
@@ -24,8 +34,8 @@ def save_dataframe(df, file_name):
 
 def get_column_types(df):
     """Classifica as colunas do dataframe por tipo."""
-    numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
-    categorical_cols = df.select_dtypes(include=['object', 'category']).columns.tolist()
+    numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+    categorical_cols = df.select_dtypes(include=['object', 'category', 'bool']).columns.tolist()
     date_cols = df.select_dtypes(include=['datetime64']).columns.tolist()
     
     return {
@@ -34,43 +44,45 @@ def get_column_types(df):
         'date': date_cols
     }
 
-def create_chart(df, chart_type, x_col, y_col, color_col=None, title="Dashboard Interativo", theme="plotly", height=500):
-    """Cria diferentes tipos de gráficos com base nos parâmetros."""
+def create_chart(df, chart_type, x_col, y_col, color_col=None, title="Dashboard Interativo", theme="plotly", height=500, pre_aggregated=False, feedback=st):
+    """
+    Cria diferentes tipos de gráficos com base nos parâmetros.
+    Com `pre_aggregated`, `df` já contém uma linha por grupo (respostas dos
+    cubos de agregação para pizza e heatmap) e não é amostrado.
+    Avisos e erros são enviados para `feedback` (st ou DeferredMessages, fora
+    da thread do script).
+    """
     try:
         # Verificar dados de entrada
         if df.empty:
-            st.warning("DataFrame vazio. Não é possível criar o gráfico.")
+            feedback.warning("DataFrame vazio. Não é possível criar o gráfico.")
             return None
             
         if x_col not in df.columns:
-            st.error(f"Coluna do eixo X não encontrada: {x_col}")
+            feedback.error(f"Coluna do eixo X não encontrada: {x_col}")
             return None
             
         if y_col is not None and y_col not in df.columns and chart_type != "Histograma":
-            st.error(f"Coluna do eixo Y não encontrada: {y_col}")
+            feedback.error(f"Coluna do eixo Y não encontrada: {y_col}")
             return None
             
         if color_col is not None and color_col not in df.columns:
-            st.warning(f"Coluna de cor não encontrada: {color_col}. Usando sem colorização.")
+            feedback.warning(f"Coluna de cor não encontrada: {color_col}. Usando sem colorização.")
             color_col = None
             
         # Configurar o tema
         template = theme if theme in ["plotly", "plotly_white", "ggplot2", "seaborn", "simple_white"] else "plotly"
         
-        # Tratar valores ausentes nas colunas selecionadas
-        chart_df = df.copy()
+        # Trabalhar apenas com as colunas usadas no gráfico (sem copiar as demais)
+        cols_to_check = list(dict.fromkeys(col for col in [x_col, y_col, color_col] if col is not None and col in df.columns))
+        chart_df = df[cols_to_check]
         
         # Remover valores nulos das colunas usadas no gráfico para evitar erros
-        cols_to_check = [x_col]
-        if y_col is not None:
-            cols_to_check.append(y_col)
-        if color_col is not None:
-            cols_to_check.append(color_col)
-            
-        chart_df = chart_df.dropna(subset=cols_to_check)
+        if chart_df.isna().to_numpy().any():
+            chart_df = chart_df.dropna()
         
         if chart_df.empty:
-            st.warning("Após remover valores ausentes, não há dados para exibir.")
+            feedback.warning("Após remover valores ausentes, não há dados para exibir.")
             return None
         
         # Criar o gráfico de acordo com o tipo selecionado
@@ -78,10 +90,23 @@ def create_chart(df, chart_type, x_col, y_col, color_col=None, title="Dashboard
             fig = px.bar(chart_df, x=x_col, y=y_col, color=color_col, title=title, template=template)
         
         elif chart_type == "Linha":
+            # Em séries grandes, reduzir os pontos no servidor preservando picos e vales
+            if len(chart_df) > DOWNSAMPLE_THRESHOLD_ROWS:
+                total_rows = len(chart_df)
+                chart_df = downsample_line_data(chart_df, x_col, y_col, color_col)
+                if len(chart_df) < total_rows:
+                    feedback.info(f"Série reduzida de {total_rows} para {len(chart_df)} pontos (mínimos e máximos preservados).")
             fig = px.line(chart_df, x=x_col, y=y_col, color=color_col, title=title, template=template)
         
         elif chart_type == "Dispersão":
-            fig = px.scatter(chart_df, x=x_col, y=y_col, color=color_col, title=title, template=template)
+            fig = None
+            # Em dados grandes, agregar em um mapa de densidade com os pontos isolados sobrepostos
+            if len(chart_df) > DOWNSAMPLE_THRESHOLD_ROWS:
+                fig = create_density_scatter(chart_df, x_col, y_col, color_col, title=title, template=template)
+                if fig is not None:
+                    feedback.info(f"{len(chart_df)} pontos agregados em mapa de densidade; pontos isolados exibidos individualmente.")
+            if fig is None:
+                fig = px.scatter(chart_df, x=x_col, y=y_col, color=color_col, title=title, template=template)
         
         elif chart_type == "Histograma":
             fig = px.histogram(chart_df, x=x_col, title=title, template=template)
@@ -91,50 +116,51 @@ def create_chart(df, chart_type, x_col, y_col, color_col=None, title="Dashboard
             try:
                 # Contar valores e preparar dados para pizza
                 if chart_df[x_col].nunique() > 10:
-                    st.warning(f"A coluna {x_col} tem muitos valores únicos ({chart_df[x_col].nunique()}). O gráfico de pizza pode ficar confuso.")
+                    feedback.warning(f"A coluna {x_col} tem muitos valores únicos ({chart_df[x_col].nunique()}). O gráfico de pizza pode ficar confuso.")
                 
                 # Agrupar dados se y_col for fornecido, caso contrário usar contagem
                 if y_col is not None and y_col in chart_df.columns:
                     # Somar valores de y agrupados por x
-                    grouped = chart_df.groupby(x_col)[y_col].sum().reset_index()
+                    grouped = chart_df.groupby(x_col, observed=True)[y_col].sum().reset_index()
                     fig = px.pie(grouped, values=y_col, names=x_col, title=title, template=template)
                 else:
                     # Contar ocorrências de cada valor em x_col
-                    counts = chart_df[x_col].value_counts().reset_index()
+                    counts = chart_df[x_col].value_counts()
+                    counts = counts[counts > 0].reset_index()
                     counts.columns = [x_col, 'count']
                     fig = px.pie(counts, values='count', names=x_col, title=title, template=template)
             except Exception as e:
-                st.error(f"Erro ao criar gráfico de pizza: {str(e)}")
+                feedback.error(f"Erro ao criar gráfico de pizza: {str(e)}")
                 return None
         
         elif chart_type == "Heatmap":
             # Correção para heatmap
             try:
                 if color_col is None:
-                    st.error("Para criar um heatmap, selecione uma coluna para colorir.")
+                    feedback.error("Para criar um heatmap, selecione uma coluna para colorir.")
                     return None
                 
                 # Criar tabela pivot agrupando os dados
                 if y_col is not None:
                     # Verificar se há dados suficientes para criar o pivot
-                    if chart_df[x_col].nunique() * chart_df[color_col].nunique() > 1000:
-                        st.warning("Dados muito grandes para heatmap. Limitando a amostra.")
+                    if not pre_aggregated and chart_df[x_col].nunique() * chart_df[color_col].nunique() > 1000:
+                        feedback.warning("Dados muito grandes para heatmap. Limitando a amostra.")
                         chart_df = chart_df.sample(min(1000, len(chart_df)))
                         
-                    pivot_table = pd.pivot_table(chart_df, values=y_col, index=x_col, columns=color_col, aggfunc='mean')
+                    pivot_table = pd.pivot_table(chart_df, values=y_col, index=x_col, columns=color_col, aggfunc='mean', observed=True)
                     fig = px.imshow(pivot_table, 
                                    labels=dict(x=color_col, y=x_col, color=y_col),
                                    title=title,
                                    template=template)
                 else:
-                    st.error("Para criar um heatmap, selecione uma coluna para o eixo Y.")
+                    feedback.error("Para criar um heatmap, selecione uma coluna para o eixo Y.")
                     return None
             except Exception as e:
-                st.error(f"Erro ao criar heatmap: {str(e)}")
+                feedback.error(f"Erro ao criar heatmap: {str(e)}")
                 return None
         
         else:
-            st.error(f"Tipo de gráfico não suportado: {chart_type}")
+            feedback.error(f"Tipo de gráfico não suportado: {chart_type}")
             return None
         
         # Adicionar layout responsivo
@@ -146,11 +172,106 @@ def create_chart(df, chart_type, x_col, y_col, color_col=None, title="Dashboard
         
         return fig
     except Exception as e:
-        st.error(f"Erro inesperado ao criar o gráfico: {str(e)}")
+        feedback.error(f"Erro inesperado ao criar o gráfico: {str(e)}")
         return None
 
-def configure_chart(df, chart_id):
-    """Interface para configurar um gráfico individual."""
+def build_chart_frame(df, x_col, y_col=None, color_col=None, filters=None, use_index=True):
+    """
+    Monta os dados de um gráfico: aplica os filtros e mantém apenas as colunas
+    usadas (x, y e cor). Sem filtros, retorna uma visão do DataFrame, sem cópia.
+    """
+    columns = [col for col in dict.fromkeys([x_col, y_col, color_col]) if col is not None and col in df.columns]
+    return filter_dataframe(df, filters or {}, use_index=use_index, columns=columns)
+
+def _option_index(options, value):
+    """Posição de um valor salvo entre as opções de um selectbox (0 se não estiver disponível)."""
+    return options.index(value) if value in options else 0
+
+def _x_date_format(df, x_col, profile=None):
+    """
+    Indica se a coluna X contém datas. Retorna (True, formato) para colunas de
+    texto com datas, (True, None) para colunas já convertidas e (False, None)
+    para as demais.
+    """
+    if pd.api.types.is_datetime64_any_dtype(df[x_col]):
+        return True, None
+    date_formats = date_formats_from_profile(profile) if profile else None
+    if date_formats is not None:
+        fmt = date_formats.get(x_col)
+    else:
+        fmt = infer_date_format(df[x_col])
+    return fmt is not None, fmt
+
+def configure_time_series(df, chart_id, x_col, profile=None, saved=None):
+    """
+    Opções de série temporal de um gráfico de linha: intervalo de agrupamento,
+    função de agregação e janela móvel (média, desvio padrão ou EWMA).
+
+    Returns:
+        Dicionário com as opções ('rule', 'function', 'window', 'window_size',
+        'date_format') ou None se X não é uma data ou o agrupamento está desligado
+    """
+    is_date, date_format = _x_date_format(df, x_col, profile)
+    if not is_date:
+        return None
+    
+    saved = saved or {}
+    st.write("⏱️ **Série temporal**")
+    if not st.checkbox("Agrupar por intervalo de tempo", value=bool(saved), key=f"ts_{chart_id}",
+                       help="Reduz a série a um ponto por intervalo antes de desenhar o gráfico."):
+        return None
+    
+    rule_labels = list(RESAMPLE_RULES)
+    window_labels = ["Nenhuma"] + list(WINDOW_FUNCTIONS)
+    saved_rule = next((label for label, rule in RESAMPLE_RULES.items() if rule == saved.get('rule')), "Hora")
+    saved_window = next((label for label, window in WINDOW_FUNCTIONS.items() if window == saved.get('window')), None)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        rule_label = st.selectbox("Intervalo", rule_labels, index=_option_index(rule_labels, saved_rule), key=f"ts_rule_{chart_id}")
+    with col2:
+        function = st.selectbox("Função por intervalo", RESAMPLE_FUNCTIONS,
+                                index=_option_index(RESAMPLE_FUNCTIONS, saved.get('function')), key=f"ts_func_{chart_id}")
+    col1, col2 = st.columns(2)
+    with col1:
+        window_label = st.selectbox("Janela móvel", window_labels,
+                                    index=_option_index(window_labels, saved_window), key=f"ts_window_{chart_id}")
+    window_size = saved.get('window_size', DEFAULT_WINDOW_SIZE)
+    if window_label != "Nenhuma":
+        with col2:
+            window_size = st.number_input("Tamanho da janela (intervalos)", min_value=2, max_value=1000,
+                                          value=window_size, key=f"ts_window_size_{chart_id}")
+    
+    return {
+        'rule': RESAMPLE_RULES[rule_label],
+        'function': function,
+        'window': WINDOW_FUNCTIONS.get(window_label),
+        'window_size': int(window_size),
+        'date_format': date_format
+    }
+
+def configure_chart(df, chart_id, profile=None, dataset_path=None, pushdown=False, data_key=None):
+    """
+    Interface para configurar um gráfico individual.
+    
+    Args:
+        df: DataFrame com os dados
+        chart_id: Identificador do gráfico
+        profile: Perfil de colunas do dataset (opcional). Quando informado, tipos
+            e valores distintos são lidos do perfil em vez de recalculados.
+        dataset_path: Caminho do dataset processado (opcional). Quando `df` é o
+            dataset sem alterações, agregações são respondidas pelos cubos.
+        pushdown: Indica que `df` é apenas uma prévia do dataset (arquivos
+            grandes). Os dados do gráfico são consultados no arquivo de
+            `dataset_path` (colunas usadas, filtros e amostragem aplicados na leitura).
+        data_key: Versão dos dados de `df` (opcional, ver dataset_cache_key).
+            Com o pré-processamento do gráfico, forma a chave das figuras em cache.
+    
+    Returns:
+        Dicionário com a configuração ('config'), a função que prepara os
+        dados do gráfico ('prepare_data') e a versão desses dados
+        ('data_key', None se desconhecida), ou None
+    """
     try:
         # Verificar se o DataFrame está vazio
         if df.empty:
@@ -166,11 +287,12 @@ def configure_chart(df, chart_id):
         # Amostrar dados para gráficos mais rápidos
         sample_data = st.checkbox("Amostrar dados (para datasets grandes)", key=f"sample_{chart_id}")
         sample_size = None
+        total_rows = profile['rows'] if pushdown and profile else len(df)
         if sample_data:
             sample_size = st.slider("Tamanho da amostra", 
                                   min_value=100, 
-                                  max_value=min(10000, len(df)), 
-                                  value=min(1000, len(df)), 
+                                  max_value=min(10000, total_rows), 
+                                  value=min(1000, total_rows), 
                                   step=100, 
                                   key=f"sample_size_{chart_id}")
         
@@ -201,43 +323,95 @@ def configure_chart(df, chart_id):
         apply_preprocessing = st.button("Aplicar Pré-processamento", key=f"apply_preprocess_{chart_id}")
         
         # Processar os dados conforme as opções selecionadas
-        processed_df = df.copy()
+        # (sem cópia: o índice de filtros fica associado ao DataFrame compartilhado)
+        processed_df = df
+        date_cols = []
+        date_schema = {}
+        # No modo de consulta, os dados do gráfico são lidos do arquivo (com amostragem opcional)
+        query_path = dataset_path if pushdown else None
+        query_sample_size = None
         
         if apply_preprocessing:
             try:
-                # Detectar e converter datas
-                if detect_dates:
-                    processed_df, date_cols = detect_date_columns(processed_df)
-                    if date_cols:
-                        st.success(f"Colunas de data detectadas e convertidas: {', '.join(date_cols)}")
+                with span("chart.preprocess", chart_id=chart_id):
+                    # Detectar e converter datas
+                    if detect_dates:
+                        date_formats = date_formats_from_profile(profile) if profile else None
+                        if date_formats is None:
+                            date_formats = infer_date_schema(processed_df)
+                        processed_df, date_cols = detect_date_columns(processed_df, date_formats)
+                        date_schema = {col: date_formats[col] for col in date_cols}
+                        if date_cols:
+                            st.success(f"Colunas de data detectadas e convertidas: {', '.join(date_cols)}")
                 
-                # Aplicar agregações se solicitado
-                if perform_agg and agg_config:
-                    processed_df = prepare_data_for_visualization(
-                        processed_df, 
-                        sample_size=sample_size,
-                        aggregation=agg_config
-                    )
-                    st.success(f"Dados agregados: {agg_config['column']} por {agg_config['group_by']} usando {agg_config['function']}")
-                # Aplicar amostragem se solicitado (sem agregação)
-                elif sample_data and sample_size:
-                    processed_df = prepare_data_for_visualization(
-                        processed_df,
-                        sample_size=sample_size
-                    )
-                    st.success(f"Amostra de {sample_size} linhas aplicada.")
+                    # Aplicar agregações se solicitado
+                    if perform_agg and agg_config:
+                        # Responder pelo cubo do dataset quando o agrupamento não usa colunas convertidas
+                        aggregated = None
+                        if dataset_path and agg_config['group_by'] not in date_cols:
+                            aggregated = query_rollup(
+                                dataset_path,
+                                [agg_config['group_by']],
+                                agg_config['column'],
+                                agg_config['function'],
+                                df=None if pushdown else df
+                            )
+                        if aggregated is None and pushdown:
+                            with span("chart.query", chart_id=chart_id):
+                                aggregated = execute_chart_query(dataset_path, ChartQuery.for_aggregation(agg_config))
+                            aggregated, converted = apply_date_schema(aggregated, date_schema)
+                            if converted:
+                                aggregated = aggregated.sort_values(agg_config['group_by'], ignore_index=True)
+                        if aggregated is not None:
+                            processed_df = prepare_data_for_visualization(aggregated, sample_size=sample_size)
+                            query_path = None
+                        else:
+                            processed_df = prepare_data_for_visualization(
+                                processed_df, 
+                                sample_size=sample_size,
+                                aggregation=agg_config
+                            )
+                        st.success(f"Dados agregados: {agg_config['column']} por {agg_config['group_by']} usando {agg_config['function']}")
+                    # Aplicar amostragem se solicitado (sem agregação)
+                    elif sample_data and sample_size:
+                        if pushdown:
+                            query_sample_size = sample_size
+                        else:
+                            processed_df = prepare_data_for_visualization(
+                                processed_df,
+                                sample_size=sample_size
+                            )
+                        st.success(f"Amostra de {sample_size} linhas aplicada.")
             except Exception as e:
                 st.error(f"Erro no pré-processamento: {str(e)}")
                 # Voltar ao DataFrame original em caso de erro
-                processed_df = df.copy()
+                processed_df = df
+                date_schema = {}
+                query_path = dataset_path if pushdown else None
+                query_sample_size = None
         
         # Proteger contra DataFrame vazio após pré-processamento
         if processed_df.empty:
             st.warning("O pré-processamento resultou em um conjunto de dados vazio. Usando dados originais.")
-            processed_df = df.copy()
+            processed_df = df
+        
+        # Versão dos dados do gráfico: a do dataset mais as opções de pré-processamento aplicadas
+        chart_data_key = data_key
+        if data_key is not None and (processed_df is not df or date_schema or query_sample_size):
+            chart_data_key = json.dumps([
+                data_key, detect_dates, sample_size if sample_data else None,
+                agg_config if perform_agg else None, query_sample_size
+            ], sort_keys=True, default=str)
+        
+        # O perfil e os cubos descrevem apenas os dados originais (sem pré-processamento);
+        # no modo de consulta, o perfil ainda fornece os valores dos filtros
+        if apply_preprocessing:
+            if query_path is None:
+                profile = None
+            dataset_path = None
         
         # Obter tipos de colunas para o DataFrame processado
-        col_types = get_column_types(processed_df)
+        col_types = column_types_from_profile(profile) if profile and not apply_preprocessing else get_column_types(processed_df)
         
         # Interface para seleção de tipo de gráfico
         chart_types = ["Barra", "Linha", "Dispersão", "Histograma", "Pizza", "Heatmap"]
@@ -248,6 +422,10 @@ def configure_chart(df, chart_id):
         if current_chart and 'config' in current_chart:
             default_type = current_chart['config'].get('type', 'Barra')
         
+        # Colunas e filtros salvos restauram os widgets de gráficos que não foram
+        # exibidos na execução anterior (ex.: abas não selecionadas)
+        saved_config = current_chart.get('config', {}) if current_chart else {}
+        
         chart_type = st.selectbox("Selecione o tipo de gráfico", 
                                chart_types, 
                                index=chart_types.index(default_type) if default_type in chart_types else 0,
@@ -270,7 +448,9 @@ def configure_chart(df, chart_id):
                 st.warning("Não há colunas disponíveis para o eixo X.")
                 return None
                 
-            x_col = st.selectbox("Selecione a coluna para o eixo X", x_options, key=f"x_col_{chart_id}")
+            x_col = st.selectbox("Selecione a coluna para o eixo X", x_options, 
+                               index=_option_index(x_options, saved_config.get('x_col')),
+                               key=f"x_col_{chart_id}")
         
         with col2:
             # Opções para eixo Y (não necessário para alguns gráficos)
@@ -280,7 +460,9 @@ def configure_chart(df, chart_id):
                     st.warning("Não há colunas numéricas disponíveis para o eixo Y.")
                     return None
                     
-                y_col = st.selectbox("Selecione a coluna para o eixo Y", y_options, key=f"y_col_{chart_id}")
+                y_col = st.selectbox("Selecione a coluna para o eixo Y", y_options, 
+                                   index=_option_index(y_options, saved_config.get('y_col')),
+                                   key=f"y_col_{chart_id}")
             else:
                 y_col = None
         
@@ -291,22 +473,44 @@ def configure_chart(df, chart_id):
                 st.warning("Não há colunas categóricas disponíveis para colorir.")
                 return None
                 
-            color_col = st.selectbox("Selecione a coluna para colunas do heatmap", color_options, key=f"color_col_{chart_id}")
+            color_col = st.selectbox("Selecione a coluna para colunas do heatmap", color_options, 
+                                   index=_option_index(color_options, saved_config.get('color_col')),
+                                   key=f"color_col_{chart_id}")
         else:
             color_options = [None] + col_types['categorical']
-            color_col = st.selectbox("Colorir por (opcional)", color_options, key=f"color_col_{chart_id}")
+            color_col = st.selectbox("Colorir por (opcional)", color_options, 
+                                   index=_option_index(color_options, saved_config.get('color_col')),
+                                   key=f"color_col_{chart_id}")
+        
+        # Série temporal: agrupamento por intervalo de tempo e janela móvel (gráficos de linha com X de data)
+        time_series = None
+        if chart_type == "Linha":
+            time_series = configure_time_series(processed_df, chart_id, x_col, profile, saved_config.get('time_series'))
         
         # Opções de filtragem
         filters = {}
         st.write("🔍 **Filtros**")
         # Verificar se há colunas categóricas
         if col_types['categorical']:
-            # Criar filtros para colunas categóricas
-            for i, col in enumerate(col_types['categorical'][:3]):  # Limitar a 3 filtros para simplicidade
+            # Sem pré-processamento, os valores vêm do perfil ou do índice de bitmaps do dataset
+            filter_index = get_bitmap_index(processed_df) if not apply_preprocessing and query_path is None else None
+            
+            # Criar filtros para colunas categóricas com poucos valores únicos
+            saved_filters = saved_config.get('filters') or {}
+            for i, col in enumerate(col_types['categorical']):
                 try:
-                    unique_values = processed_df[col].unique().tolist()
-                    if len(unique_values) < 10:  # Apenas mostrar filtro se houver poucos valores únicos
-                        selected = st.multiselect(f"Filtrar {col}", unique_values, default=unique_values, key=f"filter_{i}_{chart_id}")
+                    if profile and not profile['columns'][col]['distinct_capped']:
+                        unique_values = profile['columns'][col]['values']
+                    elif filter_index is not None and col in filter_index.values:
+                        unique_values = filter_index.values[col]
+                    elif filter_index is not None or query_path is not None:
+                        continue  # Coluna com valores demais para o índice (ou desconhecidos na prévia)
+                    else:
+                        unique_values = processed_df[col].unique().tolist()
+                    
+                    if len(unique_values) <= FILTER_MAX_VALUES:
+                        default_values = [value for value in saved_filters[col] if value in unique_values] if col in saved_filters else unique_values
+                        selected = st.multiselect(f"Filtrar {col}", unique_values, default=default_values, key=f"filter_{i}_{chart_id}")
                         if selected and len(selected) < len(unique_values):
                             filters[col] = selected
                 except Exception as e:
@@ -314,19 +518,79 @@ def configure_chart(df, chart_id):
         else:
             st.info("Não há colunas categóricas disponíveis para filtrar.")
         
-        # Aplicar filtros
-        try:
-            filtered_df = processed_df.copy()
-            for col, values in filters.items():
-                filtered_df = filtered_df[filtered_df[col].isin(values)]
+        def prepare_data(feedback=st):
+            """Aplica filtros (ou consulta os cubos/o arquivo) e retorna os dados do gráfico."""
+            # Pizza (soma de Y) e heatmap (média de Y) sobre o dataset original são respondidos pelos cubos
+            # (o heatmap sem coluna de cor segue o caminho comum, que exibe a orientação ao usuário)
+            aggregated = None
+            use_rollup = chart_type == "Heatmap" and color_col is not None or chart_type == "Pizza" and color_col is None
+            if dataset_path and y_col is not None and use_rollup:
+                group_by = [x_col, color_col] if chart_type == "Heatmap" else [x_col]
+                try:
+                    with span("chart.rollup", chart_id=chart_id, chart_type=chart_type):
+                        aggregated = query_rollup(
+                            dataset_path, group_by, y_col,
+                            'mean' if chart_type == "Heatmap" else 'sum',
+                            filters, df=None if pushdown else df
+                        )
+                except Exception:
+                    # Falha no cubo: os dados são preparados pelo caminho comum (memória ou consulta ao arquivo)
+                    aggregated = None
+            
+            # Aplicar filtros e manter apenas as colunas usadas no gráfico
+            # (filtros efetivamente aplicados: descartados quando o resultado fica vazio)
+            applied_filters = filters
+            try:
+                if aggregated is not None and not aggregated.empty:
+                    filtered_df = aggregated
+                elif query_path is not None:
+                    aggregated = None
+                    with span("chart.query", chart_id=chart_id, chart_type=chart_type, filters=len(filters)):
+                        query = ChartQuery.for_chart(x_col, y_col, color_col, filters, query_sample_size)
+                        filtered_df = execute_chart_query(query_path, query)
+                        if filtered_df.empty and filters:
+                            feedback.warning("Os filtros aplicados resultam em um conjunto de dados vazio. Usando dados sem filtros.")
+                            applied_filters = {}
+                            query = ChartQuery.for_chart(x_col, y_col, color_col, None, query_sample_size)
+                            filtered_df = execute_chart_query(query_path, query)
+                    filtered_df, _ = apply_date_schema(filtered_df, date_schema)
+                else:
+                    aggregated = None
+                    with span("chart.filter", chart_id=chart_id, filters=len(filters)):
+                        filtered_df = build_chart_frame(processed_df, x_col, y_col, color_col, filters, use_index=not apply_preprocessing)
+                    
+                    # Proteger contra DataFrame vazio após filtros
+                    if filtered_df.empty:
+                        feedback.warning("Os filtros aplicados resultam em um conjunto de dados vazio. Usando dados sem filtros.")
+                        applied_filters = {}
+                        filtered_df = build_chart_frame(processed_df, x_col, y_col, color_col)
+            except Exception as e:
+                feedback.error(f"Erro ao aplicar filtros: {str(e)}")
+                aggregated = None
+                applied_filters = {}
+                filtered_df = build_chart_frame(processed_df, x_col, y_col, color_col)
             
-            # Proteger contra DataFrame vazio após filtros
-            if filtered_df.empty:
-                st.warning("Os filtros aplicados resultam em um conjunto de dados vazio. Usando dados sem filtros.")
-                filtered_df = processed_df.copy()
-        except Exception as e:
-            st.error(f"Erro ao aplicar filtros: {str(e)}")
-            filtered_df = processed_df.copy()
+            # Reduzir a série a um ponto por intervalo antes de montar a figura
+            if time_series and aggregated is None:
+                try:
+                    total_rows = len(filtered_df)
+                    # Série em cache pela versão dos dados do gráfico e pelos filtros aplicados
+                    series_key = None
+                    if chart_data_key is not None:
+                        series_key = json.dumps([
+                            chart_data_key,
+                            {col: sorted(map(str, values)) for col, values in (applied_filters or {}).items()}
+                        ], sort_keys=True)
+                    with span("chart.timeseries", chart_id=chart_id, rows=total_rows):
+                        filtered_df = prepare_data_for_visualization(filtered_df, time_series={
+                            **time_series, 'time_column': x_col, 'value_column': y_col, 'group_by': color_col,
+                            'cache_key': series_key
+                        })
+                    feedback.info(f"Série agrupada por intervalo de tempo: {total_rows} linhas → {len(filtered_df)} pontos.")
+                except Exception as e:
+                    feedback.error(f"Erro ao agrupar a série temporal: {str(e)}")
+            
+            return filtered_df, aggregated is not None
         
         # Opções de aparência do gráfico
         st.write("🎨 **Aparência**")
@@ -366,7 +630,8 @@ def configure_chart(df, chart_id):
             'title': chart_title,
             'filters': filters,
             'theme': color_theme,
-            'height': chart_height
+            'height': chart_height,
+            'time_series': time_series
         }
         
         # Atualizar a configuração no objeto de gráfico
@@ -375,9 +640,11 @@ def configure_chart(df, chart_id):
                 chart['config'] = chart_config
                 break
         
+        # Os dados são preparados depois, em paralelo com os demais gráficos (ver render_charts)
         return {
             'config': chart_config,
-            'df': filtered_df
+            'prepare_data': prepare_data,
+            'data_key': chart_data_key
         }
     except Exception as e:
         st.error(f"Erro ao configurar o gráfico: {str(e)}")
@@ -435,8 +702,12 @@ def import_dashboard_config(config_file):
         st.error(f"Erro ao importar configuração: {str(e)}")
         return False
 
-def dashboard_options(df):
-    """Interface para configurar e exibir múltiplos dashboards."""
+def dashboard_options(df, profile=None, dataset_path=None, pushdown=False, data_key=None):
+    """
+    Interface para configurar e exibir múltiplos dashboards.
+    `data_key` identifica a versão dos dados de `df` (ver dataset_cache_key) e
+    é usada no cache de figuras; sem ela, as figuras não são reaproveitadas.
+    """
     
     st.subheader("Dashboard Interativo")
     
@@ -601,39 +872,22 @@ def dashboard_options(df):
         else:
             view_tabs = False
         
+        # Os widgets de cada gráfico são exibidos primeiro; os gráficos são
+        # preparados juntos, em paralelo, e exibidos nos lugares reservados
+        batch = RenderBatch()
+        
         if view_tabs:
-            # Criar tabs para cada gráfico
-            tabs = st.tabs([f"Gráfico #{i+1}" for i in range(len(visible_charts))])
-            
-            for i, (tab, chart) in enumerate(zip(tabs, visible_charts)):
-                with tab:
-                    st.markdown(f"### Configuração do Gráfico #{i+1}")
-                    chart_data = configure_chart(df, chart['id'])
-                    
-                    # Se o gráfico foi configurado corretamente, exibi-lo
-                    if chart_data:
-                        config = chart_data['config']
-                        filtered_df = chart_data['df']
-                        
-                        # Criar e exibir o gráfico
-                        create_and_display_chart(config, filtered_df)
+            # Apenas o gráfico selecionado é configurado e calculado
+            tab_labels = [f"Gráfico #{i+1}" for i in range(len(visible_charts))]
+            active_tab = st.radio("Gráfico exibido", tab_labels, horizontal=True, key="active_chart_tab")
+            i = tab_labels.index(active_tab) if active_tab in tab_labels else 0
+            chart_panel(df, visible_charts[i]['id'], f"### Configuração do Gráfico #{i+1}", profile, dataset_path, pushdown, batch, sections=False, data_key=data_key)
         else:
             # Criar layout de colunas para exibir gráficos
             if compact_mode:
                 # No modo compacto, cada gráfico ocupa toda a largura
                 for i, chart in enumerate(visible_charts):
-                    st.markdown(f"### Gráfico #{i+1}")
-                    st.markdown("#### Configuração")
-                    chart_data = configure_chart(df, chart['id'])
-                    
-                    # Se o gráfico foi configurado corretamente, exibi-lo
-                    if chart_data:
-                        config = chart_data['config']
-                        filtered_df = chart_data['df']
-                        
-                        st.markdown("#### Visualização")
-                        # Criar e exibir o gráfico
-                        create_and_display_chart(config, filtered_df)
+                    chart_panel(df, chart['id'], f"### Gráfico #{i+1}", profile, dataset_path, pushdown, batch, data_key=data_key)
                     
                     # Adicionar separador entre gráficos
                     if i < len(visible_charts) - 1:
@@ -648,93 +902,163 @@ def dashboard_options(df):
                         if idx < len(visible_charts):
                             chart = visible_charts[idx]
                             with cols[j]:
-                                st.markdown(f"### Gráfico #{idx+1}")
-                                st.markdown("#### Configuração")
-                                chart_data = configure_chart(df, chart['id'])
-                                
-                                # Se o gráfico foi configurado corretamente, exibi-lo
-                                if chart_data:
-                                    config = chart_data['config']
-                                    filtered_df = chart_data['df']
-                                    
-                                    st.markdown("#### Visualização")
-                                    # Criar e exibir o gráfico
-                                    create_and_display_chart(config, filtered_df)
+                                chart_panel(df, chart['id'], f"### Gráfico #{idx+1}", profile, dataset_path, pushdown, batch, data_key=data_key)
+        
+        render_charts(batch.pending)
+        batch.closed = True
     else:
         st.info("Clique em 'Adicionar Novo Gráfico' para começar a criar seu dashboard.")
 
-def create_and_display_chart(config, filtered_df):
-    """Auxiliar para criar e exibir um gráfico com base na configuração."""
+@st.fragment
+def chart_panel(df, chart_id, heading, profile=None, dataset_path=None, pushdown=False, batch=None, sections=True, data_key=None):
+    """
+    Configuração e visualização de um gráfico, executadas como fragmento:
+    alterar os widgets de um gráfico reexecuta apenas o seu painel, sem
+    recalcular os demais.
+
+    Na execução completa da página, o gráfico entra no lote preparado em
+    paralelo ao final (`batch`); nas reexecuções do fragmento, o lote já foi
+    encerrado e o gráfico é preparado e exibido imediatamente.
+    """
+    st.markdown(heading)
+    if sections:
+        st.markdown("#### Configuração")
+    chart_data = configure_chart(df, chart_id, profile, dataset_path, pushdown, data_key)
+    
+    # Se o gráfico foi configurado corretamente, reservar seu lugar
+    if chart_data:
+        if sections:
+            st.markdown("#### Visualização")
+        container = st.container()
+        if batch is not None and not batch.closed:
+            batch.pending.append((container, chart_data))
+        else:
+            render_charts([(container, chart_data)])
+
+def _figure_config(config):
+    """Configuração usada na chave da figura (o histograma não usa a coluna Y)."""
+    return {**config, 'y_col': None} if config.get('type') == "Histograma" else config
+
+def build_chart_figure(config, filtered_df, pre_aggregated=False, feedback=st, data_key=None, checked=False):
+    """
+    Cria (ou reutiliza do cache) a figura de um gráfico configurado.
+    Não exibe nada: avisos e erros são enviados para `feedback`. Sem
+    `data_key` (versão dos dados), a figura não é armazenada em cache.
+
+    Returns:
+        Figura Plotly ou None
+    """
     try:
         if filtered_df.empty:
-            st.warning("Não há dados disponíveis para gerar o gráfico.")
-            return
+            feedback.warning("Não há dados disponíveis para gerar o gráfico.")
+            return None
             
         # Verificar se a configuração é válida
         if not config or not isinstance(config, dict):
-            st.error("Configuração de gráfico inválida.")
-            return
+            feedback.error("Configuração de gráfico inválida.")
+            return None
             
         # Verificar se o tipo de gráfico está definido
         if 'type' not in config:
-            st.error("Tipo de gráfico não especificado na configuração.")
-            return
+            feedback.error("Tipo de gráfico não especificado na configuração.")
+            return None
             
         # Verificar se a coluna X está definida
         if 'x_col' not in config or config['x_col'] not in filtered_df.columns:
-            st.error(f"Coluna do eixo X não encontrada: {config.get('x_col', 'não especificada')}")
-            return
+            feedback.error(f"Coluna do eixo X não encontrada: {config.get('x_col', 'não especificada')}")
+            return None
             
-        # Criar gráfico de acordo com o tipo
+        # Definir parâmetros de acordo com o tipo
         if config['type'] == "Histograma":
-            fig = create_chart(
-                filtered_df, 
-                config['type'], 
-                config['x_col'], 
-                None, 
-                config.get('color_col'), 
-                config.get('title', "Histograma"),
-                config.get('theme', 'plotly'),
-                config.get('height', 500)
-            )
+            y_col = None
+            default_title = "Histograma"
         elif config['type'] == "Pizza":
-            fig = create_chart(
-                filtered_df, 
-                config['type'], 
-                config['x_col'], 
-                config.get('y_col'), 
-                config.get('color_col'), 
-                config.get('title', "Gráfico de Pizza"),
-                config.get('theme', 'plotly'),
-                config.get('height', 500)
-            )
+            y_col = config.get('y_col')
+            default_title = "Gráfico de Pizza"
         else:
             # Para outros tipos de gráfico, precisamos da coluna Y
             if 'y_col' not in config or config['y_col'] not in filtered_df.columns:
-                st.error(f"Coluna do eixo Y não encontrada ou não especificada: {config.get('y_col', 'não especificada')}")
-                return
-                
-            fig = create_chart(
-                filtered_df, 
-                config['type'], 
-                config['x_col'], 
-                config['y_col'], 
-                config.get('color_col'), 
-                config.get('title', f"Gráfico {config['type']}"),
-                config.get('theme', 'plotly'),
-                config.get('height', 500)
+                feedback.error(f"Coluna do eixo Y não encontrada ou não especificada: {config.get('y_col', 'não especificada')}")
+                return None
+            y_col = config['y_col']
+            default_title = f"Gráfico {config['type']}"
+        
+        # Reutilizar a figura se a configuração e os dados não mudaram
+        def build_figure():
+            with span("chart.build", chart_type=config['type'], rows=len(filtered_df)):
+                return create_chart(
+                    filtered_df, 
+                    config['type'], 
+                    config['x_col'], 
+                    y_col, 
+                    config.get('color_col'), 
+                    config.get('title', default_title),
+                    config.get('theme', 'plotly'),
+                    config.get('height', 500),
+                    pre_aggregated,
+                    feedback
+                )
+        
+        with span("chart.figure", chart_type=config['type'], rows=len(filtered_df)):
+            fig = get_or_create_figure(
+                _figure_config(config), data_key, build_figure, checked, getattr(feedback, 'messages', None)
             )
         
-        # Exibir o gráfico se foi criado com sucesso
-        if fig:
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.error("Não foi possível criar o gráfico. Verifique as configurações.")
+        if not fig:
+            feedback.error("Não foi possível criar o gráfico. Verifique as configurações.")
+        return fig
     
     except Exception as e:
-        st.error(f"Erro ao criar o gráfico: {str(e)}")
+        feedback.error(f"Erro ao criar o gráfico: {str(e)}")
         # Adicionando mais detalhes para facilitar a depuração
-        st.error(f"Tipo de gráfico: {config.get('type', 'não especificado')}")
-        st.error(f"Coluna X: {config.get('x_col', 'não especificada')}")
-        if config['type'] != "Histograma":
-            st.error(f"Coluna Y: {config.get('y_col', 'não especificada')}") 
\ No newline at end of file
+        feedback.error(f"Tipo de gráfico: {config.get('type', 'não especificado')}")
+        feedback.error(f"Coluna X: {config.get('x_col', 'não especificada')}")
+        if config.get('type') != "Histograma":
+            feedback.error(f"Coluna Y: {config.get('y_col', 'não especificada')}")
+        return None
+
+def display_chart_figure(config, fig):
+    """Exibe uma figura criada por build_chart_figure."""
+    if fig:
+        with span("chart.render", chart_type=config['type']):
+            st.plotly_chart(fig, use_container_width=True)
+
+def create_and_display_chart(config, filtered_df, pre_aggregated=False):
+    """Auxiliar para criar e exibir um gráfico com base na configuração."""
+    display_chart_figure(config, build_chart_figure(config, filtered_df, pre_aggregated))
+
+def _render_task(chart_data):
+    """Tarefa executada no pool: prepara os dados e a figura de um gráfico."""
+    def task():
+        feedback = DeferredMessages()
+        # Figura em cache para a configuração e a versão dos dados: nem os dados são preparados,
+        # e os avisos da preparação guardados com a figura são exibidos novamente
+        data_key = chart_data.get('data_key')
+        cached = get_cached_figure(_figure_config(chart_data['config']), data_key)
+        if cached is not None:
+            fig, messages = cached
+            feedback.messages.extend(messages)
+            return fig, feedback
+        filtered_df, pre_aggregated = chart_data['prepare_data'](feedback)
+        fig = build_chart_figure(chart_data['config'], filtered_df, pre_aggregated, feedback, data_key, checked=data_key is not None)
+        return fig, feedback
+    return task
+
+def render_charts(pending):
+    """
+    Prepara os gráficos configurados em paralelo e os exibe na ordem, cada
+    um no seu contêiner. A página leva aproximadamente o tempo do gráfico
+    mais lento, em vez da soma de todos.
+
+    Args:
+        pending: Lista de tuplas (contêiner, resultado de configure_chart)
+    """
+    tasks = [_render_task(chart_data) for _, chart_data in pending]
+    for (container, chart_data), (result, error) in zip(pending, run_render_tasks(tasks)):
+        with container:
+            if error is not None:
+                st.error(f"Erro ao criar o gráfico: {str(error)}")
+                continue
+            fig, feedback = result
+            feedback.replay()
+            display_chart_figure(chart_data['config'], fig)
\ No newline at end of file
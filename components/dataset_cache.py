@@ -0,0 +1,167 @@
+import os
+import threading
+from collections import OrderedDict
+import streamlit as st
+from components.storage import read_dataset, resolve_dataset_path, get_storage_path, dataset_signature
+
+# Orçamento de memória padrão do cache (pode ser ajustado pela variável de ambiente)
+DEFAULT_CACHE_MB = int(os.environ.get("DATASET_CACHE_MAX_MB", "1024"))
+
+class DatasetCache:
+    """
+    Cache de DataFrames compartilhado por todas as sessões do servidor.
+
+    As entradas são identificadas pelo caminho do arquivo e pelas colunas lidas,
+    e validadas pela data de modificação e tamanho do arquivo. Quando o orçamento
+    de memória é excedido, as entradas menos usadas recentemente são descartadas.
+
+    Os DataFrames retornados são compartilhados e não devem ser modificados.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _file_signature(path):
+        return dataset_signature(path)
+
+    @staticmethod
+    def _make_key(path, columns):
+        return (os.path.abspath(path), tuple(columns) if columns is not None else None)
+
+    def _lookup(self, key, signature):
+        """Retorna o DataFrame em cache se a entrada ainda for válida (requer o lock)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry['signature'] != signature:
+            self._remove(key)
+            self.invalidations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry['df']
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry['size']
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self.current_bytes -= entry['size']
+            self.evictions += 1
+
+    def get(self, file_path, columns=None):
+        """
+        Retorna o dataset do cache ou o carrega do disco.
+
+        Args:
+            file_path: Caminho do arquivo processado
+            columns: Lista de colunas a ler (opcional)
+
+        Returns:
+            DataFrame (compartilhado, somente leitura)
+        """
+        path = resolve_dataset_path(file_path)
+        key = self._make_key(path, columns)
+        signature = self._file_signature(path)
+
+        with self._lock:
+            df = self._lookup(key, signature)
+            if df is not None:
+                self.hits += 1
+                return df
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Apenas uma sessão carrega o arquivo; as demais aguardam e reutilizam o resultado
+        with load_lock:
+            with self._lock:
+                df = self._lookup(key, signature)
+                if df is not None:
+                    self.hits += 1
+                    return df
+                self.misses += 1
+
+            try:
+                df = read_dataset(path, columns=columns)
+                size = int(df.memory_usage(index=True, deep=True).sum())
+
+                with self._lock:
+                    if size <= self.max_bytes:
+                        self._remove(key)
+                        self._entries[key] = {'df': df, 'size': size, 'signature': signature}
+                        self.current_bytes += size
+                        self._evict()
+            finally:
+                with self._lock:
+                    self._load_locks.pop(key, None)
+
+        return df
+
+    def invalidate(self, file_path):
+        """Remove do cache todas as entradas de um arquivo."""
+        path = os.path.abspath(get_storage_path(file_path))
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        """Esvazia o cache."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Retorna os contadores do cache."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'current_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+@st.cache_resource
+def get_dataset_cache():
+    """Retorna a instância única do cache de datasets do processo."""
+    return DatasetCache(DEFAULT_CACHE_MB * 1024 * 1024)
+
+def load_dataset(file_path, columns=None):
+    """Carrega um dataset processado usando o cache compartilhado."""
+    return get_dataset_cache().get(file_path, columns=columns)
+
+def display_cache_stats():
+    """Exibe os contadores do cache de datasets (painel de administração)."""
+    cache = get_dataset_cache()
+    stats = cache.stats()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Acertos", stats['hits'])
+    with col2:
+        st.metric("Falhas", stats['misses'])
+    with col3:
+        st.metric("Descartes", stats['evictions'])
+
+    used_mb = stats['current_bytes'] / (1024 * 1024)
+    max_mb = stats['max_bytes'] / (1024 * 1024)
+    st.write(f"**Entradas:** {stats['entries']}")
+    st.write(f"**Memória:** {used_mb:.1f} MB de {max_mb:.0f} MB")
+    st.write(f"**Invalidações:** {stats['invalidations']}")
+
+    if st.button("Limpar cache de dados", key="clear_dataset_cache"):
+        cache.clear()
+        st.success("Cache de dados limpo.")
\ No newline at end of file
@@ -0,0 +1,257 @@
+import json
+import math
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+import streamlit as st
+from components.content_store import get_processed_index
+from components.file_processor import build_dataset_metadata
+from components.storage import get_storage_path, STORAGE_EXTENSION
+
+# Catálogo dos datasets processados (compartilhado entre sessões e reinícios do servidor)
+DATASET_REGISTRY_DB = os.environ.get("DATASET_REGISTRY_DB", os.path.join("data", "registry.db"))
+
+# Número de datasets por página nas listagens
+DATASET_PAGE_SIZE = int(os.environ.get("DATASET_PAGE_SIZE", "20"))
+
+# Pasta dos datasets processados e usuário registrado como dono dos datasets anteriores ao catálogo
+PROCESSED_DATA_DIR = "data"
+ORPHAN_DATASET_OWNER = os.environ.get("ORPHAN_DATASET_OWNER", "admin")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    owner TEXT NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    content_hash TEXT,
+    schema TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    columns INTEGER NOT NULL,
+    partitions INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (owner, name)
+);
+CREATE INDEX IF NOT EXISTS idx_datasets_owner_updated ON datasets (owner, updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_datasets_updated ON datasets (updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_datasets_content_hash ON datasets (content_hash);
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def _row_to_dataset(row):
+    dataset = dict(row)
+    dataset['schema'] = json.loads(dataset['schema'])
+    dataset['metadata'] = json.loads(dataset['metadata'])
+    return dataset
+
+class DatasetRegistry:
+    """
+    Catálogo persistente (SQLite) dos datasets processados: caminho, hash do
+    conteúdo de origem, esquema, metadados, número de linhas, dono e datas.
+    Substitui a lista mantida apenas na sessão, de modo que os datasets
+    continuam disponíveis em novas sessões sem novo processamento.
+
+    O catálogo é compartilhado: todos os usuários listam todos os datasets,
+    e o dono é um metadado (usado no filtro "somente meus" e para restringir
+    os acréscimos ao próprio usuário).
+
+    Cada operação abre sua própria conexão: o catálogo é usado pelas threads
+    do servidor e pelos processos de fundo ao mesmo tempo.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def register(self, owner, name, path, metadata, content_hash=None):
+        """
+        Registra (ou atualiza) um dataset de um usuário. A data de criação é
+        mantida quando o dataset já existe (ex.: após um acréscimo).
+
+        Args:
+            owner: Usuário dono do dataset
+            name: Nome do dataset (nome do arquivo enviado)
+            path: Caminho do dataset processado
+            metadata: Metadados do processamento
+            content_hash: Hash do arquivo de origem (None se o dataset reúne vários arquivos)
+        """
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO datasets (owner, name, path, content_hash, schema, metadata, rows, columns, partitions, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (owner, name) DO UPDATE SET
+                    path = excluded.path,
+                    content_hash = excluded.content_hash,
+                    schema = excluded.schema,
+                    metadata = excluded.metadata,
+                    rows = excluded.rows,
+                    columns = excluded.columns,
+                    partitions = excluded.partitions,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    owner, name, path, content_hash,
+                    json.dumps(metadata.get('dtypes', {})), json.dumps(metadata),
+                    metadata['rows'], metadata['columns'], metadata.get('partitions', 1),
+                    now, now
+                )
+            )
+
+    def get(self, owner, name):
+        """Retorna um dataset (dicionário) ou None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM datasets WHERE owner = ? AND name = ?", (owner, name)).fetchone()
+        return _row_to_dataset(row) if row is not None else None
+
+    def names(self, owner):
+        """Nomes dos datasets de um usuário (do mais recente para o mais antigo)."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT name FROM datasets WHERE owner = ? ORDER BY updated_at DESC", (owner,)).fetchall()
+        return [row['name'] for row in rows]
+
+    @staticmethod
+    def _where(owner, search):
+        clauses, params = ["1 = 1"], []
+        if owner is not None:
+            clauses.append("owner = ?")
+            params.append(owner)
+        if search:
+            clauses.append("instr(lower(name), lower(?)) > 0")
+            params.append(search)
+        return " AND ".join(clauses), params
+
+    def count(self, owner=None, search=None):
+        """Número de datasets (de todos os usuários ou só de `owner`, opcionalmente filtrados pelo nome)."""
+        clause, params = self._where(owner, search)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM datasets WHERE {clause}", params).fetchone()[0]
+
+    def list(self, owner=None, offset=0, limit=DATASET_PAGE_SIZE, search=None):
+        """Uma página dos datasets (de todos os usuários ou só de `owner`), do mais recente para o mais antigo."""
+        clause, params = self._where(owner, search)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM datasets WHERE {clause} ORDER BY updated_at DESC, name LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return [_row_to_dataset(row) for row in rows]
+
+    def is_shared(self, owner, name):
+        """
+        Indica se o caminho do dataset também é usado por outro registro do
+        catálogo ou pelo índice de processamentos (conteúdo deduplicado).
+        """
+        dataset = self.get(owner, name)
+        if dataset is None:
+            return False
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM datasets WHERE path = ? AND NOT (owner = ? AND name = ?) LIMIT 1",
+                (dataset['path'], owner, name)
+            ).fetchone()
+        if row is not None:
+            return True
+        path = os.path.abspath(get_storage_path(dataset['path']))
+        return path in {os.path.abspath(get_storage_path(p)) for p in get_processed_index().paths()}
+
+    def paths(self):
+        """Caminhos (absolutos, no formato colunar) de todos os datasets registrados."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT path FROM datasets").fetchall()
+        return {os.path.abspath(get_storage_path(row['path'])) for row in rows}
+
+    def import_orphans(self, data_dir, owner):
+        """
+        Registra, uma única vez, os datasets processados de `data_dir` gravados
+        antes do catálogo (a lista de arquivos era mantida apenas na sessão).
+        O dono registrado é `owner` (os datasets continuam visíveis a todos
+        os usuários); os já registrados e os resultados
+        mantidos pelo índice de processamentos são ignorados. Os metadados
+        são calculados lendo cada dataset em blocos.
+
+        Returns:
+            Número de datasets registrados
+        """
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM settings WHERE key = 'orphans_imported'").fetchone() is not None:
+                return 0
+
+        known = self.paths() | {os.path.abspath(get_storage_path(path)) for path in get_processed_index().paths()}
+        imported = 0
+        names = sorted(os.listdir(data_dir)) if os.path.isdir(data_dir) else []
+        for name in names:
+            base_name, extension = os.path.splitext(name)
+            if name.startswith(".") or "_processed_" not in base_name:
+                continue
+            if extension.lower() == ".csv" and base_name + STORAGE_EXTENSION in names:
+                # CSV antigo já migrado: o dataset é o arquivo Parquet
+                continue
+            if extension.lower() not in (STORAGE_EXTENSION, ".csv"):
+                continue
+            path = os.path.join(data_dir, name)
+            if os.path.abspath(get_storage_path(path)) in known:
+                continue
+            try:
+                metadata = build_dataset_metadata(path)
+            except Exception:
+                # Arquivo ilegível (ex.: gravação interrompida): não é um dataset
+                continue
+            if self.get(owner, name) is None:
+                self.register(owner, name, get_storage_path(path), metadata)
+                imported += 1
+
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('orphans_imported', ?)", (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+        return imported
+
+@st.cache_resource
+def get_dataset_registry():
+    """Retorna a instância única do catálogo de datasets (com os datasets antigos importados)."""
+    registry = DatasetRegistry(DATASET_REGISTRY_DB)
+    registry.import_orphans(PROCESSED_DATA_DIR, ORPHAN_DATASET_OWNER)
+    return registry
+
+def dataset_page_selector(owner, key):
+    """
+    Exibe a busca por nome, o filtro "somente meus" e a seleção de página
+    de uma listagem de datasets (por padrão, os de todos os usuários).
+
+    Args:
+        owner: Usuário atual (usado no filtro "somente meus")
+        key: Prefixo das chaves dos widgets
+
+    Returns:
+        Tupla (datasets da página selecionada, total de datasets encontrados)
+    """
+    registry = get_dataset_registry()
+    search = st.text_input("Buscar dataset", key=f"{key}_search", placeholder="Nome do arquivo")
+    only_mine = st.checkbox("Somente meus datasets", key=f"{key}_mine")
+    owner = owner if only_mine else None
+    total = registry.count(owner, search)
+    pages = max(1, math.ceil(total / DATASET_PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        # A busca pode reduzir o número de páginas
+        if st.session_state.get(f"{key}_page", 1) > pages:
+            st.session_state[f"{key}_page"] = pages
+        page = st.number_input("Página", min_value=1, max_value=pages, key=f"{key}_page", help=f"{pages} páginas")
+    return registry.list(owner, offset=(page - 1) * DATASET_PAGE_SIZE, search=search), total
\ No newline at end of file
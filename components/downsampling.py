@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Acima deste número de linhas, gráficos de linha e dispersão são reduzidos no servidor
+DOWNSAMPLE_THRESHOLD_ROWS = 50000
+
+# Número aproximado de pontos enviados ao navegador em gráficos de linha
+LINE_TARGET_POINTS = 4000
+
+# Método padrão de redução para gráficos de linha ("minmax" ou "lttb")
+LINE_DOWNSAMPLING_METHOD = "minmax"
+
+# Número de intervalos por eixo na agregação 2D dos gráficos de dispersão
+SCATTER_BINS = 200
+
+# Pontos em células com até este número de observações são desenhados individualmente
+SPARSE_BIN_MAX_POINTS = 2
+
+# Limite de pontos individuais sobrepostos ao mapa de densidade
+MAX_SPARSE_POINTS = 5000
+
+def _to_numeric_axis(series):
+    """Converte uma coluna numérica ou de data para float (ou None se não for possível)."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype('int64').to_numpy(dtype=np.float64)
+    if pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=np.float64)
+    return None
+
+def minmax_downsample(x, y, n_out):
+    """
+    Seleciona, para cada intervalo de x (equivalente a um pixel), os pontos de
+    mínimo e máximo de y. Picos e vales são sempre preservados.
+
+    Args:
+        x: Array ordenado com os valores do eixo X
+        y: Array com os valores do eixo Y
+        n_out: Número aproximado de pontos desejado
+
+    Returns:
+        Índices (ordenados) dos pontos selecionados
+    """
+    n = len(x)
+    n_buckets = max(n_out // 2, 1)
+    if n <= n_out or x[-1] == x[0]:
+        return np.arange(n)
+
+    buckets = ((x - x[0]) / (x[-1] - x[0]) * n_buckets).astype(np.int64)
+    buckets = np.minimum(buckets, n_buckets - 1)
+
+    # Ordenar por intervalo e depois por y: o primeiro e o último de cada grupo são o mínimo e o máximo
+    order = np.lexsort((y, buckets))
+    sorted_buckets = buckets[order]
+    starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+
+    return np.unique(np.concatenate([order[starts], order[ends], [0, n - 1]]))
+
+def lttb_downsample(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: seleciona um ponto por intervalo, o que
+    forma o maior triângulo com o ponto anterior e a média do próximo intervalo.
+
+    Args:
+        x: Array ordenado com os valores do eixo X
+        y: Array com os valores do eixo Y
+        n_out: Número de pontos desejado
+
+    Returns:
+        Índices (ordenados) dos pontos selecionados
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    bucket_size = (n - 2) / (n_out - 2)
+    edges = (np.arange(n_out - 1) * bucket_size).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_start = end if end < next_end else n - 1
+        avg_x = x[next_start:next_end].mean() if next_end > next_start else x[n - 1]
+        avg_y = y[next_start:next_end].mean() if next_end > next_start else y[n - 1]
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area)) if end > start else start
+        selected[i + 1] = a
+
+    return np.unique(selected)
+
+def downsample_line_data(df, x_col, y_col, color_col=None, n_points=LINE_TARGET_POINTS, method=LINE_DOWNSAMPLING_METHOD):
+    """
+    Reduz os dados de um gráfico de linha preservando a forma da série.
+
+    Cada série (uma por valor de `color_col`) é ordenada por x e reduzida
+    separadamente. Colunas X que não são numéricas nem datas não são reduzidas.
+
+    Returns:
+        DataFrame reduzido, ordenado por x
+    """
+    x_values = _to_numeric_axis(df[x_col])
+    if x_values is None or not pd.api.types.is_numeric_dtype(df[y_col]):
+        return df
+
+    y_values = df[y_col].to_numpy(dtype=np.float64)
+    order = np.argsort(x_values, kind='mergesort')
+    downsample = lttb_downsample if method == "lttb" else minmax_downsample
+
+    if color_col is None:
+        groups = [order]
+    else:
+        codes = pd.factorize(df[color_col].to_numpy()[order])[0]
+        group_order = np.argsort(codes, kind='mergesort')
+        splits = np.flatnonzero(np.diff(codes[group_order])) + 1
+        groups = [order[g] for g in np.split(group_order, splits)]
+
+    points_per_group = max(n_points // max(len(groups), 1), 3)
+    selected = [
+        group[downsample(x_values[group], y_values[group], points_per_group)]
+        for group in groups
+    ]
+    selected = np.concatenate(selected)
+    selected = selected[np.argsort(x_values[selected], kind='mergesort')]
+
+    return df.iloc[selected]
+
+def create_density_scatter(df, x_col, y_col, color_col=None, title=None, template="plotly", bins=SCATTER_BINS):
+    """
+    Cria um gráfico de dispersão agregado para grandes volumes de dados: um
+    mapa de densidade (contagem por célula 2D) com os pontos de regiões
+    esparsas, como anomalias isoladas, sobrepostos individualmente.
+
+    Returns:
+        Figura Plotly ou None se os eixos não forem numéricos
+    """
+    x_values = _to_numeric_axis(df[x_col])
+    y_values = _to_numeric_axis(df[y_col])
+    if x_values is None or y_values is None:
+        return None
+
+    counts, x_edges, y_edges = np.histogram2d(x_values, y_values, bins=bins)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    if pd.api.types.is_datetime64_any_dtype(df[x_col]):
+        x_centers = pd.to_datetime(x_centers.astype('int64'))
+    if pd.api.types.is_datetime64_any_dtype(df[y_col]):
+        y_centers = pd.to_datetime(y_centers.astype('int64'))
+
+    fig = go.Figure(go.Heatmap(
+        x=x_centers,
+        y=y_centers,
+        z=np.where(counts > 0, counts, np.nan).T,
+        colorscale="Blues",
+        colorbar=dict(title="Contagem"),
+        name="Densidade"
+    ))
+
+    # Pontos em células esparsas (ex.: anomalias) são desenhados individualmente
+    x_idx = np.clip(np.searchsorted(x_edges, x_values, side='right') - 1, 0, bins - 1)
+    y_idx = np.clip(np.searchsorted(y_edges, y_values, side='right') - 1, 0, bins - 1)
+    point_counts = counts[x_idx, y_idx]
+    sparse_idx = np.flatnonzero(point_counts <= SPARSE_BIN_MAX_POINTS)
+    if len(sparse_idx) > MAX_SPARSE_POINTS:
+        sparse_idx = np.sort(sparse_idx[np.argsort(point_counts[sparse_idx], kind='mergesort')[:MAX_SPARSE_POINTS]])
+
+    if len(sparse_idx) > 0:
+        sparse_df = df.iloc[sparse_idx]
+        points = px.scatter(sparse_df, x=x_col, y=y_col, color=color_col)
+        fig.add_traces(points.data)
+
+    fig.update_layout(
+        title=title,
+        template=template,
+        xaxis_title=x_col,
+        yaxis_title=y_col,
+        legend=dict(orientation="h")
+    )
+    return fig
\ No newline at end of file
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+import streamlit as st
+from components.storage import dataset_signature, get_storage_path
+
+# Número máximo de figuras mantidas em cache (pode ser ajustado pela variável de ambiente)
+DEFAULT_MAX_FIGURES = int(os.environ.get("FIGURE_CACHE_MAX_ENTRIES", "256"))
+
+# Campos da configuração que influenciam a figura gerada
+CHART_CONFIG_KEYS = ['type', 'x_col', 'y_col', 'color_col', 'title', 'filters', 'theme', 'height', 'time_series']
+
+def normalize_chart_config(config):
+    """Retorna uma representação canônica (texto) da configuração de um gráfico."""
+    normalized = {key: config.get(key) for key in CHART_CONFIG_KEYS}
+    filters = normalized.get('filters') or {}
+    normalized['filters'] = {col: sorted(map(str, values)) for col, values in filters.items()}
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+class FigureCache:
+    """
+    Cache LRU de figuras Plotly compartilhado entre sessões. Cada entrada
+    guarda a figura e as mensagens (avisos, informações) emitidas ao
+    prepará-la, exibidas novamente quando a figura é reutilizada.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Retorna a tupla (figura, mensagens) ou None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, fig, messages=()):
+        with self._lock:
+            self._entries[key] = (fig, tuple(messages))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, dataset_path):
+        """Remove as figuras geradas a partir de um dataset (qualquer versão)."""
+        path = os.path.abspath(get_storage_path(dataset_path))
+        with self._lock:
+            for key in [k for k in self._entries if _data_key_path(k[1]) == path]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+@st.cache_resource
+def get_figure_cache():
+    """Retorna a instância única do cache de figuras do processo."""
+    return FigureCache(DEFAULT_MAX_FIGURES)
+
+def dataset_cache_key(dataset_path, *steps):
+    """
+    Identifica a versão dos dados de um dataset sem ler o conteúdo: caminho,
+    assinatura dos arquivos em disco (alterada por acréscimos e novos
+    processamentos) e as etapas aplicadas depois da leitura (ex.: plano de limpeza).
+    """
+    return json.dumps([dataset_path, list(dataset_signature(dataset_path)), *steps], sort_keys=True, default=str)
+
+def _data_key_path(data_key):
+    """
+    Caminho (absoluto) do dataset de uma versão de dados: o primeiro item de
+    dataset_cache_key, possivelmente dentro de chaves com etapas adicionais.
+    """
+    value = data_key
+    while isinstance(value, str):
+        try:
+            decoded = json.loads(value)
+        except ValueError:
+            return os.path.abspath(get_storage_path(value))
+        if not isinstance(decoded, list) or not decoded:
+            return None
+        value = decoded[0]
+    return None
+
+def figure_cache_key(config, data_key):
+    """Chave de uma figura: configuração normalizada e versão dos dados (None se os dados não são identificados)."""
+    if data_key is None:
+        return None
+    return (normalize_chart_config(config), data_key)
+
+def get_cached_figure(config, data_key):
+    """Retorna a figura em cache e suas mensagens (tupla) para a configuração e a versão dos dados, ou None."""
+    key = figure_cache_key(config, data_key)
+    return get_figure_cache().get(key) if key is not None else None
+
+def get_or_create_figure(config, data_key, builder, checked=False, messages=None):
+    """
+    Retorna a figura em cache para a configuração e a versão dos dados
+    informadas, ou a cria com `builder` e a armazena. Os dados não são
+    percorridos: a chave vem da versão do dataset (ver dataset_cache_key) e da
+    configuração, que já inclui colunas e filtros.
+
+    Args:
+        config: Dicionário de configuração do gráfico
+        data_key: Versão dos dados do gráfico (None desativa o cache)
+        builder: Função sem argumentos que cria a figura
+        checked: A figura já foi procurada no cache (get_cached_figure)
+        messages: Lista de mensagens (level, texto) da preparação do gráfico,
+            armazenada com a figura depois de `builder` (ver DeferredMessages)
+
+    Returns:
+        Figura Plotly ou None se não foi possível criá-la
+    """
+    key = figure_cache_key(config, data_key)
+    if key is None:
+        return builder()
+
+    cache = get_figure_cache()
+    entry = None if checked else cache.get(key)
+    if entry is not None:
+        return entry[0]
+    fig = builder()
+    # Não armazenar falhas: as mensagens de erro devem ser exibidas novamente
+    if fig is not None:
+        cache.put(key, fig, messages or ())
+    return fig
+
+def display_figure_cache_stats():
+    """Exibe os contadores do cache de figuras (painel de administração)."""
+    cache = get_figure_cache()
+    stats = cache.stats()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Acertos", stats['hits'])
+    with col2:
+        st.metric("Falhas", stats['misses'])
+    with col3:
+        st.metric("Descartes", stats['evictions'])
+
+    st.write(f"**Figuras em cache:** {stats['entries']} de {stats['max_entries']}")
+
+    if st.button("Limpar cache de gráficos", key="clear_figure_cache"):
+        cache.clear()
+        st.success("Cache de gráficos limpo.")
\ No newline at end of file
@@ -4,6 +4,71 @@ import os
 import uuid
 from datetime import datetime
 import numpy as np
+from components.storage import write_dataset, ChunkedDatasetWriter, PartitionAppender, STORAGE_EXTENSION, iter_dataset_batches, dataset_files, link_dataset, link_file, read_dataset_schema
+from components.dataset_cache import get_dataset_cache
+from components.statistics import NumericStats, save_numeric_stats, load_numeric_stats, get_stats_path
+from components.profile import ColumnProfileBuilder, build_column_profile, save_column_profile, get_column_profile, get_profile_path
+from components.schema import infer_date_schema, apply_date_schema
+from components.rollup import invalidate_rollups, RollupUpdater
+from components.timeseries import DEFAULT_WINDOW_SIZE, build_time_series
+from components.outliers import OUTLIER_METHODS, outlier_flags, outlier_mask
+from components.cleaning import (
+    TYPE_CONVERSIONS, plan_missing_values, plan_outliers, plan_conversions, apply_cleaning_plan,
+    describe_cleaning_plan, load_cleaning_plan, save_cleaning_plan, remove_cleaning_plan, load_cleaned_dataset
+)
+
+# Número de linhas lidas por bloco na ingestão de arquivos grandes
+CSV_CHUNK_ROWS = 100000
+
+# Linhas exibidas na prévia de um arquivo enviado
+CSV_PREVIEW_ROWS = 5
+
+# Proporção máxima de valores distintos para converter uma coluna de texto em categoria
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+def optimize_dtypes(df):
+    """
+    Reduz o uso de memória do DataFrame sem perda de informação:
+    - inteiros são convertidos para a menor largura que comporta os valores;
+    - decimais que contêm apenas 0/1 viram int8 (ou Int8, se houver ausentes);
+    - decimais representáveis exatamente em float32 são reduzidos;
+    - textos com poucos valores distintos viram 'category'.
+    
+    Returns:
+        Tupla (DataFrame otimizado, dicionário coluna -> novo tipo)
+    """
+    result_df = df.copy(deep=False)
+    converted = {}
+    
+    for col in df.columns:
+        series = df[col]
+        new_series = None
+        
+        if pd.api.types.is_bool_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        elif pd.api.types.is_integer_dtype(series):
+            new_series = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            non_null = series.dropna()
+            if len(non_null) > 0 and non_null.isin([0, 1]).all():
+                new_series = series.astype('Int8' if len(non_null) < len(series) else 'int8')
+            else:
+                as_float32 = series.astype('float32')
+                if np.array_equal(as_float32.to_numpy(dtype=np.float64), series.to_numpy(dtype=np.float64), equal_nan=True):
+                    new_series = as_float32
+        elif series.dtype == 'object':
+            if series.nunique(dropna=True) <= CATEGORY_MAX_UNIQUE_RATIO * len(series):
+                new_series = series.astype('category')
+        
+        if new_series is not None and new_series.dtype != series.dtype:
+            result_df[col] = new_series
+            converted[col] = str(new_series.dtype)
+    
+    return result_df, converted
+
+def memory_usage_bytes(df):
+    """Retorna a memória ocupada pelo DataFrame (incluindo o conteúdo dos textos)."""
+    return int(df.memory_usage(index=True, deep=True).sum())
 
 def process_csv_file(file, df=None):
     """
@@ -17,6 +82,10 @@ def process_csv_file(file, df=None):
             st.error(f"Erro ao ler o arquivo CSV: {str(e)}")
             return None, None
     
+    # Otimizar os tipos de dados para reduzir o uso de memória
+    bytes_before = memory_usage_bytes(df)
+    df, optimized_dtypes = optimize_dtypes(df)
+    
     # Metadados básicos
     metadata = {
         "rows": len(df),
@@ -24,146 +93,182 @@ def process_csv_file(file, df=None):
         "column_names": df.columns.tolist(),
         "dtypes": {col: str(df[col].dtype) for col in df.columns},
         "missing_values": df.isnull().sum().to_dict(),
-        "processed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        "processed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "memory_bytes_before": bytes_before,
+        "memory_bytes_after": memory_usage_bytes(df),
+        "optimized_dtypes": optimized_dtypes
     }
     
-    # Adicionar estatísticas descritivas para colunas numéricas
-    numeric_stats = {}
-    for col in df.select_dtypes(include=['int64', 'float64']).columns:
-        numeric_stats[col] = {
-            "min": float(df[col].min()) if not pd.isna(df[col].min()) else None,
-            "max": float(df[col].max()) if not pd.isna(df[col].max()) else None,
-            "mean": float(df[col].mean()) if not pd.isna(df[col].mean()) else None,
-            "median": float(df[col].median()) if not pd.isna(df[col].median()) else None,
-            "std": float(df[col].std()) if not pd.isna(df[col].std()) else None
-        }
-    
-    metadata["numeric_stats"] = numeric_stats
+    # Adicionar estatísticas descritivas para colunas numéricas (uma única passada)
+    metadata["numeric_stats"] = NumericStats.from_frame(df).to_metadata()
     
     return df, metadata
 
-def clean_dataframe(df):
-    """Realiza limpeza básica no DataFrame."""
-    # Criar uma cópia para não alterar o original
-    cleaned_df = df.copy()
-    
-    # 1. Lidar com valores ausentes
-    col1, col2 = st.columns(2)
-    with col1:
-        st.subheader("Valores Ausentes")
-        missing_values = df.isnull().sum()
-        cols_with_missing = missing_values[missing_values > 0]
-        
-        if len(cols_with_missing) > 0:
-            st.write("Colunas com valores ausentes:")
-            st.write(cols_with_missing)
-            
-            missing_strategy = st.selectbox(
-                "Como tratar valores ausentes?",
-                ["Manter", "Remover linhas", "Preencher com média/moda", "Preencher com zero"]
-            )
-            
-            if missing_strategy == "Remover linhas":
-                cleaned_df = cleaned_df.dropna()
-                st.info(f"Removidas {len(df) - len(cleaned_df)} linhas com valores ausentes.")
-            
-            elif missing_strategy == "Preencher com média/moda":
-                for col in cols_with_missing.index:
-                    if df[col].dtype in ['int64', 'float64']:
-                        # Para colunas numéricas, usamos a média
-                        cleaned_df[col] = cleaned_df[col].fillna(cleaned_df[col].mean())
-                    else:
-                        # Para colunas categóricas, usamos a moda
-                        cleaned_df[col] = cleaned_df[col].fillna(cleaned_df[col].mode()[0])
-                st.info("Valores ausentes preenchidos com média/moda.")
-            
-            elif missing_strategy == "Preencher com zero":
-                cleaned_df = cleaned_df.fillna(0)
-                st.info("Valores ausentes preenchidos com zero.")
-        else:
-            st.info("Não há valores ausentes no conjunto de dados.")
+def handle_missing_values(df, strategy, columns):
+    """
+    Trata os valores ausentes de um DataFrame.
+
+    Args:
+        df: DataFrame a ser tratado
+        strategy: "Manter", "Remover linhas", "Preencher com média/moda" ou "Preencher com zero"
+        columns: Colunas com valores ausentes
+
+    Returns:
+        DataFrame tratado
+    """
+    step = plan_missing_values(df, strategy, columns)
+    return apply_cleaning_plan(df, [step]) if step is not None else df
+
+def handle_outliers(df, column, strategy, lower_bound, upper_bound):
+    """
+    Trata os outliers de uma coluna numérica.
+
+    Args:
+        df: DataFrame a ser tratado
+        column: Coluna analisada
+        strategy: "Manter", "Remover" ou "Limitar aos limites (capping)"
+        lower_bound: Limite inferior
+        upper_bound: Limite superior
+
+    Returns:
+        DataFrame tratado
+    """
+    step = plan_outliers(df, strategy, [column], {column: [lower_bound, upper_bound]})
+    return apply_cleaning_plan(df, [step]) if step is not None else df
+
+def clean_dataframe(df, dataset_path, missing_values, owner=None):
+    """
+    Exibe as opções de limpeza e aplica o plano de limpeza salvo com o dataset.
+
+    As opções escolhidas formam um plano (valores ausentes, outliers de várias
+    colunas e conversões de tipo) com os valores já calculados, gravado ao
+    lado do dataset ao clicar em "Aplicar limpeza". O plano é reaplicado
+    automaticamente nas próximas visitas, e o resultado fica em cache.
+    Cada usuário tem o seu plano: o dataset compartilhado não é alterado.
+
+    Args:
+        df: DataFrame original
+        dataset_path: Caminho do dataset
+        missing_values: Valores ausentes por coluna (metadados do processamento)
+        owner: Usuário dono do plano de limpeza
+
+    Returns:
+        Tupla (DataFrame limpo ou o original, plano aplicado ou None)
+    """
+    plan = load_cleaning_plan(dataset_path, owner)
+    cols_with_missing = [col for col, count in missing_values.items() if count > 0 and col in df.columns]
+    numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
     
-    # 2. Detecção e tratamento de outliers para colunas numéricas
-    with col2:
-        st.subheader("Outliers")
-        numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
+    # Formulário: alterar as opções não reexecuta a limpeza
+    with st.form("cleaning_plan_form"):
+        col1, col2 = st.columns(2)
         
-        if numeric_cols:
-            outlier_col = st.selectbox("Verificar outliers em", numeric_cols)
-            
-            # Método de detecção de outliers usando IQR
-            Q1 = cleaned_df[outlier_col].quantile(0.25)
-            Q3 = cleaned_df[outlier_col].quantile(0.75)
-            IQR = Q3 - Q1
-            
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            
-            outliers = cleaned_df[(cleaned_df[outlier_col] < lower_bound) | 
-                            (cleaned_df[outlier_col] > upper_bound)]
-            
-            st.write(f"Número de outliers detectados: {len(outliers)}")
-            
-            if len(outliers) > 0:
+        # 1. Lidar com valores ausentes
+        with col1:
+            st.subheader("Valores Ausentes")
+            if cols_with_missing:
+                st.write("Colunas com valores ausentes:")
+                st.write(pd.Series({col: missing_values[col] for col in cols_with_missing}))
+                missing_strategy = st.selectbox(
+                    "Como tratar valores ausentes?",
+                    ["Manter", "Remover linhas", "Preencher com média/moda", "Preencher com zero"]
+                )
+                missing_cols = st.multiselect("Colunas tratadas", cols_with_missing, default=cols_with_missing)
+            else:
+                st.info("Não há valores ausentes no conjunto de dados.")
+                missing_strategy, missing_cols = "Manter", []
+        
+        # 2. Detecção e tratamento de outliers para colunas numéricas (todas de uma vez)
+        with col2:
+            st.subheader("Outliers")
+            if numeric_cols:
+                outlier_cols = st.multiselect("Verificar outliers em", numeric_cols, default=numeric_cols[:1])
+                outlier_method = st.selectbox("Método de detecção", list(OUTLIER_METHODS))
+                group_cols = st.multiselect(
+                    "Detectar por grupo",
+                    df.select_dtypes(include=['object', 'category', 'bool']).columns.tolist(),
+                    help="Limites calculados separadamente para cada grupo (ex.: por equipamento). Não se aplica ao modo multivariado."
+                )
                 outlier_strategy = st.selectbox(
                     "Como tratar outliers?",
-                    ["Manter", "Remover", "Limitar aos limites (capping)"]
+                    ["Manter", "Marcar (coluna outlier)", "Remover", "Limitar aos limites (capping)"]
                 )
-                
-                if outlier_strategy == "Remover":
-                    cleaned_df = cleaned_df[(cleaned_df[outlier_col] >= lower_bound) & 
-                                        (cleaned_df[outlier_col] <= upper_bound)]
-                    st.info(f"Removidos {len(outliers)} outliers.")
-                
-                elif outlier_strategy == "Limitar aos limites (capping)":
-                    cleaned_df[outlier_col] = np.where(
-                        cleaned_df[outlier_col] < lower_bound,
-                        lower_bound,
-                        np.where(
-                            cleaned_df[outlier_col] > upper_bound,
-                            upper_bound,
-                            cleaned_df[outlier_col]
-                        )
-                    )
-                    st.info(f"Outliers limitados aos limites ({lower_bound:.2f}, {upper_bound:.2f}).")
-        else:
-            st.info("Não há colunas numéricas para análise de outliers.")
+            else:
+                st.info("Não há colunas numéricas para análise de outliers.")
+                outlier_cols, outlier_method, group_cols, outlier_strategy = [], None, [], "Manter"
+        
+        # 3. Opções para converter tipos de dados
+        st.subheader("Converter Tipos de Dados")
+        col1, col2 = st.columns(2)
+        with col1:
+            convert_cols = st.multiselect("Selecione as colunas para converter", df.columns.tolist())
+        with col2:
+            target_type = st.selectbox("Converter para", ["Manter tipo atual"] + list(TYPE_CONVERSIONS))
+        
+        apply_clicked = st.form_submit_button("Aplicar limpeza")
     
-    # 3. Opções para converter tipos de dados
-    st.subheader("Converter Tipos de Dados")
+    if apply_clicked:
+        # Valores de preenchimento, limites e parâmetros calculados uma vez sobre os dados originais
+        try:
+            outlier_step = plan_outliers(
+                df, outlier_strategy, outlier_cols,
+                method=OUTLIER_METHODS.get(outlier_method), group_by=group_cols
+            )
+        except ValueError as e:
+            # O plano anterior é mantido
+            st.error(f"Erro ao calcular os outliers: {str(e)}")
+            apply_clicked = False
     
-    col1, col2 = st.columns(2)
-    with col1:
-        convert_col = st.selectbox("Selecione a coluna para converter", df.columns)
+    if apply_clicked:
+        steps = [
+            plan_missing_values(df, missing_strategy, missing_cols) if missing_cols else None,
+            outlier_step,
+            plan_conversions(convert_cols, target_type)
+        ]
+        plan = [step for step in steps if step is not None]
+        if plan:
+            save_cleaning_plan(plan, dataset_path, owner)
+            if outlier_step is not None:
+                if outlier_step['method'] != 'robust_covariance':
+                    counts = outlier_flags(df, outlier_step).sum(axis=0)
+                    for col, outliers in zip(outlier_step['columns'], counts):
+                        if 'bounds' in outlier_step:
+                            lower_bound, upper_bound = outlier_step['bounds'][col]
+                            st.write(f"**{col}:** {outliers} outliers fora de ({lower_bound:.2f}, {upper_bound:.2f})")
+                        else:
+                            st.write(f"**{col}:** {outliers} outliers (limites por grupo)")
+                st.write(f"**Linhas com outliers:** {int(outlier_mask(df, outlier_step).sum())}")
+            st.success("Plano de limpeza salvo com o dataset.")
+        else:
+            remove_cleaning_plan(dataset_path, owner)
+            plan = None
+            st.info("Nenhuma etapa de limpeza selecionada.")
     
-    with col2:
-        target_type = st.selectbox(
-            "Converter para",
-            ["Manter tipo atual", "Numérico", "Texto", "Categoria", "Data/Hora"]
-        )
+    if plan is None:
+        return df, None
     
-    if target_type != "Manter tipo atual":
-        try:
-            if target_type == "Numérico":
-                cleaned_df[convert_col] = pd.to_numeric(cleaned_df[convert_col], errors='coerce')
-            elif target_type == "Texto":
-                cleaned_df[convert_col] = cleaned_df[convert_col].astype(str)
-            elif target_type == "Categoria":
-                cleaned_df[convert_col] = cleaned_df[convert_col].astype('category')
-            elif target_type == "Data/Hora":
-                cleaned_df[convert_col] = pd.to_datetime(cleaned_df[convert_col], errors='coerce')
-            
-            st.success(f"Coluna {convert_col} convertida para {target_type}.")
-        except Exception as e:
-            st.error(f"Erro ao converter coluna: {str(e)}")
+    try:
+        cleaned_df = load_cleaned_dataset(dataset_path, plan)
+    except Exception as e:
+        st.error(f"Erro ao aplicar a limpeza: {str(e)}")
+        return df, None
+    
+    st.write("**Limpeza aplicada:**")
+    for description in describe_cleaning_plan(plan):
+        st.write(f"- {description}")
+    if len(cleaned_df) != len(df):
+        st.info(f"Removidas {len(df) - len(cleaned_df)} linhas.")
+    if st.button("Desfazer limpeza"):
+        remove_cleaning_plan(dataset_path, owner)
+        st.rerun()
     
     # Exibir prévia dos dados limpos
     st.subheader("Prévia dos Dados Processados")
     st.dataframe(cleaned_df.head())
     
-    return cleaned_df
+    return cleaned_df, plan
 
-def prepare_data_for_visualization(df, columns=None, sample_size=None, aggregation=None):
+def prepare_data_for_visualization(df, columns=None, sample_size=None, aggregation=None, time_series=None):
     """
     Prepara os dados para visualização em gráficos.
     
@@ -172,75 +277,80 @@ def prepare_data_for_visualization(df, columns=None, sample_size=None, aggregati
         columns: Lista de colunas a manter (opcional)
         sample_size: Tamanho da amostra (opcional)
         aggregation: Dicionário com configurações de agregação (opcional)
+        time_series: Dicionário com o agrupamento por intervalo de tempo e a
+            janela móvel de uma série temporal (opcional, ver build_time_series)
     
     Returns:
         DataFrame preparado para visualização
     """
-    # Trabalhar com uma cópia
-    result_df = df.copy()
-    
-    # Selecionar apenas as colunas especificadas
+    # Selecionar apenas as colunas especificadas (as operações abaixo geram novos
+    # DataFrames, então não é necessário copiar a entrada)
+    result_df = df
     if columns and all(col in df.columns for col in columns):
         result_df = result_df[columns]
     
     # Aplicar agregações se especificado
     if aggregation and isinstance(aggregation, dict):
-        if all(k in result_df.columns for k in aggregation.keys()):
-            group_by = aggregation.get('group_by')
-            agg_column = aggregation.get('column')
-            agg_func = aggregation.get('function', 'sum')
-            
-            if group_by and agg_column and group_by in result_df.columns and agg_column in result_df.columns:
-                # Criar agregação
-                if agg_func == 'sum':
-                    result_df = result_df.groupby(group_by)[agg_column].sum().reset_index()
-                elif agg_func == 'mean':
-                    result_df = result_df.groupby(group_by)[agg_column].mean().reset_index()
-                elif agg_func == 'count':
-                    result_df = result_df.groupby(group_by)[agg_column].count().reset_index()
-                elif agg_func == 'min':
-                    result_df = result_df.groupby(group_by)[agg_column].min().reset_index()
-                elif agg_func == 'max':
-                    result_df = result_df.groupby(group_by)[agg_column].max().reset_index()
-    
+        group_by = aggregation.get('group_by')
+        agg_column = aggregation.get('column')
+        agg_func = aggregation.get('function', 'sum')
+        
+        if group_by and agg_column and group_by in result_df.columns and agg_column in result_df.columns:
+            # Criar agregação
+            if agg_func == 'sum':
+                result_df = result_df.groupby(group_by, observed=True)[agg_column].sum().reset_index()
+            elif agg_func == 'mean':
+                result_df = result_df.groupby(group_by, observed=True)[agg_column].mean().reset_index()
+            elif agg_func == 'count':
+                result_df = result_df.groupby(group_by, observed=True)[agg_column].count().reset_index()
+            elif agg_func == 'min':
+                result_df = result_df.groupby(group_by, observed=True)[agg_column].min().reset_index()
+            elif agg_func == 'max':
+                result_df = result_df.groupby(group_by, observed=True)[agg_column].max().reset_index()
+
+    # Agrupar a série por intervalo de tempo (resultado em cache) e aplicar a janela móvel
+    if time_series and isinstance(time_series, dict):
+        time_col = time_series.get('time_column')
+        value_col = time_series.get('value_column')
+        if time_col in result_df.columns and value_col in result_df.columns:
+            result_df = build_time_series(
+                result_df, time_col, value_col,
+                time_series.get('rule', 'h'),
+                time_series.get('function', 'mean'),
+                group_col=time_series.get('group_by'),
+                window=time_series.get('window'),
+                window_size=time_series.get('window_size', DEFAULT_WINDOW_SIZE),
+                date_format=time_series.get('date_format'),
+                cache_key=time_series.get('cache_key')
+            )
+
     # Reduzir o tamanho do dataset se necessário
     if sample_size and isinstance(sample_size, int) and sample_size < len(result_df):
         result_df = result_df.sample(sample_size, random_state=42)
     
     return result_df
 
-def detect_date_columns(df):
+def detect_date_columns(df, date_formats=None):
     """
     Detecta e converte colunas que parecem ser datas.
     
     Args:
         df: DataFrame a ser analisado
+        date_formats: Formatos já detectados ({coluna: formato}), por exemplo os
+            gravados no perfil do dataset. Se não informado, os formatos são
+            detectados em uma amostra determinística de cada coluna.
     
     Returns:
-        DataFrame com colunas de data convertidas
+        Tupla (DataFrame com colunas de data convertidas, lista de colunas convertidas)
     """
-    result_df = df.copy()
-    date_columns = []
-    
-    # Verifica colunas que podem ser datas
-    for col in result_df.columns:
-        if result_df[col].dtype == 'object':
-            # Tenta converter usando pandas
-            try:
-                # Amostragem para teste (mais rápido)
-                sample = result_df[col].dropna().sample(min(100, len(result_df[col].dropna()))).copy()
-                pd.to_datetime(sample, errors='raise', infer_datetime_format=True)
-                
-                # Se chegar aqui, a conversão funcionou na amostra
-                result_df[col] = pd.to_datetime(result_df[col], errors='coerce')
-                date_columns.append(col)
-            except:
-                continue
-    
-    return result_df, date_columns
+    if date_formats is None:
+        date_formats = infer_date_schema(df)
+    
+    # Conversão com formato explícito (sem inferência valor a valor)
+    return apply_date_schema(df, date_formats)
 
-def save_processed_file(df, original_filename):
-    """Salva um dataframe processado no disco."""
+def _build_processed_path(original_filename):
+    """Gera o caminho de um novo arquivo processado na pasta data."""
     # Criar diretório se não existir
     save_dir = "data"
     if not os.path.exists(save_dir):
@@ -250,9 +360,230 @@ def save_processed_file(df, original_filename):
     filename_parts = os.path.splitext(original_filename)
     base_name = filename_parts[0]
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    file_path = os.path.join(save_dir, f"{base_name}_processed_{timestamp}.csv")
+    # Sufixo aleatório: o mesmo arquivo pode gerar mais de um dataset no mesmo segundo
+    return os.path.join(save_dir, f"{base_name}_processed_{timestamp}_{uuid.uuid4().hex[:6]}{STORAGE_EXTENSION}")
+
+def clone_processed_dataset(file_path, original_filename):
+    """
+    Cria um novo dataset processado com os mesmos dados de `file_path` (por
+    hardlinks, sem regravação), incluindo o perfil e as estatísticas. Usado
+    antes de acrescentar dados a um dataset compartilhado (cópia na escrita):
+    enquanto não há acréscimo, os registros do mesmo conteúdo usam o mesmo
+    caminho e compartilham os caches.
+
+    Returns:
+        Caminho do novo dataset
+    """
+    new_path = link_dataset(file_path, _build_processed_path(original_filename))
+    for sidecar_path in (get_profile_path, get_stats_path):
+        if os.path.exists(sidecar_path(file_path)):
+            link_file(sidecar_path(file_path), sidecar_path(new_path))
+    return new_path
+
+def save_processed_file(df, original_filename):
+    """Salva um dataframe processado no disco."""
+    file_path = _build_processed_path(original_filename)
+    
+    # Salvar arquivo em formato colunar (preserva tipos e permite leitura por coluna)
+    file_path = write_dataset(df, file_path)
+    
+    # Gravar o perfil de colunas ao lado do arquivo
+    save_column_profile(build_column_profile(df), file_path)
+    
+    # Descartar versões antigas do arquivo mantidas no cache compartilhado e seus cubos
+    get_dataset_cache().invalidate(file_path)
+    invalidate_rollups(file_path)
+    
+    return file_path
+
+def read_csv_preview(file, num_rows=CSV_PREVIEW_ROWS):
+    """Lê apenas as primeiras linhas de um arquivo CSV para exibição."""
+    preview = pd.read_csv(file, nrows=num_rows)
+    file.seek(0)  # Resetar o ponteiro do arquivo
+    return preview
+
+def process_csv_stream(file, original_filename, chunksize=CSV_CHUNK_ROWS, feedback=st, progress=None):
+    """
+    Processa e salva um arquivo CSV em blocos, mantendo o uso de memória
+    limitado independentemente do tamanho do arquivo. Os metadados são
+    calculados de forma incremental durante a leitura.
+    
+    Args:
+        file: Arquivo CSV (caminho ou objeto de arquivo)
+        original_filename: Nome original do arquivo enviado
+        chunksize: Número de linhas por bloco
+        feedback: Destino das mensagens de erro (st ou um coletor, ex.: em processos de fundo)
+        progress: Função chamada após cada bloco gravado, com o total de linhas lidas (opcional)
+    
+    Returns:
+        Tupla (caminho do arquivo salvo, metadados) ou (None, None) em caso de erro
+    """
+    writer = ChunkedDatasetWriter(_build_processed_path(original_filename))
+    missing_values = {}
+    stats = NumericStats()
+    bytes_before = 0
+    bytes_after = 0
+    optimized_dtypes = {}
+    profile_builder = ColumnProfileBuilder()
+    
+    try:
+        for chunk in pd.read_csv(file, chunksize=chunksize):
+            for col, count in chunk.isnull().sum().items():
+                missing_values[col] = missing_values.get(col, 0) + int(count)
+            stats.update(chunk.select_dtypes(include=['number']))
+            
+            # Otimizar os tipos de cada bloco antes de gravar
+            bytes_before += memory_usage_bytes(chunk)
+            chunk, chunk_dtypes = optimize_dtypes(chunk)
+            bytes_after += memory_usage_bytes(chunk)
+            optimized_dtypes.update(chunk_dtypes)
+            
+            writer.write_chunk(chunk)
+            profile_builder.update(chunk)
+            if progress is not None:
+                progress(profile_builder.rows)
+        
+        file_path = writer.close()
+    except Exception as e:
+        writer.abort()
+        feedback.error(f"Erro ao processar o arquivo CSV: {str(e)}")
+        return None, None
+    
+    save_column_profile(profile_builder.to_profile(), file_path)
+    save_numeric_stats(stats, file_path)
+    get_dataset_cache().invalidate(file_path)
+    invalidate_rollups(file_path)
+    
+    metadata = _stream_metadata(
+        writer.schema, writer.rows, missing_values, stats,
+        bytes_before, bytes_after, optimized_dtypes
+    )
+    
+    return file_path, metadata
+
+def _stream_metadata(schema, rows, missing_values, stats, bytes_before, bytes_after, optimized_dtypes):
+    """Monta os metadados de um dataset gravado em blocos."""
+    # Tipos finais das colunas (após eventuais promoções entre blocos)
+    dtypes = schema.empty_table().to_pandas().dtypes
+    numeric_cols = [col for col, dtype in dtypes.items() if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)]
+    
+    return {
+        "rows": rows,
+        "columns": len(dtypes),
+        "column_names": dtypes.index.tolist(),
+        "dtypes": {col: str(dtype) for col, dtype in dtypes.items()},
+        "missing_values": missing_values,
+        "processed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "numeric_stats": stats.to_metadata(numeric_cols),
+        "memory_bytes_before": bytes_before,
+        "memory_bytes_after": bytes_after,
+        "optimized_dtypes": {col: str(dtypes[col]) for col in optimized_dtypes if col in dtypes}
+    }
+
+def build_dataset_metadata(dataset_path, chunksize=CSV_CHUNK_ROWS):
+    """
+    Calcula os metadados de um dataset processado já gravado (ex.: datasets
+    anteriores ao catálogo), lendo-o em blocos. As estatísticas numéricas são
+    gravadas ao lado do dataset para os acréscimos seguintes.
+
+    Args:
+        dataset_path: Caminho do dataset processado (arquivos CSV antigos são migrados)
+        chunksize: Número de linhas por bloco
+
+    Returns:
+        Dicionário de metadados (sem as medidas de memória do processamento original)
+    """
+    # Data do arquivo original (antes de uma eventual migração do CSV)
+    processed_at = datetime.fromtimestamp(os.path.getmtime(dataset_path)).strftime("%Y-%m-%d %H:%M:%S")
+    missing_values = {}
+    stats = NumericStats()
+    rows = 0
+    for batch in iter_dataset_batches(dataset_path, batch_size=chunksize):
+        for col, count in batch.isnull().sum().items():
+            missing_values[col] = missing_values.get(col, 0) + int(count)
+        stats.update(batch.select_dtypes(include=['number']))
+        rows += len(batch)
+    save_numeric_stats(stats, dataset_path)
+    
+    metadata = _stream_metadata(read_dataset_schema(dataset_path), rows, missing_values, stats, 0, 0, {})
+    for key in ("memory_bytes_before", "memory_bytes_after"):
+        metadata.pop(key)
+    for col in metadata["column_names"]:
+        missing_values.setdefault(col, 0)
+    metadata["processed_at"] = processed_at
+    metadata["partitions"] = len(dataset_files(dataset_path))
+    return metadata
+
+def append_csv_stream(file, dataset_path, metadata, chunksize=CSV_CHUNK_ROWS, feedback=st, progress=None):
+    """
+    Acrescenta as linhas de um arquivo CSV a um dataset já processado, como
+    uma nova partição. Metadados, perfil de colunas, estatísticas e cubos de
+    agregação são atualizados apenas com as novas linhas, sem reler o histórico.
+    
+    Args:
+        file: Arquivo CSV (caminho ou objeto de arquivo)
+        dataset_path: Caminho do dataset processado
+        metadata: Metadados atuais do dataset
+        chunksize: Número de linhas por bloco
+        feedback: Destino das mensagens de erro (st ou um coletor, ex.: em processos de fundo)
+        progress: Função chamada após cada bloco gravado, com o total de linhas acrescentadas (opcional)
+    
+    Returns:
+        Tupla (caminho do dataset, metadados atualizados) ou (None, None) em caso de erro
+    """
+    # Estado acumulado do dataset (reconstruído uma única vez para datasets antigos)
+    stats = load_numeric_stats(dataset_path)
+    if stats is None:
+        stats = NumericStats()
+        for batch in iter_dataset_batches(dataset_path, batch_size=chunksize):
+            stats.update(batch.select_dtypes(include=['number']))
+    profile_builder = ColumnProfileBuilder.from_profile(get_column_profile(dataset_path))
+    rollups = RollupUpdater(dataset_path)
+    
+    missing_values = dict(metadata.get('missing_values', {}))
+    bytes_before = metadata.get('memory_bytes_before', 0)
+    bytes_after = metadata.get('memory_bytes_after', 0)
+    optimized_dtypes = dict(metadata.get('optimized_dtypes', {}))
+    
+    try:
+        appender = PartitionAppender(dataset_path)
+    except Exception as e:
+        feedback.error(f"Erro ao abrir o dataset para acréscimo: {str(e)}")
+        return None, None
+    
+    try:
+        for chunk in pd.read_csv(file, chunksize=chunksize):
+            for col, count in chunk.isnull().sum().items():
+                missing_values[col] = missing_values.get(col, 0) + int(count)
+            stats.update(chunk.select_dtypes(include=['number']))
+            
+            bytes_before += memory_usage_bytes(chunk)
+            chunk, chunk_dtypes = optimize_dtypes(chunk)
+            bytes_after += memory_usage_bytes(chunk)
+            optimized_dtypes.update(chunk_dtypes)
+            
+            appender.write_chunk(chunk)
+            profile_builder.update(chunk)
+            rollups.update(chunk)
+            if progress is not None:
+                progress(appender.rows)
+        
+        dataset_path = appender.close()
+    except Exception as e:
+        appender.abort()
+        feedback.error(f"Erro ao acrescentar o arquivo CSV: {str(e)}")
+        return None, None
     
-    # Salvar arquivo
-    df.to_csv(file_path, index=False)
+    # Gravados depois da nova partição (ficam mais recentes que o dataset)
+    save_column_profile(profile_builder.to_profile(), dataset_path)
+    save_numeric_stats(stats, dataset_path)
+    rollups.finish()
+    get_dataset_cache().invalidate(dataset_path)
     
-    return file_path 
\ No newline at end of file
+    updated = _stream_metadata(
+        appender.schema, profile_builder.rows, missing_values, stats,
+        bytes_before, bytes_after, optimized_dtypes
+    )
+    updated["partitions"] = len(dataset_files(dataset_path))
+    updated["appended_rows"] = appender.rows
+    return dataset_path, updated
\ No newline at end of file
@@ -0,0 +1,273 @@
+import contextvars
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Arquivo de exportação dos spans (JSON por linha, no formato OTLP/JSON do OpenTelemetry)
+PERF_LOG_FILE = os.environ.get("PERF_LOG_FILE", os.path.join("logs", "performance.jsonl"))
+
+# Rotação do arquivo de exportação
+PERF_LOG_MAX_BYTES = int(os.environ.get("PERF_LOG_MAX_MB", "10")) * 1024 * 1024
+PERF_LOG_BACKUP_COUNT = int(os.environ.get("PERF_LOG_BACKUPS", "5"))
+
+# Exportação para arquivo habilitada (PERF_EXPORT=0 desabilita)
+PERF_EXPORT_ENABLED = os.environ.get("PERF_EXPORT", "1") == "1"
+
+# Medição de memória (tracemalloc) dos spans (PERF_TRACE_MEMORY=1). Vale para o processo
+# inteiro: definida na inicialização do servidor, não pelas sessões
+PERF_TRACE_MEMORY = os.environ.get("PERF_TRACE_MEMORY", "0") == "1"
+
+# Nome do serviço gravado nos recursos exportados
+SERVICE_NAME = "dashboard-de-dados"
+
+_current_trace = contextvars.ContextVar("perf_current_trace", default=None)
+_current_span = contextvars.ContextVar("perf_current_span", default=None)
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+if PERF_TRACE_MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+class RerunTrace:
+    """Spans registrados durante uma execução (rerun) do script de uma sessão."""
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.spans)
+
+def start_rerun_trace():
+    """Inicia o registro de spans da execução atual e o associa à sessão."""
+    trace = RerunTrace()
+    _current_trace.set(trace)
+    _current_span.set(None)
+    st.session_state.perf_trace = trace
+    return trace
+
+def finish_rerun_trace():
+    """Encerra o registro da execução atual e exporta os spans para o arquivo."""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    _current_trace.set(None)
+    export_spans(trace.snapshot())
+    return trace
+
+def current_context():
+    """
+    Retorna uma cópia do contexto atual (trace e span pai), para que spans
+    criados em outras threads sejam associados à execução corrente.
+    Uso: `ctx = current_context(); executor.submit(ctx.run, func)`.
+    """
+    return contextvars.copy_context()
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Mede o tempo (e, com PERF_TRACE_MEMORY, a variação de memória) de um
+    trecho de código. Spans aninhados registram o span pai.
+
+    A variação de memória é a do processo inteiro durante o trecho: inclui
+    alocações de outras sessões e threads executadas ao mesmo tempo.
+
+    Args:
+        name: Nome da etapa (ex.: "chart.figure")
+        **attributes: Atributos adicionais (ex.: chart_type="Barra")
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    record = {
+        'name': name,
+        'trace_id': trace.trace_id if trace is not None else uuid.uuid4().hex,
+        'span_id': uuid.uuid4().hex[:16],
+        'parent_span_id': parent['span_id'] if parent is not None else None,
+        'depth': parent['depth'] + 1 if parent is not None else 0,
+        'attributes': attributes,
+        'status': 'ok'
+    }
+    token = _current_span.set(record)
+    memory_before = tracemalloc.get_traced_memory()[0] if PERF_TRACE_MEMORY and tracemalloc.is_tracing() else None
+    record['start_time_unix_nano'] = time.time_ns()
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        # Interrupções do Streamlit (st.rerun/st.stop) também passam por aqui
+        record['status'] = 'error'
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        record['duration_ms'] = (time.perf_counter() - start) * 1000
+        record['end_time_unix_nano'] = record['start_time_unix_nano'] + int(record['duration_ms'] * 1e6)
+        record['memory_delta_mb'] = None
+        if memory_before is not None and tracemalloc.is_tracing():
+            record['memory_delta_mb'] = (tracemalloc.get_traced_memory()[0] - memory_before) / (1024 * 1024)
+        _current_span.reset(token)
+        if trace is not None:
+            trace.add(record)
+        else:
+            export_spans([record])
+
+def _otlp_value(value):
+    """Converte um valor para o formato de atributo do OTLP/JSON."""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, (int, np.integer)):
+        return {'intValue': str(int(value))}
+    if isinstance(value, (float, np.floating)):
+        return {'doubleValue': float(value)}
+    return {'stringValue': str(value)}
+
+def _otlp_attributes(attributes):
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+def to_otlp(spans):
+    """Converte spans para um documento OTLP/JSON (ExportTraceServiceRequest)."""
+    otlp_spans = []
+    for record in spans:
+        attributes = dict(record['attributes'])
+        if record.get('memory_delta_mb') is not None:
+            attributes['process.memory.delta_mb'] = record['memory_delta_mb']
+        otlp_span = {
+            'traceId': record['trace_id'],
+            'spanId': record['span_id'],
+            'name': record['name'],
+            'kind': 1,
+            'startTimeUnixNano': str(record['start_time_unix_nano']),
+            'endTimeUnixNano': str(record['end_time_unix_nano']),
+            'attributes': _otlp_attributes(attributes),
+            'status': {'code': 2, 'message': record['error']} if record['status'] == 'error' else {'code': 1}
+        }
+        if record['parent_span_id'] is not None:
+            otlp_span['parentSpanId'] = record['parent_span_id']
+        otlp_spans.append(otlp_span)
+
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({'service.name': SERVICE_NAME, 'process.pid': os.getpid()})},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': otlp_spans}]
+        }]
+    }
+
+def _get_exporter():
+    """Retorna o logger com rotação usado na exportação (criado na primeira chamada)."""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            log_dir = os.path.dirname(PERF_LOG_FILE)
+            if log_dir and not os.path.exists(log_dir):
+                os.makedirs(log_dir, exist_ok=True)
+            handler = RotatingFileHandler(PERF_LOG_FILE, maxBytes=PERF_LOG_MAX_BYTES, backupCount=PERF_LOG_BACKUP_COUNT)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger("dashboard.performance")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            _exporter = logger
+        return _exporter
+
+def export_spans(spans):
+    """Grava os spans no arquivo de exportação (uma linha OTLP/JSON por lote)."""
+    if not PERF_EXPORT_ENABLED or not spans:
+        return
+    try:
+        _get_exporter().info(json.dumps(to_otlp(spans)))
+    except OSError:
+        # A medição nunca deve interromper o dashboard
+        pass
+
+def read_exported_spans(path=PERF_LOG_FILE):
+    """Lê os spans exportados (incluindo arquivos rotacionados) como registros simples."""
+    records = []
+    for file_path in sorted(glob.glob(f"{glob.escape(path)}*")):
+        with open(file_path, 'r') as f:
+            for line in f:
+                try:
+                    document = json.loads(line)
+                except ValueError:
+                    continue
+                for resource in document.get('resourceSpans', []):
+                    for scope in resource.get('scopeSpans', []):
+                        for otlp_span in scope.get('spans', []):
+                            attributes = {
+                                attr['key']: next(iter(attr['value'].values()))
+                                for attr in otlp_span.get('attributes', [])
+                            }
+                            duration_ns = int(otlp_span['endTimeUnixNano']) - int(otlp_span['startTimeUnixNano'])
+                            records.append({
+                                'name': otlp_span['name'],
+                                'chart_type': attributes.get('chart_type'),
+                                'duration_ms': duration_ns / 1e6
+                            })
+    return records
+
+def summarize_spans(path=PERF_LOG_FILE):
+    """
+    Agrega os spans exportados por etapa e tipo de gráfico.
+
+    Returns:
+        DataFrame com contagem, p50 e p95 (ms) ou None se não houver dados
+    """
+    records = read_exported_spans(path)
+    if not records:
+        return None
+    df = pd.DataFrame(records)
+    df['chart_type'] = df['chart_type'].fillna('-')
+    grouped = df.groupby(['name', 'chart_type'])['duration_ms']
+    summary = pd.DataFrame({
+        'Execuções': grouped.count(),
+        'p50 (ms)': grouped.quantile(0.5),
+        'p95 (ms)': grouped.quantile(0.95)
+    })
+    summary.index.names = ['Etapa', 'Tipo de gráfico']
+    return summary.round(1).reset_index()
+
+def display_performance_panel():
+    """Exibe os tempos da execução atual e o histórico agregado (painel de administração)."""
+    trace = st.session_state.get('perf_trace')
+    spans = trace.snapshot() if trace is not None else []
+    if spans:
+        rows = []
+        for record in sorted(spans, key=lambda r: r['start_time_unix_nano']):
+            chart_type = record['attributes'].get('chart_type')
+            indent = "  " * (record['depth'] - 1) + "↳ " if record['depth'] else ""
+            label = indent + record['name'] + (f" ({chart_type})" if chart_type else "")
+            row = {'Etapa': label, 'Tempo (ms)': round(record['duration_ms'], 1)}
+            if PERF_TRACE_MEMORY:
+                row['Memória do processo (MB)'] = round(record['memory_delta_mb'], 2) if record['memory_delta_mb'] is not None else None
+            rows.append(row)
+        st.write("**Execução atual**")
+        st.dataframe(pd.DataFrame(rows), hide_index=True)
+        total_ms = sum(r['duration_ms'] for r in spans if r['depth'] == 0)
+        st.write(f"**Tempo medido:** {total_ms:.0f} ms")
+        if PERF_TRACE_MEMORY:
+            st.caption("Memória: variação do processo inteiro durante cada etapa (inclui as demais sessões em execução).")
+    else:
+        st.info("Nenhuma etapa medida nesta execução.")
+
+    if PERF_EXPORT_ENABLED and st.checkbox("Mostrar p50/p95 do histórico", key="perf_show_summary"):
+        summary = summarize_spans()
+        if summary is None:
+            st.info("Ainda não há medições exportadas.")
+        else:
+            st.dataframe(summary, hide_index=True)
+        st.caption(f"Arquivo: {PERF_LOG_FILE}")
\ No newline at end of file
@@ -0,0 +1,308 @@
+import json
+import multiprocessing
+import os
+import uuid
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+import streamlit as st
+from components.content_store import get_content_store, get_processed_index
+from components.dataset_cache import get_dataset_cache
+from components.dataset_registry import get_dataset_registry
+from components.figure_cache import get_figure_cache
+from components.file_processor import process_csv_stream, append_csv_stream, clone_processed_dataset
+from components.render_scheduler import DeferredMessages
+from components.rollup import get_rollup_store
+
+# Diretório com o estado dos processamentos em segundo plano (um arquivo JSON por tarefa)
+JOBS_DIR = os.environ.get("JOBS_DIR", os.path.join("data", "jobs"))
+
+# Número de processos que executam as tarefas ao mesmo tempo
+JOB_MAX_WORKERS = int(os.environ.get("JOB_MAX_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+# Dias em que as tarefas concluídas continuam listadas
+JOB_RETENTION_DAYS = int(os.environ.get("JOB_RETENTION_DAYS", "7"))
+
+# Intervalo de atualização do painel enquanto houver tarefas em andamento
+JOB_POLL_SECONDS = 2
+
+# Situações possíveis de uma tarefa
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_ACTIVE = (JOB_QUEUED, JOB_RUNNING)
+
+# Rótulos exibidos para cada situação
+JOB_STATUS_LABELS = {
+    JOB_QUEUED: "Na fila",
+    JOB_RUNNING: "Processando",
+    JOB_DONE: "Concluído",
+    JOB_FAILED: "Falhou"
+}
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def _job_path(jobs_dir, job_id):
+    return os.path.join(jobs_dir, f"{job_id}.json")
+
+def _load_job(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _save_job(path, job):
+    # Nome temporário exclusivo: o processo de fundo e o servidor podem gravar a mesma tarefa
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(job, f)
+    os.replace(tmp_path, path)
+
+def invalidate_dataset_caches(dataset_path):
+    """
+    Descarta as versões em memória de um dataset alterado por um processo de
+    fundo. Os caches são do processo do servidor: a invalidação feita dentro
+    do processo de fundo não os alcança.
+    """
+    get_dataset_cache().invalidate(dataset_path)
+    get_rollup_store().invalidate(dataset_path, remove_files=False)
+    get_figure_cache().invalidate(dataset_path)
+
+def run_job(job_path):
+    """
+    Executa uma tarefa em um processo de fundo: lê o arquivo de entrada do
+    armazenamento de envios, grava o andamento no arquivo da tarefa
+    (acompanhado pelas páginas) e registra o dataset resultante no catálogo.
+    """
+    job = _load_job(job_path)
+    job.update(status=JOB_RUNNING, started_at=_now())
+    _save_job(job_path, job)
+
+    messages = DeferredMessages()
+    input_size = max(1, os.path.getsize(job['input_path']))
+    with open(job['input_path'], 'rb') as f:
+        def progress(rows):
+            # Posição no arquivo de entrada (aproximada: o leitor de CSV usa buffer)
+            job.update(progress=min(f.tell() / input_size, 0.99), rows=rows)
+            _save_job(job_path, job)
+
+        if job['kind'] == 'append':
+            target_path = job['target_path']
+            if get_dataset_registry().is_shared(job['owner'], job['target']):
+                # Cópia na escrita: o conteúdo compartilhado com outros registros não é alterado
+                target_path = clone_processed_dataset(target_path, job['target'])
+            file_path, metadata = append_csv_stream(
+                f, target_path, job['target_metadata'], feedback=messages, progress=progress
+            )
+        else:
+            file_path, metadata = process_csv_stream(f, job['file_name'], feedback=messages, progress=progress)
+
+    if file_path is None:
+        errors = [text for level, text in messages.messages if level == 'error']
+        job.update(status=JOB_FAILED, error="; ".join(errors) or "Erro desconhecido", finished_at=_now())
+    else:
+        # Registrado antes de a tarefa aparecer como concluída nas páginas
+        if job['kind'] == 'append':
+            # O dataset passa a reunir vários arquivos: não corresponde mais a um único conteúdo
+            get_dataset_registry().register(job['owner'], job['target'], file_path, metadata)
+        else:
+            # O resultado fica no índice de processamentos e é registrado no mesmo caminho (caches compartilhados)
+            get_dataset_registry().register(job['owner'], job['file_name'], file_path, metadata, job['input_hash'])
+        job.update(status=JOB_DONE, progress=1.0, result={'path': file_path, 'metadata': metadata}, finished_at=_now())
+    _save_job(job_path, job)
+    return job['status']
+
+class JobQueue:
+    """
+    Fila de processamentos de arquivos em segundo plano, executados em um pool
+    de processos. O estado de cada tarefa (situação, andamento e resultado) é
+    gravado em disco, de modo que sobrevive ao recarregamento da página, e os
+    datasets resultantes são registrados no catálogo de datasets.
+    """
+
+    def __init__(self, jobs_dir, max_workers, processed_index):
+        self.jobs_dir = jobs_dir
+        self.processed_index = processed_index
+        self.max_workers = max(1, max_workers)
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._executor = self._create_executor()
+        self._lock = threading.Lock()
+        self._recover()
+
+    def _create_executor(self):
+        # Processos novos (spawn): o servidor do Streamlit mantém várias threads
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _recover(self):
+        """Retoma as tarefas deixadas na fila e descarta as antigas (início do servidor)."""
+        limit = (datetime.now() - timedelta(days=JOB_RETENTION_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+        for job in self.jobs():
+            path = _job_path(self.jobs_dir, job['id'])
+            if job['status'] == JOB_QUEUED:
+                self._submit(job)
+            elif job['status'] == JOB_RUNNING:
+                # Interrompida no meio: os arquivos parciais são ignorados pelo armazenamento
+                job.update(status=JOB_FAILED, error="Interrompido: o servidor foi reiniciado durante o processamento.", finished_at=_now())
+                _save_job(path, job)
+            elif job.get('finished_at', job['created_at']) < limit:
+                os.remove(path)
+
+    def _submit(self, job):
+        path = _job_path(self.jobs_dir, job['id'])
+        with self._lock:
+            try:
+                future = self._executor.submit(run_job, path)
+            except BrokenProcessPool:
+                # Um processo de fundo terminou abruptamente (ex.: falta de memória): recriar o pool
+                self._executor = self._create_executor()
+                future = self._executor.submit(run_job, path)
+        future.add_done_callback(lambda future: self._on_finished(path, future))
+
+    def _on_finished(self, path, future):
+        """
+        Registra o resultado no índice de processamentos ou a falha do processo
+        de fundo e descarta dos caches do servidor o dataset alterado.
+        """
+        job = _load_job(path)
+        error = future.exception()
+        if error is not None and job['status'] in JOB_ACTIVE:
+            job.update(status=JOB_FAILED, error=str(error) or type(error).__name__, finished_at=_now())
+            _save_job(path, job)
+        elif job['status'] == JOB_DONE and job['kind'] == 'process':
+            self.processed_index.put(job['input_hash'], job['result']['path'], job['result']['metadata'])
+        elif job['status'] == JOB_DONE:
+            invalidate_dataset_caches(job['result']['path'])
+
+    def submit(self, kind, owner, file_name, input_hash, input_path, target=None, target_path=None, target_metadata=None):
+        """
+        Enfileira o processamento (kind='process') ou o acréscimo (kind='append')
+        de um arquivo já gravado no armazenamento de envios.
+
+        Returns:
+            Dicionário com o estado inicial da tarefa
+        """
+        job = {
+            'id': f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}",
+            'kind': kind,
+            'owner': owner,
+            'file_name': file_name,
+            'input_hash': input_hash,
+            'input_path': input_path,
+            'target': target,
+            'target_path': target_path,
+            'target_metadata': target_metadata,
+            'status': JOB_QUEUED,
+            'progress': 0.0,
+            'rows': 0,
+            'created_at': _now()
+        }
+        _save_job(_job_path(self.jobs_dir, job['id']), job)
+        self._submit(job)
+        return job
+
+    def jobs(self, owner=None):
+        """Tarefas gravadas (da mais antiga para a mais recente), opcionalmente de um usuário."""
+        jobs = []
+        for name in sorted(os.listdir(self.jobs_dir)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                job = _load_job(os.path.join(self.jobs_dir, name))
+            except (OSError, ValueError):
+                continue
+            if owner is None or job['owner'] == owner:
+                jobs.append(job)
+        return jobs
+
+    def find_active(self, input_hash=None, target_path=None):
+        """Tarefa em andamento com o mesmo conteúdo de entrada ou o mesmo dataset de destino."""
+        for job in self.jobs():
+            if job['status'] not in JOB_ACTIVE:
+                continue
+            if input_hash is not None and job['kind'] == 'process' and job['input_hash'] == input_hash:
+                return job
+            if target_path is not None and job['target_path'] == target_path:
+                return job
+        return None
+
+@st.cache_resource
+def get_job_queue():
+    """Retorna a instância única da fila de processamentos do servidor."""
+    return JobQueue(JOBS_DIR, JOB_MAX_WORKERS, get_processed_index())
+
+def enqueue_upload(file, owner, target=None, target_info=None, input_hash=None):
+    """
+    Grava o arquivo enviado no armazenamento de envios (o processo de fundo não
+    tem acesso ao upload da sessão) e enfileira seu processamento ou, com
+    `target`, o acréscimo ao dataset indicado. Com `input_hash` (hash já
+    calculado pela página), o conteúdo não é lido novamente se já estiver
+    armazenado.
+
+    Returns:
+        Tupla (tarefa, True se foi criada agora; False se uma tarefa equivalente já estava em andamento)
+    """
+    queue = get_job_queue()
+    store = get_content_store()
+    input_hash, _ = store.put(file, file.name, input_hash)
+
+    if target is None:
+        active = queue.find_active(input_hash=input_hash)
+        if active is not None:
+            return active, False
+        job = queue.submit('process', owner, file.name, input_hash, store.object_path(input_hash))
+    else:
+        # Acréscimos ao mesmo dataset são feitos um de cada vez
+        active = queue.find_active(target_path=target_info['path'])
+        if active is not None:
+            return active, False
+        job = queue.submit(
+            'append', owner, file.name, input_hash, store.object_path(input_hash),
+            target=target, target_path=target_info['path'], target_metadata=target_info['metadata']
+        )
+    return job, True
+
+def _describe_job(job):
+    if job['kind'] == 'append':
+        return f"{job['file_name']} → {job['target']}"
+    return job['file_name']
+
+def _jobs_panel(active_only):
+    jobs = get_job_queue().jobs(owner=st.session_state.get('username'))
+    if active_only:
+        jobs = [job for job in jobs if job['status'] in JOB_ACTIVE]
+
+    # Tarefas concluídas desde a última atualização: atualizar a página inteira (novos datasets)
+    active = {job['id'] for job in jobs if job['status'] in JOB_ACTIVE}
+    finished = st.session_state.get('active_jobs', set()) - active
+    st.session_state.active_jobs = active
+
+    for job in reversed(jobs):
+        label = f"{_describe_job(job)} — {JOB_STATUS_LABELS[job['status']]}"
+        if job['status'] == JOB_FAILED:
+            st.error(f"{label}: {job.get('error')}")
+        elif job['status'] == JOB_DONE:
+            st.success(f"{label} ({job['result']['metadata']['rows']} linhas)")
+        else:
+            st.progress(job['progress'], text=f"{label} ({job['rows']} linhas lidas)")
+
+    if finished:
+        st.rerun()
+
+# Atualizado periodicamente apenas enquanto houver tarefas em andamento
+_live_jobs_panel = st.fragment(run_every=JOB_POLL_SECONDS)(_jobs_panel)
+
+def display_jobs(active_only=False):
+    """
+    Exibe o andamento dos processamentos do usuário atual. Enquanto houver
+    tarefas na fila ou em execução, o painel é atualizado sozinho, sem
+    bloquear o restante da página.
+
+    Args:
+        active_only: Exibir apenas as tarefas em andamento
+    """
+    jobs = get_job_queue().jobs(owner=st.session_state.get('username'))
+    if any(job['status'] in JOB_ACTIVE for job in jobs):
+        _live_jobs_panel(active_only)
+    else:
+        _jobs_panel(active_only)
\ No newline at end of file
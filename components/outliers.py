@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+
+# Fator da regra do intervalo interquartil (IQR)
+IQR_FACTOR = 1.5
+
+# Limite do z-score (|z| acima disso é outlier)
+ZSCORE_THRESHOLD = 3.0
+
+# Quantil da distância de Mahalanobis (qui-quadrado) acima do qual uma linha é outlier
+ROBUST_COVARIANCE_QUANTILE = 0.975
+
+# Proporção das linhas mais centrais usada na estimativa robusta (MCD)
+ROBUST_COVARIANCE_SUPPORT = 0.75
+
+# Máximo de linhas usadas para estimar o centro e a covariância robustos
+OUTLIER_FIT_SAMPLE_ROWS = 200000
+
+# Linhas pontuadas por bloco no modo multivariado (limita a memória temporária)
+OUTLIER_CHUNK_ROWS = 500000
+
+# Coluna booleana acrescentada com a marcação de outliers (pode ser usada como cor nos gráficos)
+OUTLIER_COLUMN = "outlier"
+
+# Métodos de detecção (rótulo exibido -> método gravado no plano)
+OUTLIER_METHODS = {
+    "IQR (1,5 × intervalo interquartil)": "iqr",
+    "Z-score (|z| > 3)": "zscore",
+    "Covariância robusta (multivariado)": "robust_covariance"
+}
+
+def _as_matrix(df, columns):
+    return df[list(columns)].to_numpy(dtype=np.float64, na_value=np.nan)
+
+def _chi2_quantile(q, dof):
+    """Quantil aproximado da distribuição qui-quadrado (Wilson-Hilferty), sem depender do scipy."""
+    # Quantis da normal padrão para os níveis aceitos
+    z = {0.95: 1.6448536, 0.975: 1.9599640, 0.99: 2.3263479, 0.999: 3.0902323}[q]
+    h = 2.0 / (9.0 * dof)
+    return dof * (1.0 - h + z * np.sqrt(h)) ** 3
+
+def _chi2_quantile_median(dof):
+    """Mediana aproximada da distribuição qui-quadrado (Wilson-Hilferty com z = 0)."""
+    h = 2.0 / (9.0 * dof)
+    return dof * (1.0 - h) ** 3
+
+def _json_key(value):
+    """Valor de grupo como gravado no plano (tipos nativos do Python, serializáveis em JSON)."""
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _group_bounds(df, columns, method, group_by, factor):
+    """Limites por grupo, calculados com uma única agregação groupby."""
+    grouped = df.groupby(list(group_by), observed=True, sort=False)[list(columns)]
+    if method == 'iqr':
+        quantiles = grouped.quantile([0.25, 0.75])
+        q1 = quantiles.xs(0.25, level=-1)
+        q3 = quantiles.xs(0.75, level=-1).reindex(q1.index)
+        iqr = q3 - q1
+        lower, upper = q1 - factor * iqr, q3 + factor * iqr
+    else:
+        mean, std = grouped.mean(), grouped.std()
+        lower, upper = mean - factor * std, mean + factor * std
+    keys = lower.index.to_frame(index=False)
+    return {
+        'keys': [[None if pd.isna(value) else _json_key(value) for value in row] for row in keys.astype(object).values],
+        'lower': lower.to_numpy(dtype=np.float64).tolist(),
+        'upper': upper.reindex(lower.index).to_numpy(dtype=np.float64).tolist()
+    }
+
+def fit_bounds(df, columns, method='iqr', group_by=None, factor=None):
+    """
+    Calcula os limites de outliers (IQR ou z-score) de todas as colunas de uma
+    vez, opcionalmente por grupo (ex.: por equipamento e local).
+
+    Returns:
+        Dicionário coluna -> [inferior, superior] (sem grupos) ou tabela de
+        limites por grupo ({'keys', 'lower', 'upper'})
+    """
+    if factor is None:
+        factor = IQR_FACTOR if method == 'iqr' else ZSCORE_THRESHOLD
+    if group_by:
+        return _group_bounds(df, columns, method, group_by, factor)
+
+    values = _as_matrix(df, columns)
+    if method == 'iqr':
+        q1, q3 = np.nanquantile(values, [0.25, 0.75], axis=0)
+        iqr = q3 - q1
+        lower, upper = q1 - factor * iqr, q3 + factor * iqr
+    else:
+        mean, std = np.nanmean(values, axis=0), np.nanstd(values, axis=0, ddof=1)
+        lower, upper = mean - factor * std, mean + factor * std
+    return {col: [float(lower[i]), float(upper[i])] for i, col in enumerate(columns)}
+
+def fit_robust_covariance(df, columns, quantile=ROBUST_COVARIANCE_QUANTILE, support=ROBUST_COVARIANCE_SUPPORT, iterations=20):
+    """
+    Estima centro e covariância robustos (passos de concentração do MCD a
+    partir da mediana) sobre uma amostra determinística das linhas completas.
+    Linhas cuja distância de Mahalanobis ao quadrado excede o quantil
+    qui-quadrado são outliers multivariados.
+
+    Returns:
+        Dicionário com 'location', 'precision' e 'threshold'
+    """
+    values = _as_matrix(df, columns)
+    values = values[~np.isnan(values).any(axis=1)]
+    if len(values) > OUTLIER_FIT_SAMPLE_ROWS:
+        positions = np.linspace(0, len(values) - 1, OUTLIER_FIT_SAMPLE_ROWS).astype(np.int64)
+        values = values[positions]
+    if len(values) <= len(columns):
+        raise ValueError("Linhas completas insuficientes para a estimativa robusta.")
+
+    h = max(len(columns) + 1, int(len(values) * support))
+    location = np.median(values, axis=0)
+    scale = np.median(np.abs(values - location), axis=0) * 1.4826
+    scale[scale == 0] = 1.0
+    # Subconjunto inicial: linhas mais próximas da mediana (distância escalonada pelo MAD)
+    subset = np.argsort((((values - location) / scale) ** 2).sum(axis=1))[:h]
+    for _ in range(iterations):
+        location = values[subset].mean(axis=0)
+        precision = np.linalg.pinv(np.cov(values[subset], rowvar=False).reshape(len(columns), len(columns)))
+        distances = _mahalanobis(values, location, precision)
+        new_subset = np.argsort(distances)[:h]
+        if np.array_equal(np.sort(new_subset), np.sort(subset)):
+            break
+        subset = new_subset
+
+    # Correção de consistência: a covariância do subconjunto subestima a dispersão
+    dof = len(columns)
+    correction = np.median(distances) / _chi2_quantile_median(dof)
+    return {
+        'location': location.tolist(),
+        'precision': (precision / correction).tolist(),
+        'threshold': float(_chi2_quantile(quantile, dof))
+    }
+
+def _mahalanobis(values, location, precision):
+    """Distância de Mahalanobis ao quadrado de cada linha, calculada em blocos."""
+    distances = np.empty(len(values))
+    for start in range(0, len(values), OUTLIER_CHUNK_ROWS):
+        diff = values[start:start + OUTLIER_CHUNK_ROWS] - location
+        distances[start:start + OUTLIER_CHUNK_ROWS] = ((diff @ precision) * diff).sum(axis=1)
+    return distances
+
+def _group_positions(df, group_by, keys):
+    """Posição de cada linha na tabela de grupos (-1 para grupos desconhecidos), via códigos inteiros."""
+    key_codes, row_codes, sizes = [], [], []
+    for i, col in enumerate(group_by):
+        levels = {}
+        key_codes.append([levels.setdefault(key[i], len(levels)) for key in keys])
+        # Fatoração no tipo original da coluna; apenas os valores distintos são comparados com os grupos
+        codes, uniques = pd.factorize(df[col], use_na_sentinel=False)
+        uniques = pd.Series(uniques, dtype=object)
+        mapping = np.array([levels.get(None if pd.isna(value) else _json_key(value), -1) for value in uniques] + [-1], dtype=np.int64)
+        row_codes.append(mapping[codes])
+        sizes.append(len(levels))
+
+    known = np.all([codes >= 0 for codes in row_codes], axis=0)
+    combined = np.ravel_multi_index([np.where(known, codes, 0) for codes in row_codes], sizes)
+    lookup = np.full(int(np.prod(sizes)), -1, dtype=np.int64)
+    lookup[np.ravel_multi_index(key_codes, sizes)] = np.arange(len(keys))
+    return np.where(known, lookup[combined], -1)
+
+def _row_bounds(df, step):
+    """Matrizes (ou vetores) de limites alinhadas às linhas, com NaN para grupos desconhecidos."""
+    if 'groups' not in step:
+        lower = np.array([step['bounds'][col][0] for col in step['columns']], dtype=np.float64)
+        upper = np.array([step['bounds'][col][1] for col in step['columns']], dtype=np.float64)
+        return lower, upper
+
+    groups = step['groups']
+    positions = _group_positions(df, step['group_by'], groups['keys'])
+    # Linha extra de NaN para grupos sem limites calculados (posição -1)
+    nan_row = np.full((1, len(step['columns'])), np.nan)
+    lower = np.vstack([np.array(groups['lower'], dtype=np.float64).reshape(-1, len(step['columns'])), nan_row])
+    upper = np.vstack([np.array(groups['upper'], dtype=np.float64).reshape(-1, len(step['columns'])), nan_row])
+    return lower[positions], upper[positions]
+
+def outlier_flags(df, step):
+    """
+    Matriz booleana (linhas × colunas) dos valores fora dos limites de uma
+    etapa de outliers por limites. Valores ausentes não são outliers.
+    """
+    values = _as_matrix(df, step['columns'])
+    lower, upper = _row_bounds(df, step)
+    return (values < lower) | (values > upper)
+
+def outlier_mask(df, step):
+    """Vetor booleano com as linhas consideradas outliers por uma etapa do plano."""
+    if step.get('method') == 'robust_covariance':
+        values = _as_matrix(df, step['columns'])
+        distances = _mahalanobis(values, np.array(step['location']), np.array(step['precision']))
+        # Linhas incompletas têm distância NaN e não são marcadas
+        return distances > step['threshold']
+    return outlier_flags(df, step).any(axis=1)
+
+def clip_to_bounds(df, step):
+    """Retorna os valores das colunas da etapa limitados aos limites (valores ausentes mantidos)."""
+    columns = step['columns']
+    values = _as_matrix(df, columns)
+    lower, upper = _row_bounds(df, step)
+    # fmax/fmin ignoram limites NaN (grupos desconhecidos)
+    clipped = np.where(np.isnan(values), values, np.fmin(np.fmax(values, lower), upper))
+    clipped = pd.DataFrame(clipped, index=df.index, columns=columns)
+    return clipped.astype({col: df[col].dtype for col in columns if pd.api.types.is_float_dtype(df[col])})
\ No newline at end of file
@@ -0,0 +1,205 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from components.storage import get_storage_path, iter_dataset_batches, dataset_mtime
+from components.schema import infer_date_format, deterministic_sample, validate_date_format
+
+# Extensão do arquivo de perfil gravado ao lado do dataset
+PROFILE_EXTENSION = ".profile.json"
+
+# Número máximo de valores distintos gravados por coluna (acima disso a cardinalidade é um limite inferior)
+PROFILE_MAX_TRACKED_DISTINCT = 1000
+
+def get_profile_path(dataset_path):
+    """Retorna o caminho do arquivo de perfil de um dataset."""
+    base_name = os.path.splitext(get_storage_path(dataset_path))[0]
+    return f"{base_name}{PROFILE_EXTENSION}"
+
+def _column_kind(series):
+    """Classifica uma coluna como numérica, categórica ou data."""
+    if pd.api.types.is_bool_dtype(series):
+        return 'categorical'
+    if pd.api.types.is_numeric_dtype(series):
+        return 'numeric'
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'date'
+    if series.dtype == 'object' or isinstance(series.dtype, pd.CategoricalDtype):
+        return 'categorical'
+    return 'other'
+
+def _to_json_value(value):
+    """Converte valores numpy/pandas para tipos serializáveis em JSON."""
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+class ColumnProfileBuilder:
+    """
+    Constrói o perfil das colunas de um dataset (tipo, nulos, cardinalidade,
+    valores distintos, mínimo/máximo e formato de data das colunas de texto)
+    de forma incremental, bloco a bloco.
+    Um perfil existente pode ser retomado com `from_profile` para incorporar
+    novos dados sem reprocessar o histórico.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+
+    @classmethod
+    def from_profile(cls, profile):
+        """Retoma a construção a partir de um perfil salvo."""
+        builder = cls()
+        builder.rows = profile['rows']
+        for col, info in profile['columns'].items():
+            state = dict(info)
+            values = info.get('values')
+            state['distinct'] = set(values) if values is not None else None
+            # Perfis antigos não têm o formato de data: a detecção é refeita no próximo bloco
+            state['date_checked'] = 'date_format' in info
+            builder.columns[col] = state
+        return builder
+
+    def update(self, df):
+        """Incorpora um bloco de linhas ao perfil."""
+        self.rows += len(df)
+        for col in df.columns:
+            series = df[col]
+            state = self.columns.setdefault(col, {
+                'null_count': 0,
+                'distinct': set(),
+                'distinct_capped': False,
+                'min': None,
+                'max': None,
+                'date_format': None,
+                'date_checked': False
+            })
+            state['dtype'] = str(series.dtype)
+            state['kind'] = _column_kind(series)
+            state['null_count'] += int(series.isna().sum())
+
+            if state['distinct'] is not None:
+                uniques = series.dropna().unique()
+                if len(uniques) <= PROFILE_MAX_TRACKED_DISTINCT:
+                    state['distinct'].update(_to_json_value(v) for v in uniques)
+                if len(uniques) > PROFILE_MAX_TRACKED_DISTINCT or len(state['distinct']) > PROFILE_MAX_TRACKED_DISTINCT:
+                    # Cardinalidade alta: guardar apenas um limite inferior
+                    state['distinct_count'] = max(len(uniques), len(state['distinct']))
+                    state['distinct'] = None
+                    state['distinct_capped'] = True
+
+            if state['kind'] == 'categorical':
+                self._update_date_format(state, series)
+            else:
+                state['date_format'] = None
+
+            if state['kind'] in ('numeric', 'date') and series.notna().any():
+                chunk_min, chunk_max = series.min(), series.max()
+                if state['kind'] == 'date':
+                    chunk_min, chunk_max = chunk_min.isoformat(), chunk_max.isoformat()
+                else:
+                    chunk_min, chunk_max = float(chunk_min), float(chunk_max)
+                state['min'] = chunk_min if state['min'] is None else min(state['min'], chunk_min)
+                state['max'] = chunk_max if state['max'] is None else max(state['max'], chunk_max)
+        return self
+
+    @staticmethod
+    def _update_date_format(state, series):
+        """Detecta o formato de data no primeiro bloco com valores e o confirma nos seguintes."""
+        if series.notna().sum() == 0:
+            return
+        if not state['date_checked']:
+            state['date_format'] = infer_date_format(series)
+            state['date_checked'] = True
+        elif state['date_format'] is not None:
+            values = deterministic_sample(series).astype(str)
+            if not validate_date_format(values, state['date_format']):
+                state['date_format'] = None
+
+    def to_profile(self):
+        """Retorna o perfil no formato gravado em disco."""
+        columns = {}
+        for col, state in self.columns.items():
+            distinct = state['distinct']
+            values = None
+            if distinct is not None:
+                values = sorted(distinct, key=lambda v: (str(type(v)), v))
+            columns[col] = {
+                'dtype': state['dtype'],
+                'kind': state['kind'],
+                'null_count': state['null_count'],
+                'distinct_count': len(distinct) if distinct is not None else state.get('distinct_count'),
+                'distinct_capped': state['distinct_capped'],
+                'values': values,
+                'min': state['min'],
+                'max': state['max'],
+                'date_format': state.get('date_format')
+            }
+        return {'rows': self.rows, 'columns': columns}
+
+def build_column_profile(df):
+    """Constrói o perfil de colunas de um DataFrame completo."""
+    return ColumnProfileBuilder().update(df).to_profile()
+
+def save_column_profile(profile, dataset_path):
+    """Grava o perfil ao lado do dataset."""
+    profile_path = get_profile_path(dataset_path)
+    tmp_path = f"{profile_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(profile, f)
+    os.replace(tmp_path, profile_path)
+    return profile_path
+
+def load_column_profile(dataset_path):
+    """Lê o perfil salvo de um dataset (None se não existir ou estiver desatualizado)."""
+    profile_path = get_profile_path(dataset_path)
+    storage_path = get_storage_path(dataset_path)
+    if not os.path.exists(profile_path):
+        return None
+    if os.path.exists(storage_path) and os.path.getmtime(profile_path) < dataset_mtime(storage_path):
+        return None
+    with open(profile_path, 'r') as f:
+        return json.load(f)
+
+def get_column_profile(dataset_path, df=None):
+    """
+    Retorna o perfil de um dataset, construindo-o e gravando-o na primeira vez
+    (ex.: datasets processados antes da existência dos perfis).
+
+    Args:
+        dataset_path: Caminho do dataset
+        df: DataFrame já carregado (opcional, evita uma nova leitura)
+    """
+    profile = load_column_profile(dataset_path)
+    if profile is None:
+        if df is None:
+            # Construir bloco a bloco, sem carregar o dataset inteiro
+            builder = ColumnProfileBuilder()
+            for batch in iter_dataset_batches(dataset_path):
+                builder.update(batch)
+            profile = builder.to_profile()
+        else:
+            profile = build_column_profile(df)
+        save_column_profile(profile, dataset_path)
+    return profile
+
+def date_formats_from_profile(profile):
+    """
+    Retorna os formatos de data detectados no processamento ({coluna: formato}),
+    ou None se o perfil foi gravado antes da detecção de formatos.
+    """
+    columns = profile['columns']
+    if any('date_format' not in info for info in columns.values()):
+        return None
+    return {col: info['date_format'] for col, info in columns.items() if info['date_format']}
+
+def column_types_from_profile(profile):
+    """Classifica as colunas por tipo a partir do perfil (mesmo formato de get_column_types)."""
+    column_types = {'numeric': [], 'categorical': [], 'date': []}
+    for col, info in profile['columns'].items():
+        if info['kind'] in column_types:
+            column_types[info['kind']].append(col)
+    return column_types
\ No newline at end of file
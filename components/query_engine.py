@@ -0,0 +1,296 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+from components.storage import resolve_dataset_path, get_storage_path, open_dataset, is_partitioned, dataset_size_bytes, STORAGE_EXTENSION, PARTITION_PREFIX
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Motor de consulta: "auto" (DuckDB, se instalado, ou Arrow), "duckdb" ou "arrow"
+QUERY_BACKEND = os.environ.get("QUERY_BACKEND", "auto")
+
+# A partir deste tamanho de arquivo os gráficos são calculados diretamente no arquivo
+QUERY_PUSHDOWN_MIN_MB = int(os.environ.get("QUERY_PUSHDOWN_MIN_MB", "512"))
+
+# Semente da amostragem (amostras repetíveis entre execuções)
+QUERY_SAMPLE_SEED = 42
+
+# Funções de agregação suportadas pelas consultas
+QUERY_FUNCTIONS = ['sum', 'mean', 'count', 'min', 'max']
+
+class ChartQuery:
+    """
+    Consulta de um gráfico sobre o arquivo do dataset: projeção, filtros
+    categóricos, remoção de nulos, agrupamento e amostragem, executados
+    em uma única leitura. Apenas as linhas do resultado chegam ao pandas.
+
+    Args:
+        columns: Colunas lidas do arquivo
+        filters: Dicionário coluna -> valores permitidos (opcional)
+        dropna: Colunas cujas linhas nulas são descartadas (opcional)
+        group_by: Colunas de agrupamento (opcional)
+        aggregates: Lista de tuplas (coluna, função, nome do resultado), usada com `group_by`
+        sample_size: Número máximo de linhas do resultado (amostra repetível)
+    """
+
+    def __init__(self, columns, filters=None, dropna=None, group_by=None, aggregates=None, sample_size=None):
+        self.columns = list(dict.fromkeys(col for col in columns if col is not None))
+        self.filters = filters or {}
+        self.dropna = list(dict.fromkeys(col for col in (dropna or []) if col is not None))
+        self.group_by = list(group_by or [])
+        self.aggregates = list(aggregates or [])
+        self.sample_size = sample_size
+
+        for _, function, _ in self.aggregates:
+            if function not in QUERY_FUNCTIONS:
+                raise ValueError(f"Função de agregação não suportada: {function}")
+
+    @classmethod
+    def for_chart(cls, x_col, y_col=None, color_col=None, filters=None, sample_size=None):
+        """Consulta dos pontos de um gráfico (colunas usadas, sem nulos)."""
+        columns = [x_col, y_col, color_col]
+        return cls(columns, filters, dropna=columns, sample_size=sample_size)
+
+    @classmethod
+    def for_aggregation(cls, aggregation, filters=None, sample_size=None):
+        """Consulta equivalente a `df.groupby(group_by)[column].<function>().reset_index()`."""
+        group_by = [aggregation['group_by']]
+        column = aggregation['column']
+        return cls(
+            group_by + [column], filters,
+            dropna=group_by,
+            group_by=group_by,
+            aggregates=[(column, aggregation.get('function', 'sum'), column)],
+            sample_size=sample_size
+        )
+
+class ArrowQueryBackend:
+    """
+    Executa consultas com o pyarrow, lote a lote: projeção e filtros são
+    aplicados na leitura do Parquet (descartando row groups pelas
+    estatísticas), os agrupamentos são combinados a partir de agregações
+    parciais de cada lote e a amostragem mantém apenas as linhas sorteadas.
+    Sem agrupamento nem amostra, o resultado é a tabela filtrada inteira.
+    """
+
+    name = "Arrow"
+
+    # Agregações parciais de cada lote e como são combinadas entre lotes
+    _PARTIALS = {
+        'sum': [('sum', 'sum')],
+        'count': [('count', 'sum')],
+        'min': [('min', 'min')],
+        'max': [('max', 'max')],
+        'mean': [('sum', 'sum'), ('count', 'sum')]
+    }
+
+    # Número de grupos parciais acumulados antes de combiná-los
+    _COMBINE_ROWS = 1_000_000
+
+    def _scan(self, path, query):
+        expression = None
+        for col, values in query.filters.items():
+            values = list(values)
+            condition = pc.field(col).isin(values) if values else pc.scalar(False)
+            expression = condition if expression is None else expression & condition
+        for col in query.dropna:
+            condition = pc.field(col).is_valid()
+            expression = condition if expression is None else expression & condition
+        return open_dataset(path).scanner(columns=query.columns, filter=expression)
+
+    @staticmethod
+    def _aggregate(table, keys, aggregations):
+        """Agrega `table` por `keys`; `aggregations` é uma lista de (coluna, função, nome do resultado)."""
+        specs = []
+        for column, function, _ in aggregations:
+            if function == 'sum':
+                # Soma de grupos sem valores é zero, como no pandas
+                specs.append((column, 'sum', pc.ScalarAggregateOptions(min_count=0)))
+            else:
+                specs.append((column, function))
+        result = table.group_by(keys, use_threads=False).aggregate(specs)
+        names = {f"{column}_{function}": alias for column, function, alias in aggregations}
+        result = result.rename_columns([names.get(name, name) for name in result.column_names])
+        return result.select(keys + [alias for _, _, alias in aggregations])
+
+    def _group(self, scanner, query):
+        partial_specs = []
+        combine_specs = []
+        for i, (column, function, _) in enumerate(query.aggregates):
+            for partial, combine in self._PARTIALS[function]:
+                name = f"__{i}_{partial}"
+                partial_specs.append((column, partial, name))
+                combine_specs.append((name, combine, name))
+
+        partials = []
+        partial_rows = 0
+        for batch in scanner.to_batches():
+            if batch.num_rows == 0:
+                continue
+            partials.append(self._aggregate(pa.Table.from_batches([batch]), query.group_by, partial_specs))
+            partial_rows += partials[-1].num_rows
+            if partial_rows > self._COMBINE_ROWS:
+                partials = [self._aggregate(pa.concat_tables(partials), query.group_by, combine_specs)]
+                partial_rows = partials[0].num_rows
+
+        if partials:
+            combined = self._aggregate(pa.concat_tables(partials), query.group_by, combine_specs).to_pandas()
+        else:
+            schema = pa.schema([scanner.projected_schema.field(col) for col in query.group_by])
+            combined = schema.empty_table().to_pandas()
+            for name, _, _ in combine_specs:
+                combined[name] = pd.Series(dtype='float64')
+
+        df = combined[query.group_by].copy()
+        for i, (_, function, alias) in enumerate(query.aggregates):
+            if function == 'mean':
+                counts = combined[f"__{i}_count"]
+                df[alias] = (combined[f"__{i}_sum"] / counts.where(counts > 0)).astype('float64')
+            else:
+                df[alias] = combined[f"__{i}_{self._PARTIALS[function][0][0]}"]
+        return df
+
+    def _sample(self, scanner, sample_size):
+        # Amostragem por chaves aleatórias: ficam as `sample_size` linhas de menor chave,
+        # reordenadas pela posição original
+        rng = np.random.default_rng(QUERY_SAMPLE_SEED)
+        kept = None
+        kept_keys = np.empty(0)
+        kept_positions = np.empty(0, dtype=np.int64)
+        offset = 0
+        for batch in scanner.to_batches():
+            keys = rng.random(batch.num_rows)
+            positions = np.arange(offset, offset + batch.num_rows)
+            offset += batch.num_rows
+            if len(kept_keys) >= sample_size:
+                # Apenas as linhas que entrariam na amostra atual
+                selected = np.flatnonzero(keys < kept_keys.max())
+                batch, keys, positions = batch.take(selected), keys[selected], positions[selected]
+            if batch.num_rows == 0:
+                continue
+            table = pa.Table.from_batches([batch])
+            kept = table if kept is None else pa.concat_tables([kept, table])
+            kept_keys = np.concatenate([kept_keys, keys])
+            kept_positions = np.concatenate([kept_positions, positions])
+            if len(kept_keys) > sample_size:
+                selected = np.argpartition(kept_keys, sample_size - 1)[:sample_size]
+                kept, kept_keys, kept_positions = kept.take(selected), kept_keys[selected], kept_positions[selected]
+
+        if kept is None:
+            return scanner.projected_schema.empty_table()
+        return kept.take(np.argsort(kept_positions))
+
+    def execute(self, path, query):
+        scanner = self._scan(path, query)
+
+        if query.group_by:
+            df = self._group(scanner, query)
+            if query.sample_size and query.sample_size < len(df):
+                rng = np.random.default_rng(QUERY_SAMPLE_SEED)
+                df = df.iloc[np.sort(rng.choice(len(df), query.sample_size, replace=False))]
+            return df.sort_values(query.group_by, ignore_index=True)
+
+        if query.sample_size:
+            return self._sample(scanner, query.sample_size).to_pandas()
+        return scanner.to_table().to_pandas()
+
+class DuckDBQueryBackend:
+    """
+    Executa consultas com o DuckDB: a consulta inteira (inclusive o
+    agrupamento) roda sobre o arquivo em todos os núcleos, sem carregar o
+    dataset em memória.
+    """
+
+    name = "DuckDB"
+
+    def __init__(self):
+        self._connection = duckdb.connect()
+
+    @staticmethod
+    def _quote(name):
+        return '"' + str(name).replace('"', '""') + '"'
+
+    def _build_sql(self, path, query):
+        if is_partitioned(path):
+            # Partições com tipos diferentes são unificadas pelo nome das colunas
+            source = "read_parquet(?, union_by_name = true)"
+            params = [os.path.join(path, f"{PARTITION_PREFIX}*{STORAGE_EXTENSION}")]
+        else:
+            source = "read_parquet(?)"
+            params = [path]
+        conditions = []
+        for col, values in query.filters.items():
+            values = list(values)
+            if not values:
+                conditions.append("FALSE")
+                continue
+            conditions.append(f"{self._quote(col)} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+        conditions.extend(f"{self._quote(col)} IS NOT NULL" for col in query.dropna)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        if query.group_by:
+            keys = ", ".join(self._quote(col) for col in query.group_by)
+            templates = {
+                'sum': "COALESCE(SUM({}), 0)",
+                'mean': "AVG({})",
+                'count': "COUNT({})",
+                'min': "MIN({})",
+                'max': "MAX({})"
+            }
+            aggregates = ", ".join(
+                f"{templates[function].format(self._quote(column))} AS {self._quote(alias)}"
+                for column, function, alias in query.aggregates
+            )
+            sql = f"SELECT {keys}, {aggregates} FROM {source}{where} GROUP BY {keys} ORDER BY {keys}"
+        else:
+            columns = ", ".join(self._quote(col) for col in query.columns)
+            sql = f"SELECT {columns} FROM {source}{where}"
+
+        if query.sample_size:
+            sql = f"SELECT * FROM ({sql}) USING SAMPLE reservoir({int(query.sample_size)} ROWS) REPEATABLE ({QUERY_SAMPLE_SEED})"
+        return sql, params
+
+    def execute(self, path, query):
+        sql, params = self._build_sql(path, query)
+        # Um cursor por consulta: a conexão é compartilhada entre sessões (threads)
+        cursor = self._connection.cursor()
+        try:
+            df = cursor.execute(sql, params).df()
+        finally:
+            cursor.close()
+        if query.group_by and query.sample_size:
+            df = df.sort_values(query.group_by, ignore_index=True)
+        return df
+
+@st.cache_resource
+def get_query_backend():
+    """Retorna o motor de consulta configurado (DuckDB, se disponível, ou Arrow)."""
+    if QUERY_BACKEND in ("auto", "duckdb") and duckdb is not None:
+        return DuckDBQueryBackend()
+    return ArrowQueryBackend()
+
+def should_push_down(dataset_path):
+    """Indica se os gráficos do dataset devem ser calculados diretamente no arquivo."""
+    storage_path = get_storage_path(dataset_path)
+    if not os.path.exists(storage_path):
+        return False
+    return dataset_size_bytes(storage_path) >= QUERY_PUSHDOWN_MIN_MB * 1024 * 1024
+
+def execute_chart_query(dataset_path, query):
+    """
+    Executa uma consulta sobre o arquivo de um dataset.
+
+    Args:
+        dataset_path: Caminho do dataset processado
+        query: ChartQuery
+
+    Returns:
+        DataFrame com o resultado
+    """
+    return get_query_backend().execute(resolve_dataset_path(dataset_path), query)
\ No newline at end of file
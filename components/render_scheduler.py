@@ -0,0 +1,79 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from components.instrumentation import current_context
+
+# Número máximo de gráficos preparados ao mesmo tempo (em todo o processo; 1 desabilita o paralelismo)
+RENDER_MAX_WORKERS = int(os.environ.get("RENDER_MAX_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+class DeferredMessages:
+    """
+    Guarda as mensagens (st.info, st.success, st.warning, st.error) emitidas
+    durante a preparação de um gráfico em outra thread, para exibi-las depois
+    na thread do script, no lugar do gráfico.
+    """
+
+    def __init__(self):
+        self.messages = []
+
+    def info(self, text):
+        self.messages.append(('info', text))
+
+    def success(self, text):
+        self.messages.append(('success', text))
+
+    def warning(self, text):
+        self.messages.append(('warning', text))
+
+    def error(self, text):
+        self.messages.append(('error', text))
+
+    def replay(self):
+        """Exibe as mensagens guardadas no contêiner atual."""
+        for level, text in self.messages:
+            getattr(st, level)(text)
+
+class RenderBatch:
+    """
+    Gráficos configurados durante uma execução da página, preparados juntos
+    ao final dela. Depois de encerrado (`closed`), novos gráficos (ex.: de
+    reexecuções de fragmentos) são preparados individualmente.
+    """
+
+    def __init__(self):
+        self.pending = []
+        self.closed = False
+
+@st.cache_resource
+def get_render_executor():
+    """Retorna o pool de threads compartilhado usado na preparação dos gráficos."""
+    return ThreadPoolExecutor(max_workers=max(1, RENDER_MAX_WORKERS), thread_name_prefix="chart-render")
+
+def run_render_tasks(tasks):
+    """
+    Executa tarefas de preparação de gráficos em paralelo (limitadas por
+    RENDER_MAX_WORKERS) e retorna os resultados na ordem das tarefas, à medida
+    que ficam prontos.
+
+    As tarefas não podem chamar funções do Streamlit: elas rodam fora da
+    thread do script (ver DeferredMessages).
+
+    Yields:
+        Tuplas (resultado, exceção), com exceção None em caso de sucesso
+    """
+    if len(tasks) <= 1 or RENDER_MAX_WORKERS <= 1:
+        for task in tasks:
+            try:
+                yield task(), None
+            except Exception as e:
+                yield None, e
+        return
+
+    executor = get_render_executor()
+    # Uma cópia do contexto por tarefa: os spans ficam associados à execução atual
+    futures = [executor.submit(current_context().run, task) for task in tasks]
+    for future in futures:
+        try:
+            yield future.result(), None
+        except Exception as e:
+            yield None, e
\ No newline at end of file
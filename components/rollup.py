@@ -0,0 +1,335 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+from components.query_engine import ChartQuery, execute_chart_query
+from components.storage import read_dataset, read_dataset_schema, resolve_dataset_path, write_dataset, get_storage_path, dataset_signature, dataset_mtime
+
+# Sufixo do diretório com os cubos de um dataset (gravado ao lado do arquivo)
+ROLLUP_DIR_SUFFIX = ".rollups"
+
+# Número máximo de células (combinações de dimensões) de um cubo
+ROLLUP_MAX_CELLS = 100000
+
+# Estatísticas mescláveis guardadas para cada medida (a média é soma / contagem)
+ROLLUP_STATS = ['count', 'sum', 'min', 'max']
+
+# Funções de agregação que podem ser respondidas pelos cubos
+ROLLUP_FUNCTIONS = ['sum', 'mean', 'count', 'min', 'max']
+
+# Número de respostas (consultas já agregadas) mantidas em memória
+ROLLUP_MAX_ANSWERS = 1024
+
+def get_rollup_dir(dataset_path):
+    """Retorna o diretório dos cubos de um dataset."""
+    base_name = os.path.splitext(get_storage_path(dataset_path))[0]
+    return f"{base_name}{ROLLUP_DIR_SUFFIX}"
+
+def _cube_path(dataset_path, dims):
+    name = hashlib.sha1(json.dumps(list(dims)).encode()).hexdigest()[:16]
+    return os.path.join(get_rollup_dir(dataset_path), f"{name}.parquet")
+
+def _stat_column(measure, stat):
+    return f"{measure}__{stat}"
+
+def _is_stat_column(col):
+    return isinstance(col, str) and col.rsplit('__', 1)[-1] in ROLLUP_STATS and '__' in col
+
+def _is_dimension(series):
+    return (
+        series.dtype == 'object'
+        or isinstance(series.dtype, pd.CategoricalDtype)
+        or pd.api.types.is_bool_dtype(series)
+    )
+
+def _is_measure(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+def _is_dimension_type(dtype):
+    return pa.types.is_string(dtype) or pa.types.is_large_string(dtype) or pa.types.is_dictionary(dtype) or pa.types.is_boolean(dtype)
+
+def _is_measure_type(dtype):
+    return pa.types.is_integer(dtype) or pa.types.is_floating(dtype)
+
+def build_cube(df, dims, measures):
+    """
+    Agrega as medidas por combinação das dimensões.
+
+    Returns:
+        DataFrame com uma linha por célula: as dimensões e, para cada medida,
+        as colunas <medida>__count/__sum/__min/__max; ou None se o cubo
+        excederia ROLLUP_MAX_CELLS células
+    """
+    grouped = df.groupby(list(dims), observed=True, sort=True)[list(measures)]
+    if grouped.ngroups > ROLLUP_MAX_CELLS:
+        return None
+    cube = grouped.agg(ROLLUP_STATS)
+    cube.columns = [_stat_column(measure, stat) for measure, stat in cube.columns]
+    return cube.reset_index()
+
+def build_cube_from_file(dataset_path, dims):
+    """
+    Agrega o cubo diretamente no arquivo do dataset (ver build_cube), lendo
+    apenas as colunas necessárias.
+
+    Returns:
+        DataFrame do cubo ou None se as colunas não permitirem o cubo ou ele
+        excederia ROLLUP_MAX_CELLS células
+    """
+    schema = read_dataset_schema(dataset_path)
+    types = {field.name: field.type for field in schema}
+    if any(dim not in types or not _is_dimension_type(types[dim]) for dim in dims):
+        return None
+    measures = [name for name, dtype in types.items() if name not in dims and _is_measure_type(dtype)]
+    if not measures:
+        return None
+
+    query = ChartQuery(
+        list(dims) + measures,
+        dropna=dims,
+        group_by=dims,
+        aggregates=[(measure, stat, _stat_column(measure, stat)) for measure in measures for stat in ROLLUP_STATS]
+    )
+    cube = execute_chart_query(dataset_path, query)
+    if len(cube) > ROLLUP_MAX_CELLS:
+        return None
+    return cube
+
+def merge_cubes(cubes, dims):
+    """
+    Combina cubos parciais (ex.: de blocos ou partições diferentes) ou
+    re-agrega um cubo por um subconjunto das suas dimensões.
+    """
+    combined = pd.concat(cubes, ignore_index=True) if len(cubes) > 1 else cubes[0]
+    stat_columns = [col for col in combined.columns if _is_stat_column(col) and col not in dims]
+    # Contagens e somas parciais são somadas; mínimos e máximos, combinados
+    functions = {col: col.rsplit('__', 1)[-1].replace('count', 'sum') for col in stat_columns}
+    result = combined.groupby(list(dims), observed=True, sort=True).agg(functions)
+    return result.reset_index()
+
+def query_cube(cube, group_by, column, function, filters=None):
+    """
+    Responde uma agregação a partir de um cubo.
+
+    Args:
+        cube: Cubo com as dimensões de `group_by` e dos filtros
+        group_by: Lista de colunas de agrupamento
+        column: Medida agregada
+        function: "sum", "mean", "count", "min" ou "max"
+        filters: Dicionário coluna -> valores permitidos (opcional)
+
+    Returns:
+        DataFrame com as colunas de `group_by` e `column`, como
+        `df.groupby(group_by)[column].<function>().reset_index()`
+    """
+    if filters:
+        mask = np.ones(len(cube), dtype=bool)
+        for col, values in filters.items():
+            mask &= cube[col].isin(values).to_numpy()
+        cube = cube[mask]
+
+    # Re-agregar pelas dimensões pedidas (a soma das partes é exata para as estatísticas mescláveis)
+    stats = [_stat_column(column, stat) for stat in ROLLUP_STATS]
+    cube_dims = [col for col in cube.columns if not _is_stat_column(col)]
+    if list(group_by) != cube_dims:
+        cube = merge_cubes([cube[list(group_by) + stats]], group_by)
+
+    count = cube[_stat_column(column, 'count')]
+    if function == 'mean':
+        values = cube[_stat_column(column, 'sum')] / count.where(count > 0)
+    elif function == 'count':
+        values = count.astype(np.int64)
+    else:
+        values = cube[_stat_column(column, function)]
+
+    result = cube[list(group_by)].copy()
+    result[column] = values.to_numpy()
+    return result.reset_index(drop=True)
+
+class RollupStore:
+    """
+    Cubos de agregação dos datasets processados, gravados em disco ao lado de
+    cada arquivo e mantidos em memória. Um cubo é construído na primeira
+    consulta de um conjunto de dimensões e descartado quando o arquivo do
+    dataset muda (data de modificação ou tamanho).
+    """
+
+    def __init__(self):
+        self._cubes = {}
+        self._answers = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self.hits = 0
+        self.builds = 0
+
+    @staticmethod
+    def _signature(path):
+        return dataset_signature(path)
+
+    def get(self, dataset_path, dims, df=None):
+        """
+        Retorna o cubo de um dataset para as dimensões informadas (todas as
+        colunas numéricas são medidas), ou None se não for possível construí-lo.
+
+        Args:
+            dataset_path: Caminho do dataset processado
+            dims: Colunas categóricas usadas como dimensões
+            df: Dataset já carregado (opcional, evita uma nova leitura)
+        """
+        path = resolve_dataset_path(dataset_path)
+        dims = tuple(sorted(dims))
+        key = (os.path.abspath(path), dims)
+        signature = self._signature(path)
+
+        with self._lock:
+            entry = self._cubes.get(key)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                entry = self._cubes.get(key)
+                if entry is not None and entry[0] == signature:
+                    self.hits += 1
+                    return entry[1]
+            try:
+                cube = self._load_or_build(path, dims, df)
+                with self._lock:
+                    self._cubes[key] = (signature, cube)
+            finally:
+                with self._lock:
+                    self._build_locks.pop(key, None)
+        return cube
+
+    def _load_or_build(self, path, dims, df):
+        cube_path = _cube_path(path, dims)
+        if os.path.exists(cube_path) and os.path.getmtime(cube_path) >= dataset_mtime(path):
+            return read_dataset(cube_path)
+
+        if df is None:
+            # Sem o dataset em memória, o cubo é agregado pelo motor de consulta sobre o arquivo
+            cube = build_cube_from_file(path, dims)
+        else:
+            if any(dim not in df.columns or not _is_dimension(df[dim]) for dim in dims):
+                return None
+            measures = [col for col in df.columns if col not in dims and _is_measure(df[col])]
+            if not measures:
+                return None
+            cube = build_cube(df, dims, measures)
+        self.builds += 1
+        if cube is not None:
+            write_dataset(cube, cube_path)
+        return cube
+
+    def query(self, dataset_path, group_by, column, function, filters=None, df=None):
+        """Responde uma agregação pelo cubo das dimensões usadas (ver query_rollup)."""
+        dims = set(group_by) | set(filters or {})
+        path = os.path.abspath(resolve_dataset_path(dataset_path))
+        filters_key = tuple(sorted((col, tuple(sorted(map(str, values)))) for col, values in (filters or {}).items()))
+        answer_key = (path, self._signature(path), tuple(group_by), column, function, filters_key)
+
+        with self._lock:
+            answer = self._answers.get(answer_key)
+            if answer is not None:
+                self._answers.move_to_end(answer_key)
+                self.hits += 1
+                return answer
+
+        cube = self.get(dataset_path, dims, df)
+        if cube is None or _stat_column(column, 'count') not in cube.columns:
+            return None
+        answer = query_cube(cube, group_by, column, function, filters)
+
+        with self._lock:
+            self._answers[answer_key] = answer
+            while len(self._answers) > ROLLUP_MAX_ANSWERS:
+                self._answers.popitem(last=False)
+        return answer
+
+    def invalidate(self, dataset_path, remove_files=True):
+        """Remove os cubos de um dataset da memória e, com `remove_files`, do disco."""
+        path = os.path.abspath(get_storage_path(dataset_path))
+        with self._lock:
+            for key in [k for k in self._cubes if k[0] == path]:
+                del self._cubes[key]
+            for key in [k for k in self._answers if k[0] == path]:
+                del self._answers[key]
+        if remove_files:
+            shutil.rmtree(get_rollup_dir(dataset_path), ignore_errors=True)
+
+class RollupUpdater:
+    """
+    Atualiza os cubos gravados de um dataset com linhas acrescentadas:
+    apenas os novos blocos são agregados, e os cubos parciais são mesclados
+    aos existentes (merge_cubes) no final.
+    """
+
+    def __init__(self, dataset_path):
+        self.dataset_path = dataset_path
+        self._cubes = []
+        rollup_dir = get_rollup_dir(dataset_path)
+        if os.path.isdir(rollup_dir):
+            for name in sorted(os.listdir(rollup_dir)):
+                if not name.endswith(".parquet"):
+                    continue
+                names = read_dataset_schema(os.path.join(rollup_dir, name)).names
+                dims = [col for col in names if not _is_stat_column(col)]
+                measures = list(dict.fromkeys(col.rsplit('__', 1)[0] for col in names if _is_stat_column(col)))
+                self._cubes.append({'path': os.path.join(rollup_dir, name), 'dims': dims, 'measures': measures, 'partials': []})
+
+    def update(self, df):
+        """Agrega um bloco de linhas acrescentadas em cada cubo."""
+        for cube in self._cubes:
+            if cube['partials'] is None:
+                continue
+            columns = cube['dims'] + cube['measures']
+            if any(col not in df.columns for col in columns) or not all(_is_measure(df[col]) for col in cube['measures']):
+                cube['partials'] = None
+                continue
+            partial = build_cube(df, cube['dims'], cube['measures'])
+            cube['partials'] = None if partial is None else cube['partials'] + [partial]
+
+    def finish(self):
+        """Grava os cubos atualizados (cubos que não puderam ser atualizados são descartados)."""
+        for cube in self._cubes:
+            merged = None
+            if cube['partials'] is not None:
+                merged = merge_cubes([read_dataset(cube['path'])] + cube['partials'], cube['dims'])
+            if merged is None or len(merged) > ROLLUP_MAX_CELLS:
+                os.remove(cube['path'])
+            else:
+                write_dataset(merged, cube['path'])
+        get_rollup_store().invalidate(self.dataset_path, remove_files=False)
+
+@st.cache_resource
+def get_rollup_store():
+    """Retorna a instância única dos cubos de agregação do processo."""
+    return RollupStore()
+
+def query_rollup(dataset_path, group_by, column, function, filters=None, df=None):
+    """
+    Responde `df.groupby(group_by)[column].<function>()` (com filtros
+    categóricos opcionais) a partir do cubo do dataset.
+
+    Returns:
+        DataFrame agregado ou None se a consulta não puder ser respondida pelo cubo
+    """
+    if function not in ROLLUP_FUNCTIONS:
+        return None
+    group_by = list(dict.fromkeys(group_by))
+    filters = filters or {}
+    if column in group_by or column in filters:
+        return None
+    return get_rollup_store().query(dataset_path, group_by, column, function, filters, df)
+
+def invalidate_rollups(dataset_path):
+    """Descarta os cubos de um dataset cujo conteúdo foi alterado."""
+    get_rollup_store().invalidate(dataset_path)
\ No newline at end of file
@@ -0,0 +1,139 @@
+import re
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+# Número de valores (distribuídos uniformemente pela coluna) usados na detecção de formatos
+DATE_SAMPLE_SIZE = 200
+
+# Formatos testados quando o formato não pode ser deduzido do primeiro valor
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%dT%H:%M:%S",
+    "%d/%m/%Y",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%m/%d/%Y",
+    "%m/%d/%Y %H:%M:%S",
+    "%Y/%m/%d",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+    "ISO8601",
+]
+
+_YEAR_FIRST = re.compile(r"^\s*\d{4}[-/.]")
+
+def deterministic_sample(series, size=DATE_SAMPLE_SIZE):
+    """
+    Seleciona até `size` valores não nulos em posições igualmente espaçadas,
+    incluindo o primeiro e o último. Execuções repetidas retornam sempre a
+    mesma amostra.
+    """
+    values = series.dropna()
+    if len(values) <= size:
+        return values
+    positions = np.unique(np.linspace(0, len(values) - 1, size).astype(np.int64))
+    return values.iloc[positions]
+
+def _is_date_format(fmt):
+    """Aceita apenas formatos com dia, mês e ano (evita interpretar números como datas)."""
+    if fmt == "ISO8601":
+        return True
+    has_year = "%Y" in fmt or "%y" in fmt
+    has_month = "%m" in fmt or "%b" in fmt or "%B" in fmt
+    return has_year and has_month and "%d" in fmt
+
+def _text_values(series):
+    """Retorna os valores de texto a analisar (as categorias, em colunas categóricas)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = pd.Series(series.cat.categories)
+    elif series.dtype != 'object':
+        return None
+    values = deterministic_sample(series)
+    if values.empty or not all(isinstance(value, str) for value in values):
+        return None
+    return values
+
+def _to_datetime(values, fmt):
+    """Converte valores com formato explícito (em UTC quando o formato tem fuso horário)."""
+    return pd.to_datetime(values, format=fmt, errors='coerce', utc='%z' in fmt)
+
+def validate_date_format(values, fmt):
+    """Indica se todos os valores são interpretados com o formato informado."""
+    try:
+        parsed = _to_datetime(values, fmt)
+    except (ValueError, TypeError):
+        return False
+    return bool(parsed.notna().all())
+
+def infer_date_format(series):
+    """
+    Detecta o formato de data de uma coluna de texto.
+
+    O formato é deduzido do primeiro valor da amostra (dia antes do mês, exceto
+    quando o valor começa pelo ano) e confirmado em toda a amostra; se não for
+    válido, os formatos de DATE_FORMATS são testados em ordem.
+
+    Returns:
+        Formato (ex.: "%d/%m/%Y") ou None se a coluna não contém datas
+    """
+    values = _text_values(series)
+    if values is None:
+        return None
+
+    # Valores curtos (ex.: "2024") só seriam aceitos pelo formato ISO8601 genérico
+    formats = DATE_FORMATS if values.str.len().min() >= 8 else [f for f in DATE_FORMATS if f != "ISO8601"]
+    first = values.iloc[0]
+    year_first = bool(_YEAR_FIRST.match(first))
+    candidates = [
+        guess_datetime_format(first, dayfirst=not year_first),
+        guess_datetime_format(first, dayfirst=year_first)
+    ] + formats
+
+    for fmt in dict.fromkeys(candidates):
+        if fmt and _is_date_format(fmt) and validate_date_format(values, fmt):
+            return fmt
+    return None
+
+def infer_date_schema(df):
+    """Detecta as colunas de data de um DataFrame e seus formatos ({coluna: formato})."""
+    schema = {}
+    for col in df.columns:
+        fmt = infer_date_format(df[col])
+        if fmt is not None:
+            schema[col] = fmt
+    return schema
+
+def parse_dates(series, fmt):
+    """
+    Converte uma coluna de texto para datas usando um formato explícito.
+    Em colunas categóricas, apenas as categorias são convertidas.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = _to_datetime(series.cat.categories, fmt)
+        codes = series.cat.codes.to_numpy()
+        values = categories.take(codes, allow_fill=True, fill_value=pd.NaT)
+        return pd.Series(values, index=series.index, name=series.name)
+    return _to_datetime(series, fmt)
+
+def apply_date_schema(df, schema):
+    """
+    Converte as colunas de data de um DataFrame.
+
+    Args:
+        df: DataFrame a ser convertido
+        schema: Dicionário {coluna: formato}
+
+    Returns:
+        Tupla (DataFrame convertido, lista de colunas convertidas)
+    """
+    # Cópia rasa: apenas as colunas convertidas são substituídas
+    result_df = df.copy(deep=False)
+    date_columns = []
+    for col, fmt in schema.items():
+        if col in result_df.columns and not pd.api.types.is_datetime64_any_dtype(result_df[col]):
+            result_df[col] = parse_dates(result_df[col], fmt)
+            date_columns.append(col)
+    return result_df, date_columns
\ No newline at end of file
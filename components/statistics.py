@@ -0,0 +1,285 @@
+import os
+import numpy as np
+from components.storage import get_storage_path, dataset_mtime
+
+# Parâmetro de compressão do t-digest (maior = quantis mais precisos)
+DIGEST_COMPRESSION = 500
+
+# Extensão do arquivo com o estado das estatísticas, gravado ao lado do dataset
+STATS_EXTENSION = ".stats.npz"
+
+# Até este número de centroides os valores são mantidos sem compressão (quantis exatos)
+DIGEST_EXACT_LIMIT = 50000
+
+class TDigest:
+    """
+    Sketch mesclável para estimar quantis (t-digest com escala k1).
+
+    Enquanto o número de valores for pequeno, os valores são mantidos
+    individualmente e os quantis são exatos (interpolação linear, como no
+    pandas). Acima de DIGEST_EXACT_LIMIT os valores são agrupados em centroides.
+    """
+
+    def __init__(self, compression=DIGEST_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+        self.min = np.inf
+        self.max = -np.inf
+        self._sorted = True
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def update(self, values):
+        """Adiciona valores (NaN são ignorados)."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self._add(values, np.ones(values.size), values.min(), values.max())
+        return self
+
+    def merge(self, other):
+        """Incorpora os centroides de outro digest."""
+        if other.means.size:
+            self._add(other.means, other.weights, other.min, other.max)
+        return self
+
+    def _add(self, means, weights, min_value, max_value):
+        self.means = np.concatenate([self.means, means])
+        self.weights = np.concatenate([self.weights, weights])
+        self.min = min(self.min, min_value)
+        self.max = max(self.max, max_value)
+        self._sorted = False
+        if self.means.size > DIGEST_EXACT_LIMIT:
+            self._compress()
+
+    def _sort(self):
+        if not self._sorted:
+            order = np.argsort(self.means, kind='mergesort')
+            self.means = self.means[order]
+            self.weights = self.weights[order]
+            self._sorted = True
+
+    def _compress(self):
+        """Agrupa centroides vizinhos respeitando o limite da função de escala k1."""
+        self._sort()
+        total = self.weights.sum()
+        cumulative = np.cumsum(self.weights)
+        q = (cumulative - self.weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+        clusters = np.floor(k - k[0]).astype(np.int64)
+        _, cluster_idx = np.unique(clusters, return_inverse=True)
+
+        weights = np.bincount(cluster_idx, weights=self.weights)
+        means = np.bincount(cluster_idx, weights=self.means * self.weights) / weights
+        self.means = means
+        self.weights = weights
+
+    def quantile(self, q):
+        """
+        Estima um ou mais quantis.
+
+        Args:
+            q: Quantil (0-1) ou lista de quantis
+
+        Returns:
+            Valor (ou array de valores) estimado; NaN se o digest estiver vazio
+        """
+        scalar = np.isscalar(q)
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if self.means.size == 0:
+            result = np.full(q.shape, np.nan)
+            return result[0] if scalar else result
+
+        self._sort()
+        total = self.weights.sum()
+        # Posição (em número de observações) do centro de cada centroide
+        positions = np.cumsum(self.weights) - (self.weights + 1) / 2
+        positions = np.concatenate([[0.0], positions, [total - 1]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+
+        result = np.interp(q * (total - 1), positions, values)
+        # Um centroide de peso 1 no extremo ocupa a mesma posição do mínimo (ou máximo):
+        # os quantis 0 e 1 são sempre os extremos observados
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return result[0] if scalar else result
+
+class NumericStats:
+    """
+    Acumulador mesclável de estatísticas descritivas para um bloco de colunas
+    numéricas. Contagem, mínimo, máximo, média e variância (Welford/Chan) são
+    calculados de forma vetorizada para todas as colunas de uma vez; os quantis
+    usam um TDigest por coluna.
+
+    Blocos (chunks) ou partições podem ser acumulados com `update` ou
+    combinados com `merge`.
+    """
+
+    def __init__(self, columns=(), compression=DIGEST_COMPRESSION):
+        self.compression = compression
+        self.columns = []
+        self.count = np.empty(0)
+        self.mean = np.empty(0)
+        self.m2 = np.empty(0)
+        self.min = np.empty(0)
+        self.max = np.empty(0)
+        self.digests = []
+        self._add_columns(columns)
+
+    @classmethod
+    def from_frame(cls, df, compression=DIGEST_COMPRESSION):
+        """Calcula as estatísticas das colunas numéricas de um DataFrame."""
+        numeric_df = df.select_dtypes(include=['number'])
+        return cls(numeric_df.columns, compression).update(numeric_df)
+
+    def _add_columns(self, columns):
+        new_columns = [col for col in columns if col not in self.columns]
+        if not new_columns:
+            return
+        n = len(new_columns)
+        self.columns.extend(new_columns)
+        self.count = np.concatenate([self.count, np.zeros(n)])
+        self.mean = np.concatenate([self.mean, np.zeros(n)])
+        self.m2 = np.concatenate([self.m2, np.zeros(n)])
+        self.min = np.concatenate([self.min, np.full(n, np.inf)])
+        self.max = np.concatenate([self.max, np.full(n, -np.inf)])
+        self.digests.extend(TDigest(self.compression) for _ in new_columns)
+
+    def _combine(self, idx, count, mean, m2, min_values, max_values):
+        """Combina momentos de outro bloco nas posições `idx` (fórmula de Chan)."""
+        n_a = self.count[idx]
+        n = n_a + count
+        safe_n = np.where(n > 0, n, 1)
+        delta = mean - self.mean[idx]
+        self.mean[idx] = np.where(n > 0, self.mean[idx] + delta * count / safe_n, 0.0)
+        self.m2[idx] = self.m2[idx] + m2 + delta ** 2 * n_a * count / safe_n
+        self.count[idx] = n
+        self.min[idx] = np.minimum(self.min[idx], min_values)
+        self.max[idx] = np.maximum(self.max[idx], max_values)
+
+    def update(self, df):
+        """Acumula um bloco de linhas (DataFrame com colunas numéricas)."""
+        if df.shape[1] == 0:
+            return self
+        self._add_columns(df.columns)
+        idx = np.array([self.columns.index(col) for col in df.columns])
+
+        values = df.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0).astype(np.float64)
+        total = np.where(valid, values, 0.0).sum(axis=0)
+        mean = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+        m2 = np.where(valid, (values - mean) ** 2, 0.0).sum(axis=0)
+        min_values = np.where(valid, values, np.inf).min(axis=0)
+        max_values = np.where(valid, values, -np.inf).max(axis=0)
+
+        self._combine(idx, count, mean, m2, min_values, max_values)
+        for j, i in enumerate(idx):
+            self.digests[i].update(values[valid[:, j], j])
+        return self
+
+    def merge(self, other):
+        """Combina as estatísticas de outro acumulador (ex.: outra partição)."""
+        self._add_columns(other.columns)
+        idx = np.array([self.columns.index(col) for col in other.columns], dtype=np.int64)
+        if idx.size:
+            self._combine(idx, other.count, other.mean, other.m2, other.min, other.max)
+            for j, i in enumerate(idx):
+                self.digests[i].merge(other.digests[j])
+        return self
+
+    def to_state(self):
+        """Retorna o estado do acumulador como um dicionário de arrays (ver from_state)."""
+        state = {
+            'columns': np.array(self.columns, dtype=str),
+            'compression': np.array(self.compression),
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': self.min,
+            'max': self.max,
+            'digest_bounds': np.array([[d.min, d.max] for d in self.digests]).reshape(-1, 2)
+        }
+        for i, digest in enumerate(self.digests):
+            digest._sort()
+            state[f'digest_means_{i}'] = digest.means
+            state[f'digest_weights_{i}'] = digest.weights
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        """Recria um acumulador a partir de to_state, para continuar a acumular blocos."""
+        stats = cls(compression=float(state['compression']))
+        stats._add_columns(state['columns'].tolist())
+        for name in ['count', 'mean', 'm2', 'min', 'max']:
+            setattr(stats, name, np.array(state[name], dtype=np.float64))
+        for i, digest in enumerate(stats.digests):
+            digest.means = np.array(state[f'digest_means_{i}'], dtype=np.float64)
+            digest.weights = np.array(state[f'digest_weights_{i}'], dtype=np.float64)
+            digest.min, digest.max = state['digest_bounds'][i]
+        return stats
+
+    def quantiles(self, qs):
+        """Retorna um dicionário coluna -> lista de quantis estimados."""
+        return {col: list(self.digests[i].quantile(qs)) for i, col in enumerate(self.columns)}
+
+    def to_metadata(self, columns=None):
+        """
+        Retorna as estatísticas no formato usado em metadata["numeric_stats"].
+
+        Args:
+            columns: Colunas a incluir (opcional). Colunas sem dados recebem None.
+        """
+        columns = self.columns if columns is None else columns
+        numeric_stats = {}
+        for col in columns:
+            if col not in self.columns or self.count[self.columns.index(col)] == 0:
+                numeric_stats[col] = {"min": None, "max": None, "mean": None, "median": None, "std": None}
+                continue
+            i = self.columns.index(col)
+            n = self.count[i]
+            numeric_stats[col] = {
+                "min": float(self.min[i]),
+                "max": float(self.max[i]),
+                "mean": float(self.mean[i]),
+                "median": float(self.digests[i].quantile(0.5)),
+                "std": float(np.sqrt(self.m2[i] / (n - 1))) if n > 1 else None
+            }
+        return numeric_stats
+
+def iqr_bounds(series, factor=1.5):
+    """
+    Calcula os limites de outliers pela regra do intervalo interquartil (IQR).
+
+    Returns:
+        Tupla (limite inferior, limite superior)
+    """
+    digest = TDigest().update(series.to_numpy(dtype=np.float64, na_value=np.nan))
+    q1, q3 = digest.quantile([0.25, 0.75])
+    iqr = q3 - q1
+    return q1 - factor * iqr, q3 + factor * iqr
+
+def get_stats_path(dataset_path):
+    """Retorna o caminho do arquivo de estatísticas de um dataset."""
+    base_name = os.path.splitext(get_storage_path(dataset_path))[0]
+    return f"{base_name}{STATS_EXTENSION}"
+
+def save_numeric_stats(stats, dataset_path):
+    """Grava o estado das estatísticas ao lado do dataset (permite acréscimos incrementais)."""
+    stats_path = get_stats_path(dataset_path)
+    tmp_path = f"{stats_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **stats.to_state())
+    os.replace(tmp_path, stats_path)
+    return stats_path
+
+def load_numeric_stats(dataset_path):
+    """Lê as estatísticas gravadas de um dataset (None se não existirem ou estiverem desatualizadas)."""
+    stats_path = get_stats_path(dataset_path)
+    if not os.path.exists(stats_path) or os.path.getmtime(stats_path) < dataset_mtime(dataset_path):
+        return None
+    with np.load(stats_path, allow_pickle=False) as state:
+        return NumericStats.from_state(state)
\ No newline at end of file
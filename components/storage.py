@@ -0,0 +1,448 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Formato colunar usado para os arquivos processados
+STORAGE_EXTENSION = ".parquet"
+
+# Arquivos de um dataset particionado (diretório): partições e esquema comum
+PARTITION_PREFIX = "part-"
+SCHEMA_FILE = "_common_metadata"
+
+def get_storage_path(file_path):
+    """Retorna o caminho do arquivo colunar correspondente a um arquivo processado."""
+    base_name, extension = os.path.splitext(file_path)
+    if extension == STORAGE_EXTENSION:
+        return file_path
+    return f"{base_name}{STORAGE_EXTENSION}"
+
+def _prepare_for_parquet(df):
+    """
+    Ajusta colunas do tipo object com valores mistos (ex.: números e textos),
+    que o Arrow não consegue serializar diretamente.
+    """
+    result_df = df
+    for col in df.select_dtypes(include=['object']).columns:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            if result_df is df:
+                result_df = df.copy()
+            result_df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return result_df
+
+def write_dataset(df, file_path):
+    """
+    Grava o DataFrame em formato colunar (Parquet), preservando os tipos
+    de dados (inclusive categorias e datas).
+
+    Args:
+        df: DataFrame a ser gravado
+        file_path: Caminho de destino (a extensão é ajustada para .parquet)
+
+    Returns:
+        Caminho do arquivo gravado
+    """
+    storage_path = get_storage_path(file_path)
+    directory = os.path.dirname(storage_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    # Gravar em arquivo temporário e renomear para evitar leituras parciais
+    tmp_path = f"{storage_path}.tmp"
+    _prepare_for_parquet(df).to_parquet(tmp_path, index=False, engine="pyarrow")
+    os.replace(tmp_path, storage_path)
+
+    return storage_path
+
+def migrate_csv_file(csv_path):
+    """
+    Converte um arquivo processado em CSV para o formato colunar.
+    O CSV original é mantido; as leituras seguintes usam o arquivo Parquet.
+
+    Returns:
+        Caminho do arquivo Parquet
+    """
+    storage_path = get_storage_path(csv_path)
+    if os.path.exists(storage_path) and os.path.getmtime(storage_path) >= os.path.getmtime(csv_path):
+        return storage_path
+
+    df = pd.read_csv(csv_path)
+    return write_dataset(df, storage_path)
+
+def resolve_dataset_path(file_path):
+    """
+    Retorna o caminho do arquivo colunar para um dataset, migrando arquivos
+    CSV antigos no primeiro acesso.
+    """
+    if os.path.splitext(file_path)[1].lower() == ".csv":
+        return migrate_csv_file(file_path)
+    return file_path
+
+def is_partitioned(file_path):
+    """Indica se o dataset é um diretório de partições (datasets com dados acrescentados)."""
+    return os.path.isdir(get_storage_path(file_path))
+
+def dataset_files(file_path):
+    """Retorna os arquivos de dados de um dataset (as partições, se particionado)."""
+    storage_path = get_storage_path(file_path)
+    if not os.path.isdir(storage_path):
+        return [storage_path]
+    names = sorted(
+        name for name in os.listdir(storage_path)
+        if name.startswith(PARTITION_PREFIX) and name.endswith(STORAGE_EXTENSION)
+    )
+    return [os.path.join(storage_path, name) for name in names]
+
+def link_file(source_path, target_path):
+    """
+    Cria `target_path` com o conteúdo de `source_path` por hardlink (sem
+    cópia dos dados), ou por cópia quando o sistema de arquivos não permite.
+    Os arquivos dos datasets nunca são alterados no lugar (as gravações
+    substituem o arquivo), então as duas entradas evoluem separadamente.
+    """
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copy2(source_path, target_path)
+
+def link_dataset(source_path, target_path):
+    """
+    Cria um novo dataset em `target_path` com os mesmos dados de
+    `source_path` (ver link_file). Acréscimos e planos de limpeza de um
+    deles não afetam o outro.
+
+    Returns:
+        Caminho do dataset criado
+    """
+    source = get_storage_path(resolve_dataset_path(source_path))
+    target = get_storage_path(target_path)
+    if not os.path.isdir(source):
+        link_file(source, target)
+        return target
+    tmp_dir = f"{target}.link.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for path in dataset_files(source) + [os.path.join(source, SCHEMA_FILE)]:
+        link_file(path, os.path.join(tmp_dir, os.path.basename(path)))
+    os.replace(tmp_dir, target)
+    return target
+
+def dataset_signature(file_path):
+    """
+    Identifica a versão atual de um dataset: data de modificação mais recente,
+    tamanho total e número de arquivos.
+    """
+    storage_path = get_storage_path(file_path)
+    files = dataset_files(storage_path)
+    if os.path.isdir(storage_path):
+        files = files + [os.path.join(storage_path, SCHEMA_FILE)]
+    stats = [os.stat(path) for path in files]
+    return (max(stat.st_mtime_ns for stat in stats), sum(stat.st_size for stat in stats), len(stats))
+
+def dataset_mtime(file_path):
+    """Data de modificação (em segundos) da versão atual de um dataset."""
+    return dataset_signature(file_path)[0] / 1e9
+
+def dataset_size_bytes(file_path):
+    """Tamanho total em disco de um dataset."""
+    return dataset_signature(file_path)[1]
+
+def read_dataset_schema(file_path):
+    """Retorna o esquema Arrow de um dataset sem ler os dados."""
+    storage_path = resolve_dataset_path(file_path)
+    if os.path.isdir(storage_path):
+        return pq.read_schema(os.path.join(storage_path, SCHEMA_FILE))
+    return pq.read_schema(storage_path)
+
+def open_dataset(file_path):
+    """
+    Abre um dataset como pyarrow.dataset. Em datasets particionados, as
+    partições são lidas com o esquema comum (tipos promovidos nos acréscimos).
+    """
+    storage_path = resolve_dataset_path(file_path)
+    if os.path.isdir(storage_path):
+        return ds.dataset(dataset_files(storage_path), format="parquet", schema=read_dataset_schema(storage_path))
+    return ds.dataset(storage_path, format="parquet")
+
+def read_dataset(file_path, columns=None):
+    """
+    Lê um dataset processado.
+
+    Args:
+        file_path: Caminho do arquivo (.parquet ou .csv legado)
+        columns: Lista de colunas a ler (opcional). Apenas essas colunas são lidas do disco.
+
+    Returns:
+        DataFrame com os dados
+    """
+    storage_path = resolve_dataset_path(file_path)
+    if columns is not None:
+        columns = list(dict.fromkeys(col for col in columns if col is not None))
+    if os.path.isdir(storage_path):
+        return open_dataset(storage_path).to_table(columns=columns).to_pandas()
+    return pd.read_parquet(storage_path, columns=columns, engine="pyarrow")
+
+def read_dataset_columns(file_path):
+    """Retorna os nomes das colunas de um dataset sem ler os dados."""
+    return read_dataset_schema(file_path).names
+
+def iter_dataset_batches(file_path, batch_size=65536, columns=None):
+    """
+    Lê um dataset em blocos de até `batch_size` linhas, sem carregar o
+    arquivo inteiro em memória.
+
+    Yields:
+        DataFrames com as linhas de cada bloco
+    """
+    for batch in open_dataset(file_path).to_batches(batch_size=batch_size, columns=columns):
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+def read_dataset_preview(file_path, rows=1000):
+    """Lê apenas as primeiras linhas de um dataset."""
+    for batch in iter_dataset_batches(file_path, batch_size=rows):
+        return batch
+    return read_dataset(file_path)
+
+def _promote_schema(current, incoming):
+    """Combina dois esquemas, promovendo tipos incompatíveis (ex.: int + float -> float, int + texto -> texto)."""
+    fields = []
+    for field in current:
+        other = incoming.field(field.name)
+        if field.type == other.type:
+            fields.append(field)
+            continue
+        try:
+            merged = pa.unify_schemas(
+                [pa.schema([field]), pa.schema([other])],
+                promote_options="permissive"
+            )
+            fields.append(merged.field(field.name))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            fields.append(pa.field(field.name, pa.string()))
+    return pa.schema(fields, metadata=current.metadata)
+
+def _loses_precision(table, cast_table):
+    """
+    Indica se a conversão de um bloco alterou valores numéricos: a conversão
+    "segura" do Arrow não verifica a perda de precisão ao reduzir decimais
+    (ex.: float64 -> float32, quando o primeiro bloco cabia em float32).
+    """
+    for name in table.column_names:
+        source, target = table.column(name), cast_table.column(name)
+        if source.type == target.type or not pa.types.is_floating(target.type):
+            continue
+        if not (pa.types.is_floating(source.type) or pa.types.is_integer(source.type)):
+            continue
+        before = source.to_numpy().astype(np.float64)
+        after = target.to_numpy().astype(np.float64)
+        if not np.array_equal(before, after, equal_nan=True):
+            return True
+    return False
+
+class ChunkedDatasetWriter:
+    """
+    Grava um dataset em formato colunar bloco a bloco, sem manter o conjunto
+    completo em memória. Cada bloco vira um row group do arquivo Parquet.
+
+    Se um bloco posterior trouxer um tipo incompatível (ex.: valores decimais
+    numa coluna até então inteira, ou que não cabem sem perda no float32
+    escolhido para o primeiro bloco), o esquema é promovido e os blocos já
+    gravados são regravados um row group por vez.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = get_storage_path(file_path)
+        self.tmp_path = f"{self.file_path}.tmp"
+        self.schema = None
+        self._writer = None
+        self.rows = 0
+
+        directory = os.path.dirname(self.file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def _cast(self, table):
+        """Converte um bloco para o esquema atual, ou None se a conversão alteraria valores."""
+        try:
+            cast_table = table.cast(self.schema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            return None
+        if _loses_precision(table, cast_table):
+            return None
+        return cast_table
+
+    def _rewrite_with_schema(self, schema):
+        """Regrava os blocos já escritos usando um esquema promovido."""
+        self._writer.close()
+        old_path = f"{self.tmp_path}.old"
+        os.replace(self.tmp_path, old_path)
+
+        self.schema = schema
+        self._writer = pq.ParquetWriter(self.tmp_path, self.schema)
+        parquet_file = pq.ParquetFile(old_path)
+        for i in range(parquet_file.num_row_groups):
+            self._writer.write_table(parquet_file.read_row_group(i).cast(self.schema))
+        parquet_file.close()
+        os.remove(old_path)
+
+    def write_chunk(self, df):
+        """Acrescenta um bloco de linhas ao arquivo."""
+        table = pa.Table.from_pandas(_prepare_for_parquet(df), preserve_index=False)
+
+        if self._writer is None:
+            self.schema = table.schema
+            self._writer = pq.ParquetWriter(self.tmp_path, self.schema)
+        elif not table.schema.equals(self.schema, check_metadata=False):
+            cast_table = self._cast(table)
+            if cast_table is None:
+                self._rewrite_with_schema(_promote_schema(self.schema, table.schema))
+                cast_table = table.cast(self.schema)
+            table = cast_table
+
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        """Finaliza o arquivo e o torna visível para leitura."""
+        if self._writer is None:
+            # Nenhum bloco gravado: cria um arquivo vazio
+            write_dataset(pd.DataFrame(), self.file_path)
+            return self.file_path
+
+        self._writer.close()
+        os.replace(self.tmp_path, self.file_path)
+        return self.file_path
+
+    def abort(self):
+        """Descarta o arquivo parcialmente gravado."""
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+def _append_schema(schema):
+    """
+    Esquema comum usado em datasets particionados: dicionários (categorias)
+    com índices de 32 bits, para que partições com mais categorias sejam
+    lidas sem estouro, e sem os metadados do pandas de uma partição.
+    """
+    fields = []
+    for field in schema:
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        fields.append(field)
+    return pa.schema(fields)
+
+def _column_kind(dtype):
+    if pa.types.is_null(dtype):
+        return 'null'
+    if pa.types.is_dictionary(dtype):
+        dtype = dtype.value_type
+    if pa.types.is_boolean(dtype):
+        return 'bool'
+    if pa.types.is_integer(dtype) or pa.types.is_floating(dtype) or pa.types.is_decimal(dtype):
+        return 'numeric'
+    if pa.types.is_string(dtype) or pa.types.is_large_string(dtype):
+        return 'text'
+    if pa.types.is_temporal(dtype):
+        return 'temporal'
+    return str(dtype)
+
+def check_append_schema(current, incoming):
+    """
+    Verifica se novas linhas podem ser acrescentadas a um dataset: as colunas
+    devem ser as mesmas e de mesma natureza (números, textos, booleanos ou
+    datas). Larguras diferentes (ex.: int8 e float64) são promovidas.
+
+    Raises:
+        ValueError: Se os esquemas forem incompatíveis
+    """
+    missing = [name for name in current.names if name not in incoming.names]
+    extra = [name for name in incoming.names if name not in current.names]
+    if missing or extra:
+        details = []
+        if missing:
+            details.append(f"colunas ausentes: {', '.join(missing)}")
+        if extra:
+            details.append(f"colunas novas: {', '.join(extra)}")
+        raise ValueError(f"Esquema incompatível com o dataset ({'; '.join(details)})")
+
+    mismatched = []
+    for field in current:
+        current_kind = _column_kind(field.type)
+        incoming_kind = _column_kind(incoming.field(field.name).type)
+        if 'null' not in (current_kind, incoming_kind) and current_kind != incoming_kind:
+            mismatched.append(f"{field.name} ({current_kind} -> {incoming_kind})")
+    if mismatched:
+        raise ValueError(f"Esquema incompatível com o dataset (tipos diferentes: {', '.join(mismatched)})")
+
+def _write_schema_file(directory, schema):
+    tmp_path = os.path.join(directory, f"{SCHEMA_FILE}.tmp")
+    pq.write_metadata(schema, tmp_path)
+    os.replace(tmp_path, os.path.join(directory, SCHEMA_FILE))
+
+def _ensure_partitioned(storage_path):
+    """
+    Converte um dataset de arquivo único em diretório de partições (o arquivo
+    atual vira a primeira partição, sem regravação).
+    """
+    if os.path.isdir(storage_path):
+        return
+    tmp_dir = f"{storage_path}.partitioned.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    _write_schema_file(tmp_dir, _append_schema(pq.read_schema(storage_path)))
+    os.replace(storage_path, os.path.join(tmp_dir, f"{PARTITION_PREFIX}00000{STORAGE_EXTENSION}"))
+    os.replace(tmp_dir, storage_path)
+
+class PartitionAppender:
+    """
+    Acrescenta linhas a um dataset existente como uma nova partição, sem
+    regravar os dados anteriores. O dataset é convertido em diretório de
+    partições no primeiro acréscimo.
+
+    Cada bloco é validado contra o esquema do dataset (check_append_schema);
+    o esquema comum é promovido quando necessário e gravado antes de a
+    partição se tornar visível.
+    """
+
+    def __init__(self, file_path):
+        self.dataset_path = resolve_dataset_path(file_path)
+        self.schema = _append_schema(read_dataset_schema(self.dataset_path))
+        _ensure_partitioned(self.dataset_path)
+
+        number = len(dataset_files(self.dataset_path))
+        name = f"{PARTITION_PREFIX}{number:05d}{STORAGE_EXTENSION}"
+        self.partition_path = os.path.join(self.dataset_path, name)
+        # Arquivos iniciados por "." são ignorados pelos leitores até a conclusão
+        self._writer = ChunkedDatasetWriter(os.path.join(self.dataset_path, f".{name}"))
+
+    @property
+    def rows(self):
+        return self._writer.rows
+
+    def write_chunk(self, df):
+        """Valida e acrescenta um bloco de linhas à nova partição."""
+        incoming = pa.Schema.from_pandas(_prepare_for_parquet(df), preserve_index=False)
+        check_append_schema(self.schema, incoming)
+        self._writer.write_chunk(df)
+        self.schema = _promote_schema(self.schema, _append_schema(incoming))
+
+    def close(self):
+        """Torna a partição visível e retorna o caminho do dataset."""
+        if self._writer.rows == 0:
+            self._writer.abort()
+            return self.dataset_path
+        hidden_path = self._writer.close()
+        # O esquema promovido é compatível com as partições anteriores: gravá-lo primeiro
+        _write_schema_file(self.dataset_path, self.schema)
+        os.replace(hidden_path, self.partition_path)
+        return self.dataset_path
+
+    def abort(self):
+        """Descarta a partição parcialmente gravada."""
+        self._writer.abort()
\ No newline at end of file
@@ -0,0 +1,152 @@
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+import streamlit as st
+from components.schema import parse_dates
+
+# Intervalos de agrupamento das séries temporais (rótulo exibido -> frequência do pandas)
+RESAMPLE_RULES = {
+    "Minuto": "min",
+    "Hora": "h",
+    "Dia": "D",
+    "Semana": "W",
+    "Mês": "MS"
+}
+
+# Funções de agregação aplicadas a cada intervalo
+RESAMPLE_FUNCTIONS = ["mean", "sum", "min", "max", "count"]
+
+# Janelas aplicadas à série agrupada (rótulo exibido -> operação)
+WINDOW_FUNCTIONS = {
+    "Média móvel": "rolling_mean",
+    "Desvio padrão móvel": "rolling_std",
+    "Média exponencial (EWMA)": "ewm"
+}
+
+# Tamanho padrão da janela (em intervalos)
+DEFAULT_WINDOW_SIZE = 7
+
+# Número de séries agrupadas mantidas em memória (compartilhadas entre sessões)
+TIMESERIES_CACHE_ENTRIES = int(os.environ.get("TIMESERIES_CACHE_ENTRIES", "64"))
+
+class ResampleCache:
+    """
+    Cache LRU das séries agrupadas por intervalo, por versão dos dados
+    (ver dataset_cache_key), colunas, intervalo e função. As janelas móveis
+    são calculadas sobre a série em cache: mudar a janela não reagrupa os
+    dados originais.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+@st.cache_resource
+def get_resample_cache():
+    """Retorna a instância única do cache de séries agrupadas do processo."""
+    return ResampleCache(TIMESERIES_CACHE_ENTRIES)
+
+def _resample(df, time_col, value_col, rule, function, group_col, date_format):
+    columns = list(dict.fromkeys(col for col in [time_col, value_col, group_col] if col is not None))
+    frame = df[columns]
+    if not pd.api.types.is_datetime64_any_dtype(frame[time_col]):
+        times = parse_dates(frame[time_col], date_format) if date_format else pd.to_datetime(frame[time_col], errors='coerce')
+        frame = frame.assign(**{time_col: times})
+    if frame[time_col].isna().any():
+        frame = frame[frame[time_col].notna()]
+
+    # Ordenar apenas quando necessário (dados de sensores costumam chegar em ordem)
+    if not frame[time_col].is_monotonic_increasing:
+        frame = frame.sort_values(time_col, kind='stable')
+
+    if group_col is None:
+        series = frame.set_index(time_col)[value_col].resample(rule).agg(function)
+        return series.reset_index()
+    # Uma única agregação por (grupo, intervalo), em vez de reamostrar cada grupo separadamente
+    grouped = frame.groupby([group_col, pd.Grouper(key=time_col, freq=rule)], observed=True)[value_col].agg(function)
+    if grouped.empty:
+        return grouped.reset_index()
+    # O agrupamento omite os intervalos sem dados: cada grupo recebe todos os intervalos da série,
+    # como no resample sem grupos (vazios ficam sem valor, ou com zero na soma e na contagem)
+    buckets = grouped.index.get_level_values(1)
+    full_index = pd.MultiIndex.from_product(
+        [grouped.index.get_level_values(0).unique(), pd.date_range(buckets.min(), buckets.max(), freq=rule)],
+        names=[group_col, time_col]
+    )
+    fill = {'fill_value': 0} if function in ('sum', 'count') else {}
+    return grouped.reindex(full_index, **fill).reset_index()
+
+def resample_time_series(df, time_col, value_col, rule, function='mean', group_col=None, date_format=None, cache_key=None):
+    """
+    Agrupa uma série temporal por intervalo de tempo (minuto, hora, dia...).
+    Com `cache_key`, o resultado é mantido em cache por versão dos dados,
+    colunas, intervalo e função (os dados não são percorridos para montar a
+    chave) e não deve ser modificado.
+
+    Args:
+        df: DataFrame com os dados
+        time_col: Coluna de data/hora (convertida com `date_format`, se for texto)
+        value_col: Coluna numérica agregada
+        rule: Frequência do pandas (valores de RESAMPLE_RULES)
+        function: Função de agregação (valores de RESAMPLE_FUNCTIONS)
+        group_col: Coluna com as séries separadas (ex.: cor do gráfico; opcional)
+        date_format: Formato de data da coluna de tempo (opcional)
+        cache_key: Versão dos dados de `df`, incluindo os filtros aplicados
+            (opcional; None desativa o cache)
+
+    Returns:
+        DataFrame com uma linha por intervalo (e grupo), ordenado pelo tempo
+    """
+    if cache_key is None:
+        return _resample(df, time_col, value_col, rule, function, group_col, date_format)
+
+    cache = get_resample_cache()
+    key = (cache_key, time_col, value_col, group_col, rule, function, date_format)
+    result = cache.get(key)
+    if result is None:
+        result = _resample(df, time_col, value_col, rule, function, group_col, date_format)
+        cache.put(key, result)
+    return result
+
+def apply_window(resampled, value_col, window, window_size=DEFAULT_WINDOW_SIZE, group_col=None):
+    """
+    Aplica uma janela móvel (média, desvio padrão ou média exponencial) à
+    série agrupada, separadamente em cada grupo. O tamanho da janela é
+    contado em intervalos.
+
+    Returns:
+        Novo DataFrame com os valores de `value_col` substituídos
+    """
+    values = resampled[value_col]
+    target = values if group_col is None else values.groupby(resampled[group_col], observed=True, sort=False)
+    if window == 'ewm':
+        windowed = target.ewm(span=window_size, ignore_na=True).mean()
+    else:
+        rolling = target.rolling(window_size, min_periods=1)
+        windowed = rolling.std() if window == 'rolling_std' else rolling.mean()
+    if group_col is not None and windowed.index.nlevels > 1:
+        windowed = windowed.reset_index(level=0, drop=True)
+    return resampled.assign(**{value_col: windowed})
+
+def build_time_series(df, time_col, value_col, rule, function='mean', group_col=None, window=None, window_size=DEFAULT_WINDOW_SIZE, date_format=None, cache_key=None):
+    """Agrupa a série por intervalo de tempo e aplica a janela móvel opcional (ver resample_time_series)."""
+    resampled = resample_time_series(df, time_col, value_col, rule, function, group_col, date_format, cache_key)
+    if window in WINDOW_FUNCTIONS.values():
+        return apply_window(resampled, value_col, window, window_size, group_col)
+    return resampled
\ No newline at end of file
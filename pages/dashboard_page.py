@@ -4,25 +4,45 @@ import os
 from components.auth import login_required
 from components.dashboard import dashboard_options
 from components.file_processor import clean_dataframe
+from components.dataset_cache import load_dataset
+from components.profile import get_column_profile
+from components.instrumentation import span
+from components.query_engine import QUERY_PUSHDOWN_MIN_MB, get_query_backend, should_push_down
+from components.storage import read_dataset_preview
+from components.figure_cache import dataset_cache_key
+from components.job_queue import display_jobs
+from components.dataset_registry import get_dataset_registry, dataset_page_selector
+
+# Linhas carregadas em memória (prévia) quando os gráficos são consultados no arquivo
+PUSHDOWN_PREVIEW_ROWS = 1000
 
 @login_required
 def dashboard_page():
     st.title("📊 Dashboards Interativos")
     
-    # Verificar se há arquivos processados
-    if 'processed_files' not in st.session_state or not st.session_state.processed_files:
+    # Processamentos em andamento (os datasets concluídos entram no catálogo)
+    display_jobs(active_only=True)
+    
+    # Verificar se há arquivos processados (catálogo persistente, compartilhado entre sessões e usuários)
+    owner = st.session_state.username
+    registry = get_dataset_registry()
+    if registry.count() == 0:
         st.warning("Nenhum arquivo processado disponível. Por favor, faça upload e processe arquivos na página de Upload.")
         st.info("Acesse a página 'Upload de Arquivos' para enviar arquivos CSV.")
         return
     
-    # Lista de arquivos disponíveis
-    file_options = list(st.session_state.processed_files.keys())
-    
     # Layout com duas colunas para organizar a interface
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        selected_file = st.selectbox("Selecione um arquivo para visualização", file_options)
+        # Lista de arquivos disponíveis (página atual da busca)
+        datasets, _ = dataset_page_selector(owner, "dashboard_datasets")
+        # Datasets de outros usuários exibem o dono (o mesmo nome pode existir para vários usuários)
+        file_options = [
+            dataset['name'] if dataset['owner'] == owner else f"{dataset['name']} ({dataset['owner']})"
+            for dataset in datasets
+        ]
+        selected_option = st.selectbox("Selecione um arquivo para visualização", file_options)
     
     with col2:
         # Adicionar botão para limpar o dashboard atual
@@ -33,9 +53,10 @@ def dashboard_page():
                 st.success("Dashboard limpo com sucesso!")
                 st.rerun()
     
-    if selected_file:
+    if selected_option:
         # Obter informações do arquivo
-        file_info = st.session_state.processed_files[selected_file]
+        file_info = datasets[file_options.index(selected_option)]
+        selected_file = file_info['name']
         file_path = file_info['path']
         
         # Verificar se o arquivo existe
@@ -43,9 +64,26 @@ def dashboard_page():
             st.error(f"Arquivo não encontrado: {file_path}")
             return
         
-        # Carregar o dataframe
         try:
-            df = pd.read_csv(file_path)
+            # Arquivos grandes não são carregados: os gráficos são consultados no arquivo
+            pushdown = should_push_down(file_path)
+            
+            with span("dataset.load", file=selected_file, pushdown=pushdown):
+                if pushdown:
+                    df = read_dataset_preview(file_path, PUSHDOWN_PREVIEW_ROWS)
+                    profile = get_column_profile(file_path)
+                else:
+                    # Carregar o dataframe do cache compartilhado (uma cópia por processo)
+                    df = load_dataset(file_path)
+                    
+                    # Perfil de colunas gravado no processamento (construído uma vez para arquivos antigos)
+                    profile = get_column_profile(file_path, df)
+            
+            if pushdown:
+                st.info(
+                    f"Arquivo com mais de {QUERY_PUSHDOWN_MIN_MB} MB: os gráficos são calculados diretamente "
+                    f"no arquivo (motor {get_query_backend().name}), sem carregar o dataset em memória."
+                )
             
             # Metadados
             with st.expander("Informações do arquivo"):
@@ -54,6 +92,7 @@ def dashboard_page():
                 
                 with col1:
                     st.write(f"**Nome:** {selected_file}")
+                    st.write(f"**Dono:** {file_info['owner']}")
                     st.write(f"**Linhas:** {metadata['rows']}")
                 
                 with col2:
@@ -63,6 +102,10 @@ def dashboard_page():
                 with col3:
                     missing_values = sum(metadata['missing_values'].values())
                     st.write(f"**Valores ausentes:** {missing_values}")
+                    if 'memory_bytes_after' in metadata:
+                        before_mb = metadata['memory_bytes_before'] / (1024 * 1024)
+                        after_mb = metadata['memory_bytes_after'] / (1024 * 1024)
+                        st.write(f"**Memória:** {before_mb:.1f} MB → {after_mb:.1f} MB")
                 
                 # Mostrar estatísticas numéricas se disponíveis
                 if 'numeric_stats' in metadata and metadata['numeric_stats']:
@@ -74,23 +117,34 @@ def dashboard_page():
                     
                     st.dataframe(stats_df.T)
             
-            # Opções de limpeza de dados
+            # Opções de limpeza de dados (plano salvo com o dataset e reaplicado a partir do cache)
             with st.expander("Pré-processamento de Dados", expanded=False):
                 st.write("Utilize as opções abaixo para limpar e preparar seus dados para visualização.")
-                clean_button = st.button("Limpar Dados")
-                
-                if clean_button:
-                    df = clean_dataframe(df)
-                    st.success("Dados limpos com sucesso!")
+                plan = None
+                if pushdown:
+                    st.caption("A limpeza exige o dataset em memória e não está disponível para arquivos grandes.")
+                else:
+                    with span("dataset.clean", file=selected_file):
+                        df, plan = clean_dataframe(df, file_path, file_info['metadata']['missing_values'], owner)
+            
+            # Versão dos dados dos gráficos (cache de figuras): dataset em disco e plano de limpeza
+            data_key = dataset_cache_key(file_info['path'], plan)
+            
+            if plan is not None:
+                # Gráficos calculados sobre os dados limpos, em memória
+                profile = None
+                file_path = None
             
             # Mostrar instruções para o usuário
             st.info("Você pode adicionar múltiplos gráficos nesta página. Clique em '➕ Adicionar Novo Gráfico' para começar.")
             
             # Opções de dashboard - agora com suporte a múltiplos gráficos
-            dashboard_options(df)
+            dashboard_options(df, profile, file_path, pushdown, data_key)
             
             # Exibir dados
             with st.expander("Ver dados completos", expanded=False):
+                if pushdown:
+                    st.caption(f"Primeiras {len(df)} de {profile['rows']} linhas.")
                 st.dataframe(df)
             
         except Exception as e:
@@ -1,8 +1,14 @@
 import streamlit as st
-import os
 import pandas as pd
 from components.auth import login_required
-from components.file_processor import process_csv_file, save_processed_file
+from components.file_processor import read_csv_preview
+from components.instrumentation import span
+from components.content_store import hash_file, get_content_store, get_processed_index, UPLOAD_STORE_DIR
+from components.job_queue import enqueue_upload, display_jobs
+from components.dataset_registry import get_dataset_registry, dataset_page_selector
+
+# Opção de destino que cria um novo dataset processado
+NEW_DATASET = "Novo dataset"
 
 @login_required
 def upload_page():
@@ -18,9 +24,9 @@ def upload_page():
         help="Selecione os arquivo(s) que deseja enviar para processamento"
     )
     
-    # Inicializar sessão para arquivos processados
-    if 'processed_files' not in st.session_state:
-        st.session_state.processed_files = {}
+    # Datasets processados do usuário (catálogo persistente, compartilhado entre sessões)
+    owner = st.session_state.username
+    registry = get_dataset_registry()
     
     # Exibir informações sobre os arquivos enviados
     if uploaded_files:
@@ -52,75 +58,87 @@ def upload_page():
                             st.image(file.read(), use_column_width=True)
                             file.seek(0)  # Resetar o ponteiro do arquivo
                         elif file.type == 'text/csv':
-                            # Se for CSV, leia e exiba os dados
-                            data = pd.read_csv(file)
-                            st.write(data.head())
-                            file.seek(0)  # Resetar o ponteiro do arquivo
+                            # Se for CSV, exiba apenas as primeiras linhas (sem ler o arquivo inteiro)
+                            preview = read_csv_preview(file)
+                            st.write(preview)
+                            st.write(f"**Colunas:** {len(preview.columns)}")
                             
-                            # Processar o arquivo para extrair informações
-                            df, metadata = process_csv_file(file, df=data)
+                            # Destino: novo dataset ou acréscimo a um dataset já processado (ex.: cargas periódicas)
+                            targets = [NEW_DATASET] + [name for name in registry.names(owner) if name != file.name]
+                            target = st.selectbox("Destino", targets, key=f"target_{file.name}") if len(targets) > 1 else NEW_DATASET
                             
-                            if df is not None and metadata is not None:
-                                # Exibir estatísticas básicas
-                                st.write(f"**Linhas:** {metadata['rows']}, **Colunas:** {metadata['columns']}")
-                                
-                                # Botão para processar dados
-                                if st.button(f"Processar {file.name}", key=f"process_{file.name}"):
-                                    # Salvar o arquivo
-                                    save_dir = "data"
-                                    if not os.path.exists(save_dir):
-                                        os.makedirs(save_dir)
-                                    
-                                    file_path = save_processed_file(df, file.name)
-                                    
-                                    # Armazenar metadados na sessão
-                                    st.session_state.processed_files[file.name] = {
-                                        'path': file_path,
-                                        'metadata': metadata,
-                                        'processed': True
-                                    }
-                                    
-                                    st.success(f"Arquivo {file.name} processado e salvo! Acesse a página de Dashboards para visualizá-lo.")
+                            # Botão para processar dados
+                            if st.button(f"Processar {file.name}", key=f"process_{file.name}"):
+                                if target != NEW_DATASET:
+                                    # Acrescentar como nova partição, em segundo plano
+                                    with span("dataset.append", file=file.name, target=target, size_bytes=file.size):
+                                        job, created = enqueue_upload(file, owner, target, registry.get(owner, target))
+                                    if created:
+                                        st.success(f"Acréscimo de {file.name} a {target} iniciado em segundo plano. Acompanhe o andamento abaixo.")
+                                    else:
+                                        st.warning(f"Já existe um processamento em andamento para {target} ({job['file_name']}). Aguarde sua conclusão.")
+                                else:
+                                    # Conteúdo idêntico já processado: reutilizar o resultado
+                                    content_hash = hash_file(file)
+                                    processed = get_processed_index().get(content_hash)
+                                    if processed is not None:
+                                        # Mesmo caminho do resultado (caches compartilhados); um acréscimo cria a cópia do usuário
+                                        file_path, metadata = processed
+                                        registry.register(owner, file.name, file_path, metadata, content_hash)
+                                        st.write(f"**Linhas:** {metadata['rows']}, **Colunas:** {metadata['columns']}")
+                                        st.info("Conteúdo idêntico já processado anteriormente: resultado reutilizado.")
+                                    else:
+                                        # Ler, calcular metadados e salvar em segundo plano (a página continua disponível)
+                                        with span("dataset.process", file=file.name, size_bytes=file.size):
+                                            job, created = enqueue_upload(file, owner, input_hash=content_hash)
+                                        if created:
+                                            st.success(f"Processamento de {file.name} iniciado em segundo plano. Você pode continuar usando a aplicação; o arquivo aparecerá nos Dashboards quando concluído.")
+                                        else:
+                                            st.info(f"Este conteúdo já está sendo processado ({job['file_name']}).")
                         else:
                             # Para outros tipos de arquivo, mostre informações básicas
                             st.info("O conteúdo completo deste tipo de arquivo não pode ser visualizado aqui.")
                     except Exception as e:
                         st.error(f"Erro ao ler o arquivo: {str(e)}")
         
-        # Pasta onde os arquivos serão salvos
-        save_dir = "arquivos_enviados"
-        
-        if not os.path.exists(save_dir):
-            os.makedirs(save_dir)
-        
         # Botão para salvar todos os arquivos
         if st.button("Salvar Todos os Arquivos"):
-            # Salvar cada arquivo na pasta especificada
-            for file in uploaded_files:
-                with open(os.path.join(save_dir, file.name), "wb") as f:
-                    f.write(file.getbuffer())
+            # Cada conteúdo é gravado uma única vez; reenvios apenas registram o nome/versão
+            store = get_content_store()
+            new_files = sum(store.put(file, file.name)[1] for file in uploaded_files)
             
-            st.success(f"Todos os arquivos foram salvos com sucesso em: {save_dir}")
+            st.success(f"Todos os arquivos foram salvos com sucesso em: {UPLOAD_STORE_DIR}")
+            if new_files < len(uploaded_files):
+                st.info(f"{len(uploaded_files) - new_files} arquivo(s) com conteúdo já armazenado não foram copiados novamente.")
     else:
         st.info("Nenhum arquivo selecionado. Arraste e solte os arquivos ou clique no seletor acima.")
     
-    # Exibir arquivos processados
-    if st.session_state.processed_files:
+    # Andamento dos processamentos em segundo plano
+    st.subheader("Processamentos")
+    display_jobs()
+    
+    # Exibir arquivos processados (paginados)
+    if registry.count() > 0:
         st.subheader("Arquivos Processados")
+        datasets, total = dataset_page_selector(owner, "processed_list")
         
         # Criar tabela com os arquivos processados
         data = []
-        for filename, info in st.session_state.processed_files.items():
+        for dataset in datasets:
             data.append({
-                "Nome do Arquivo": filename,
-                "Linhas": info['metadata']['rows'],
-                "Colunas": info['metadata']['columns'],
-                "Caminho": info['path']
+                "Nome do Arquivo": dataset['name'],
+                "Dono": dataset['owner'],
+                "Linhas": dataset['rows'],
+                "Colunas": dataset['columns'],
+                "Partições": dataset['partitions'],
+                "Atualizado em": dataset['updated_at'],
+                "Caminho": dataset['path']
             })
         
         if data:
             df_processed = pd.DataFrame(data)
             st.dataframe(df_processed)
+        st.caption(f"{total} arquivo(s) processado(s).")
 
 if __name__ == "__main__":
     upload_page() 
\ No newline at end of file
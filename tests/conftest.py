@@ -0,0 +1,29 @@
+import os
+import sys
+import pytest
+import streamlit as st
+
+# Permite importar os módulos da aplicação (components, pages) a partir da raiz do repositório
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Executa cada teste em um diretório vazio (a aplicação grava em caminhos relativos, ex.: data/)."""
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    # Instâncias únicas (catálogo, caches) apontam para caminhos relativos ao diretório do teste
+    st.cache_resource.clear()
+
+@pytest.fixture
+def sensor_csv(tmp_path):
+    """Arquivo CSV pequeno com colunas numéricas e categóricas."""
+    path = tmp_path / "sensores.csv"
+    lines = ["temperatura,pressao,equipamento,local"]
+    equipments = ["Bomba", "Turbina", "Compressor"]
+    places = ["Recife", "Natal"]
+    for i in range(60):
+        lines.append(f"{20 + i * 0.5},{i % 7},{equipments[i % 3]},{places[i % 2]}")
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
\ No newline at end of file
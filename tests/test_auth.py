@@ -0,0 +1,147 @@
+import os
+import pytest
+from components import auth
+from components.auth import LoginLimiter, PasswordHasher, CredentialStore, create_login_token, verify_login_token
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(auth.time, "monotonic", fake)
+    return fake
+
+@pytest.fixture
+def store():
+    os.makedirs("config", exist_ok=True)
+    store = CredentialStore(os.path.join("config", "auth.db"), os.path.join("config", "auth.yaml"))
+    store.add_user('ana', 'Ana', 'ana@example.com', '$2b$04$hash-atual', 'user')
+    return store
+
+def test_locks_after_max_failures_within_window(clock):
+    limiter = LoginLimiter(max_failures=3, window_seconds=60, lockout_seconds=30)
+    for _ in range(2):
+        limiter.record_failure('ana', '10.0.0.1')
+    assert limiter.retry_after('ana', '10.0.0.1') == 0
+
+    limiter.record_failure('ana', '10.0.0.1')
+    assert limiter.retry_after('ana', '10.0.0.1') == 31
+
+    clock.now += 20
+    assert limiter.retry_after('ana', '10.0.0.1') == 11
+
+def test_lockout_is_short_and_counting_restarts(clock):
+    limiter = LoginLimiter(max_failures=2, window_seconds=300, lockout_seconds=30)
+    limiter.record_failure('ana', '10.0.0.1')
+    limiter.record_failure('ana', '10.0.0.1')
+    clock.now += 31
+    assert limiter.retry_after('ana', '10.0.0.1') == 0
+
+    # Após o bloqueio, uma nova falha não bloqueia imediatamente
+    limiter.record_failure('ana', '10.0.0.1')
+    assert limiter.retry_after('ana', '10.0.0.1') == 0
+
+def test_failures_expire_after_window(clock):
+    limiter = LoginLimiter(max_failures=2, window_seconds=60, lockout_seconds=30)
+    limiter.record_failure('ana', '10.0.0.1')
+    clock.now += 61
+    limiter.record_failure('ana', '10.0.0.1')
+    # A primeira falha saiu da janela
+    assert limiter.retry_after('ana', '10.0.0.1') == 0
+
+def test_lockout_is_per_username_and_ip(clock):
+    # Tentativas erradas vindas de outro IP não bloqueiam o dono da conta
+    limiter = LoginLimiter(max_failures=2, window_seconds=60, lockout_seconds=30)
+    limiter.record_failure('ana', '203.0.113.9')
+    limiter.record_failure('ana', '203.0.113.9')
+
+    assert limiter.retry_after('ana', '203.0.113.9') > 0
+    assert limiter.retry_after('ana', '10.0.0.1') == 0
+    assert limiter.retry_after('bruno', '203.0.113.9') == 0
+
+def test_reset_clears_failures(clock):
+    limiter = LoginLimiter(max_failures=1, window_seconds=60, lockout_seconds=30)
+    limiter.record_failure('ana', '10.0.0.1')
+    limiter.reset('ana', '10.0.0.1')
+
+    assert limiter.retry_after('ana', '10.0.0.1') == 0
+    assert limiter.tracked() == 0
+
+def test_expired_entries_are_pruned(clock):
+    limiter = LoginLimiter(max_failures=5, window_seconds=60, lockout_seconds=30)
+    limiter.record_failure('ana', '10.0.0.1')
+    limiter.record_failure('bruno', '10.0.0.2')
+    clock.now += 61
+
+    assert limiter.retry_after('ana', '10.0.0.1') == 0
+    assert limiter.tracked() == 1
+
+def test_tracked_entries_are_bounded(clock):
+    limiter = LoginLimiter(max_failures=5, window_seconds=60, lockout_seconds=30, max_tracked=3)
+    for i in range(10):
+        limiter.record_failure(f'usuario{i}', '10.0.0.1')
+
+    assert limiter.tracked() == 3
+    # Os pares mais antigos foram descartados
+    assert limiter.retry_after('usuario0', '10.0.0.1') == 0
+
+def test_authenticate_counts_failures_across_sessions(monkeypatch, clock, store):
+    # Reconectar (nova sessão) não zera a contagem: o limite é por usuário e IP
+    limiter = LoginLimiter(max_failures=2, window_seconds=60, lockout_seconds=30)
+    monkeypatch.setattr(auth, "get_login_limiter", lambda: limiter)
+    monkeypatch.setattr(auth, "get_credential_store", lambda: store)
+    monkeypatch.setattr(auth, "get_password_hasher", lambda: type("Hasher", (), {"verify": lambda self, p, h: False})())
+
+    for _ in range(2):
+        assert auth.authenticate('ana', 'errada', client='10.0.0.1') == (None, "Usuário ou senha incorretos")
+    user, error = auth.authenticate('ana', 'errada', client='10.0.0.1')
+    assert user is None and error.startswith("Muitas tentativas")
+
+def test_verify_treats_malformed_hash_as_wrong_password():
+    import bcrypt
+    hasher = PasswordHasher(max_concurrent=1, wait_seconds=1)
+    valid_hash = bcrypt.hashpw(b"segredo", bcrypt.gensalt(4)).decode()
+
+    assert hasher.verify("segredo", valid_hash) is True
+    assert hasher.verify("segredo", "nao-e-um-hash") is False
+    assert hasher.verify("segredo", None) is False
+
+def test_verify_refuses_when_all_slots_are_busy():
+    hasher = PasswordHasher(max_concurrent=1, wait_seconds=0.01)
+    hasher._slots.acquire()
+    try:
+        assert hasher.verify("segredo", None) is None
+    finally:
+        hasher._slots.release()
+
+def test_login_token_round_trip(store):
+    token = create_login_token('ana', store.get_user('ana')['password'], 'chave', 30)
+
+    username, user = verify_login_token(token, 'chave', store)
+    assert username == 'ana'
+    assert user['name'] == 'Ana'
+
+def test_login_token_rejects_tampering_and_other_keys(store):
+    token = create_login_token('ana', store.get_user('ana')['password'], 'chave', 30)
+    encoded, expires, signature = token.split(".")
+
+    assert verify_login_token(token, 'outra-chave', store) == (None, None)
+    assert verify_login_token(f"{encoded}.{int(expires) + 1}.{signature}", 'chave', store) == (None, None)
+    assert verify_login_token("lixo", 'chave', store) == (None, None)
+
+def test_login_token_expires(store, monkeypatch):
+    token = create_login_token('ana', store.get_user('ana')['password'], 'chave', 1)
+    now = auth.time.time()
+    monkeypatch.setattr(auth.time, "time", lambda: now + 86400 + 1)
+
+    assert verify_login_token(token, 'chave', store) == (None, None)
+
+def test_password_change_invalidates_login_token(store):
+    token = create_login_token('ana', '$2b$04$hash-anterior', 'chave', 30)
+
+    assert verify_login_token(token, 'chave', store) == (None, None)
\ No newline at end of file
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+from components.bitmap_index import BitmapIndex, filter_dataframe
+
+@pytest.fixture
+def frame():
+    # Número de linhas que não é múltiplo de 8 (último byte dos bitmaps incompleto)
+    rng = np.random.default_rng(4)
+    n = 1003
+    equipamento = rng.choice(['Bomba', 'Turbina', 'Compressor', None], n, p=[0.4, 0.3, 0.2, 0.1])
+    local = pd.Categorical(rng.choice(['Recife', 'Natal', 'Salvador'], n), categories=['Recife', 'Natal', 'Salvador', 'Belém'])
+    local[rng.choice(n, 50, replace=False)] = np.nan
+    return pd.DataFrame({
+        'equipamento': equipamento,
+        'local': local,
+        'falha': rng.random(n) < 0.1,
+        'serie': [f"S{i}" for i in range(n)],
+        'valor': rng.normal(0, 1, n)
+    })
+
+def _expected(df, filters):
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in filters.items():
+        mask &= df[col].isin(values).to_numpy()
+    return df[mask]
+
+@pytest.mark.parametrize("filters", [
+    {'equipamento': ['Bomba']},
+    {'equipamento': ['Bomba', 'Turbina', 'Compressor']},
+    {'local': ['Natal', 'Salvador']},
+    {'local': ['Belém']},
+    {'falha': [True]},
+    {'equipamento': ['Turbina', 'Compressor'], 'local': ['Recife'], 'falha': [False]},
+    {'equipamento': ['Inexistente']},
+    {'equipamento': []},
+])
+def test_filters_match_pandas_isin(frame, filters):
+    index = BitmapIndex(frame)
+    assert index.can_filter(filters)
+
+    pd.testing.assert_frame_equal(index.apply(frame, filters), _expected(frame, filters))
+
+def test_apply_keeps_only_requested_columns(frame):
+    filters = {'local': ['Recife']}
+    result = filter_dataframe(frame, filters, columns=['valor'])
+
+    pd.testing.assert_frame_equal(result, _expected(frame, filters)[['valor']])
+
+def test_high_cardinality_columns_fall_back_to_mask(frame):
+    index = BitmapIndex(frame)
+    assert 'serie' not in index.bitmaps
+    assert sorted(index.values['local']) == ['Natal', 'Recife', 'Salvador']
+
+    filters = {'serie': ['S1', 'S10'], 'equipamento': ['Bomba', 'Turbina']}
+    pd.testing.assert_frame_equal(filter_dataframe(frame, filters), _expected(frame, filters))
+
+def test_without_filters_returns_all_rows(frame):
+    assert filter_dataframe(frame, {}) is frame
+    np.testing.assert_array_equal(BitmapIndex(frame).select_rows({}), np.arange(len(frame)))
\ No newline at end of file
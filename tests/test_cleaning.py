@@ -0,0 +1,105 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from components.cleaning import (
+    plan_missing_values, plan_outliers, plan_conversions, apply_cleaning_plan,
+    save_cleaning_plan, load_cleaning_plan, iter_cleaned_batches, load_cleaned_dataset
+)
+from components.outliers import OUTLIER_COLUMN
+from components.storage import write_dataset, read_dataset
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(13)
+    n = 2000
+    df = pd.DataFrame({
+        'temperatura': rng.normal(25, 4, n),
+        'pressao': rng.exponential(2.0, n),
+        'equipamento': pd.Categorical(rng.choice(['Bomba', 'Turbina', 'Compressor'], n)),
+        'local': rng.choice(['Recife', 'Natal'], n).astype(object)
+    })
+    df.loc[rng.choice(n, 20, replace=False), 'temperatura'] = 80.0
+    df.loc[rng.choice(n, 150, replace=False), 'temperatura'] = np.nan
+    df.loc[rng.choice(n, 100, replace=False), 'pressao'] = np.nan
+    df.loc[rng.choice(n, 50, replace=False), 'equipamento'] = np.nan
+    df.loc[rng.choice(n, 50, replace=False), 'local'] = None
+    return df
+
+def _iqr_bounds(series):
+    q1, q3 = series.quantile([0.25, 0.75])
+    return q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+
+def test_fill_with_mean_and_mode_matches_pandas(frame):
+    columns = ['temperatura', 'pressao', 'equipamento', 'local']
+    result = apply_cleaning_plan(frame, [plan_missing_values(frame, "Preencher com média/moda", columns)])
+
+    expected = frame.fillna({
+        'temperatura': frame['temperatura'].mean(),
+        'pressao': frame['pressao'].mean(),
+        'equipamento': frame['equipamento'].mode()[0],
+        'local': frame['local'].mode()[0]
+    })
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_drop_missing_matches_pandas(frame):
+    result = apply_cleaning_plan(frame, [plan_missing_values(frame, "Remover linhas", ['temperatura', 'local'])])
+    pd.testing.assert_frame_equal(result, frame.dropna(subset=['temperatura', 'local']))
+
+def test_combined_plan_matches_sequential_pandas(frame):
+    plan = [
+        plan_missing_values(frame, "Preencher com zero", ['pressao']),
+        plan_outliers(frame, "Remover", ['temperatura']),
+        plan_conversions(['local'], "Categoria")
+    ]
+    result = apply_cleaning_plan(frame, plan)
+
+    expected = frame.fillna({'pressao': 0})
+    lower, upper = _iqr_bounds(frame['temperatura'])
+    expected = expected[~((expected['temperatura'] < lower) | (expected['temperatura'] > upper))]
+    expected['local'] = expected['local'].astype('category')
+    pd.testing.assert_frame_equal(result, expected)
+    assert len(result) < len(frame)
+
+def test_clip_and_flag_match_pandas(frame):
+    lower, upper = _iqr_bounds(frame['temperatura'])
+
+    clipped = apply_cleaning_plan(frame, [plan_outliers(frame, "Limitar aos limites (capping)", ['temperatura'])])
+    pd.testing.assert_series_equal(clipped['temperatura'], frame['temperatura'].clip(lower, upper))
+
+    flagged = apply_cleaning_plan(frame, [plan_outliers(frame, "Marcar (coluna outlier)", ['temperatura'])])
+    expected = ((frame['temperatura'] < lower) | (frame['temperatura'] > upper)).rename(OUTLIER_COLUMN)
+    pd.testing.assert_series_equal(flagged[OUTLIER_COLUMN], expected)
+    assert OUTLIER_COLUMN not in frame.columns
+
+def test_saved_plan_replays_stored_values(frame):
+    plan = [
+        plan_missing_values(frame, "Preencher com média/moda", ['temperatura', 'equipamento']),
+        plan_outliers(frame, "Remover", ['temperatura', 'pressao'], method='zscore')
+    ]
+    path = write_dataset(frame, "data/sensores.csv")
+    save_cleaning_plan(plan, path, 'ana')
+    loaded = load_cleaning_plan(path, 'ana')
+    assert loaded == json.loads(json.dumps(plan))
+
+    pd.testing.assert_frame_equal(apply_cleaning_plan(frame, loaded), apply_cleaning_plan(frame, plan))
+    # Em outros dados, o plano usa os valores calculados no original (não recalcula a média)
+    other = frame.iloc[:300]
+    missing = other['temperatura'].isna()
+    assert missing.any()
+    replayed = apply_cleaning_plan(other, loaded[:1])
+    np.testing.assert_allclose(replayed.loc[missing, 'temperatura'], frame['temperatura'].mean())
+    assert other['temperatura'].mean() != pytest.approx(frame['temperatura'].mean())
+
+@pytest.mark.parametrize("strategy", ["Remover", "Limitar aos limites (capping)", "Marcar (coluna outlier)"])
+def test_chunked_apply_matches_full_apply(frame, strategy):
+    plan = [
+        plan_missing_values(frame, "Preencher com média/moda", ['pressao', 'local']),
+        plan_outliers(frame, strategy, ['temperatura', 'pressao'], group_by=['equipamento'])
+    ]
+    path = write_dataset(frame, "data/sensores.csv")
+
+    chunked = pd.concat(list(iter_cleaned_batches(path, plan, batch_size=128)), ignore_index=True)
+    full = apply_cleaning_plan(read_dataset(path), plan).reset_index(drop=True)
+    pd.testing.assert_frame_equal(chunked, full, check_categorical=False)
+    pd.testing.assert_frame_equal(load_cleaned_dataset(path, plan).reset_index(drop=True), full)
\ No newline at end of file
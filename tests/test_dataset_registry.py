@@ -0,0 +1,108 @@
+import json
+import os
+import pytest
+from components.cleaning import save_cleaning_plan, load_cleaning_plan
+from components.content_store import get_processed_index
+from components.dataset_registry import DatasetRegistry
+from components.file_processor import process_csv_stream
+from components.job_queue import run_job, JOB_DONE
+from components.storage import read_dataset, dataset_signature
+
+@pytest.fixture
+def registry():
+    return DatasetRegistry(os.path.join("data", "registry.db"))
+
+@pytest.fixture
+def processed(sensor_csv):
+    return process_csv_stream(sensor_csv, "sensores.csv")
+
+def test_datasets_are_shared_with_optional_owner_filter(registry, processed):
+    path, metadata = processed
+    registry.register('ana', 'sensores.csv', path, metadata, 'hash-1')
+    registry.register('ana', 'outro.csv', path, metadata)
+    registry.register('bruno', 'sensores.csv', path, metadata, 'hash-1')
+
+    # Todos os usuários listam todos os datasets; o dono é um filtro opcional
+    assert registry.count() == 3
+    assert {(d['owner'], d['name']) for d in registry.list()} == {
+        ('ana', 'sensores.csv'), ('ana', 'outro.csv'), ('bruno', 'sensores.csv')
+    }
+    assert registry.count('ana') == 2
+    assert registry.count('carla') == 0
+    assert [d['owner'] for d in registry.list('bruno')] == ['bruno']
+    assert sorted(registry.names('ana')) == ['outro.csv', 'sensores.csv']
+    assert registry.count(search='SENSORES') == 2
+    assert registry.count('ana', search='OUTRO') == 1
+    assert registry.get('ana', 'sensores.csv')['rows'] == metadata['rows']
+
+def test_register_again_keeps_creation_date(registry, processed):
+    path, metadata = processed
+    registry.register('ana', 'sensores.csv', path, metadata)
+    created_at = registry.get('ana', 'sensores.csv')['created_at']
+    registry.register('ana', 'sensores.csv', path, dict(metadata, rows=1))
+
+    dataset = registry.get('ana', 'sensores.csv')
+    assert dataset['created_at'] == created_at
+    assert dataset['rows'] == 1
+    assert registry.count('ana') == 1
+
+def _run_append(owner, target, dataset, csv_path):
+    job_path = os.path.join("data", f"append-{owner}.json")
+    with open(job_path, 'w') as f:
+        json.dump({
+            'kind': 'append', 'owner': owner, 'file_name': 'extra.csv', 'input_hash': None,
+            'input_path': csv_path, 'target': target,
+            'target_path': dataset['path'], 'target_metadata': dataset['metadata']
+        }, f)
+    return run_job(job_path)
+
+def test_deduplicated_dataset_is_shared_until_append(registry, processed, sensor_csv):
+    # O mesmo conteúdo reutilizado por dois usuários: os dois registros usam o caminho do resultado
+    result_path, metadata = processed
+    get_processed_index().put('hash-1', result_path, metadata)
+    signature = dataset_signature(result_path)
+    for owner in ('ana', 'bruno'):
+        registry.register(owner, 'sensores.csv', result_path, metadata, 'hash-1')
+    assert registry.get('ana', 'sensores.csv')['path'] == registry.get('bruno', 'sensores.csv')['path'] == result_path
+    assert registry.is_shared('ana', 'sensores.csv')
+
+    # Planos de limpeza são de cada usuário
+    save_cleaning_plan([{'step': 'dropna'}], result_path, 'ana')
+    assert load_cleaning_plan(result_path, 'bruno') is None
+
+    # O acréscimo cria a cópia da Ana; o dataset do Bruno e o resultado indexado não mudam
+    assert _run_append('ana', 'sensores.csv', registry.get('ana', 'sensores.csv'), sensor_csv) == JOB_DONE
+    ana = registry.get('ana', 'sensores.csv')
+    bruno = registry.get('bruno', 'sensores.csv')
+    assert ana['path'] != result_path
+    assert bruno['path'] == result_path
+    assert len(read_dataset(ana['path'])) == 2 * metadata['rows']
+    assert len(read_dataset(bruno['path'])) == metadata['rows']
+    assert dataset_signature(result_path) == signature
+    assert get_processed_index().get('hash-1') is not None
+
+    # Sem outros registros, o próximo acréscimo é feito no próprio caminho
+    assert not registry.is_shared('ana', 'sensores.csv')
+    assert _run_append('ana', 'sensores.csv', ana, sensor_csv) == JOB_DONE
+    assert registry.get('ana', 'sensores.csv')['path'] == ana['path']
+    assert len(read_dataset(ana['path'])) == 3 * metadata['rows']
+
+def test_orphan_datasets_are_imported_once(registry, processed):
+    path, metadata = processed
+
+    assert registry.import_orphans("data", "admin") == 1
+    assert registry.import_orphans("data", "admin") == 0
+    # Os datasets antigos continuam visíveis a todos os usuários
+    assert registry.count() == 1
+    dataset = registry.list()[0]
+    assert dataset['owner'] == 'admin'
+    assert dataset['path'] == path
+    assert dataset['rows'] == metadata['rows']
+    assert set(dataset['metadata']['missing_values']) == set(metadata['column_names'])
+
+def test_registered_datasets_are_not_imported_as_orphans(registry, processed):
+    path, metadata = processed
+    registry.register('ana', 'sensores.csv', path, metadata)
+
+    assert registry.import_orphans("data", "admin") == 0
+    assert registry.count('admin') == 0
\ No newline at end of file
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+from components.downsampling import minmax_downsample, lttb_downsample, downsample_line_data, create_density_scatter
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(3)
+    x = np.arange(20000, dtype=np.float64)
+    y = np.sin(x / 500) + rng.normal(0, 0.1, x.size)
+    # Pico isolado que não pode desaparecer da série reduzida
+    y[12345] = 25.0
+    return x, y
+
+def _lttb_reference(x, y, n_out):
+    """Implementação direta do LTTB (Steinarsson), ponto a ponto."""
+    n = len(x)
+    bucket_size = (n - 2) / (n_out - 2)
+    selected = [0]
+    a = 0
+    for i in range(n_out - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1 if i < n_out - 3 else n - 1
+        next_start = end
+        next_end = int((i + 2) * bucket_size) + 1 if i + 2 < n_out - 2 else n
+        next_end = min(next_end, n)
+        avg_x = np.mean(x[next_start:next_end])
+        avg_y = np.mean(y[next_start:next_end])
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return np.array(selected)
+
+def test_minmax_keeps_extremes_of_every_bucket(series):
+    x, y = series
+    n_out = 400
+    selected = minmax_downsample(x, y, n_out)
+
+    buckets = np.minimum(((x - x[0]) / (x[-1] - x[0]) * (n_out // 2)).astype(np.int64), n_out // 2 - 1)
+    frame = pd.DataFrame({'y': y, 'bucket': buckets})
+    expected = set(frame.groupby('bucket')['y'].idxmin()) | set(frame.groupby('bucket')['y'].idxmax()) | {0, len(x) - 1}
+
+    assert set(selected) == expected
+    assert np.all(np.diff(selected) > 0)
+    assert 12345 in selected
+
+def test_minmax_returns_everything_for_small_series():
+    x = np.arange(10, dtype=np.float64)
+    np.testing.assert_array_equal(minmax_downsample(x, x, 100), np.arange(10))
+
+def test_lttb_matches_reference(series):
+    x, y = series
+    x, y = x[:3000], y[:3000]
+    selected = lttb_downsample(x, y, 150)
+
+    np.testing.assert_array_equal(selected, _lttb_reference(x, y, 150))
+    assert selected[0] == 0 and selected[-1] == len(x) - 1
+
+def test_lttb_keeps_spike(series):
+    x, y = series
+    selected = lttb_downsample(x, y, 500)
+
+    assert len(selected) == 500
+    assert 12345 in selected
+
+def test_line_data_keeps_each_series_extremes(series):
+    x, y = series
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame({
+        'ts': pd.to_datetime('2024-01-01') + pd.to_timedelta(x, unit='s'),
+        'valor': y,
+        'equipamento': rng.choice(['Bomba', 'Turbina', 'Compressor'], x.size)
+    }).sample(frac=1.0, random_state=1)
+
+    reduced = downsample_line_data(df, 'ts', 'valor', 'equipamento', n_points=600)
+
+    assert len(reduced) <= 600 + 3 * 2
+    assert reduced['ts'].is_monotonic_increasing
+    pd.testing.assert_series_equal(reduced.groupby('equipamento')['valor'].max(), df.groupby('equipamento')['valor'].max())
+    pd.testing.assert_series_equal(reduced.groupby('equipamento')['valor'].min(), df.groupby('equipamento')['valor'].min())
+    pd.testing.assert_frame_equal(reduced.groupby('equipamento')['ts'].agg(['min', 'max']), df.groupby('equipamento')['ts'].agg(['min', 'max']))
+
+def test_line_data_ignores_categorical_x():
+    df = pd.DataFrame({'local': ['Recife', 'Natal'] * 10, 'valor': range(20)})
+    assert downsample_line_data(df, 'local', 'valor', n_points=4) is df
+
+def test_density_scatter_counts_every_point_and_shows_outlier():
+    rng = np.random.default_rng(9)
+    df = pd.DataFrame({'x': rng.normal(0, 1, 50000), 'y': rng.normal(0, 1, 50000)})
+    df.loc[len(df)] = {'x': 30.0, 'y': 30.0}
+
+    fig = create_density_scatter(df, 'x', 'y', bins=50)
+
+    heatmap = fig.data[0]
+    assert np.nansum(np.asarray(heatmap.z, dtype=np.float64)) == len(df)
+    expected = pd.crosstab(pd.cut(df['x'], 50, labels=False), pd.cut(df['y'], 50, labels=False))
+    assert int(np.nanmax(np.asarray(heatmap.z, dtype=np.float64))) == expected.to_numpy().max()
+    sparse_x = np.concatenate([np.asarray(trace.x) for trace in fig.data[1:]])
+    assert 30.0 in sparse_x
+    assert len(sparse_x) < len(df)
\ No newline at end of file
@@ -0,0 +1,23 @@
+from components.figure_cache import get_or_create_figure, get_cached_figure
+from components.render_scheduler import DeferredMessages
+
+def test_cached_figure_keeps_preparation_messages():
+    config = {'type': 'Pizza', 'x_col': 'local', 'y_col': 'pressao'}
+    feedback = DeferredMessages()
+    feedback.warning("Muitos valores únicos.")
+
+    def builder():
+        feedback.info("Série reduzida.")
+        return "figura"
+
+    assert get_or_create_figure(config, "dados-v1", builder, messages=feedback.messages) == "figura"
+
+    fig, messages = get_cached_figure(config, "dados-v1")
+    assert fig == "figura"
+    assert list(messages) == [('warning', "Muitos valores únicos."), ('info', "Série reduzida.")]
+    assert get_cached_figure(config, "dados-v2") is None
+
+def test_failed_figure_is_not_cached():
+    config = {'type': 'Barra', 'x_col': 'local'}
+    assert get_or_create_figure(config, "dados-v1", lambda: None, messages=[('error', "Falhou.")]) is None
+    assert get_cached_figure(config, "dados-v1") is None
\ No newline at end of file
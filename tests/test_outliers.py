@@ -0,0 +1,104 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from components.cleaning import plan_outliers
+from components.outliers import fit_bounds, fit_robust_covariance, outlier_flags, outlier_mask, clip_to_bounds
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(17)
+    n = 3000
+    equipamento = rng.choice(['Bomba', 'Turbina'], n)
+    linha = rng.choice([1, 2, 3], n)
+    # Cada equipamento tem outra escala: um limite global não serve para os dois
+    base = np.where(equipamento == 'Bomba', 20.0, 90.0)
+    df = pd.DataFrame({
+        'equipamento': pd.Categorical(equipamento),
+        'linha': linha,
+        'temperatura': base + rng.normal(0, 2, n),
+        'vibracao': rng.gamma(2.0, 1.5, n)
+    })
+    df.loc[rng.choice(n, 100, replace=False), 'temperatura'] = np.nan
+    df.loc[rng.choice(n, 40, replace=False), 'equipamento'] = np.nan
+    return df
+
+@pytest.mark.parametrize("method", ['iqr', 'zscore'])
+def test_global_bounds_match_pandas(frame, method):
+    columns = ['temperatura', 'vibracao']
+    bounds = fit_bounds(frame, columns, method)
+
+    for col in columns:
+        if method == 'iqr':
+            q1, q3 = frame[col].quantile([0.25, 0.75])
+            expected = [q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)]
+        else:
+            expected = [frame[col].mean() - 3 * frame[col].std(), frame[col].mean() + 3 * frame[col].std()]
+        assert bounds[col] == pytest.approx(expected)
+
+@pytest.mark.parametrize("method", ['iqr', 'zscore'])
+def test_grouped_flags_match_pandas(frame, method):
+    columns = ['temperatura', 'vibracao']
+    group_by = ['equipamento', 'linha']
+    step = plan_outliers(frame, "Marcar (coluna outlier)", columns, method=method, group_by=group_by)
+    # O plano é gravado em JSON: as chaves dos grupos devem sobreviver à ida e volta
+    step = json.loads(json.dumps(step))
+
+    grouped = frame.groupby(group_by, observed=True)[columns]
+    if method == 'iqr':
+        q1, q3 = grouped.transform(lambda s: s.quantile(0.25)), grouped.transform(lambda s: s.quantile(0.75))
+        lower, upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    else:
+        mean, std = grouped.transform('mean'), grouped.transform('std')
+        lower, upper = mean - 3 * std, mean + 3 * std
+    expected = ((frame[columns] < lower) | (frame[columns] > upper)).to_numpy()
+
+    np.testing.assert_array_equal(outlier_flags(frame, step), expected)
+    np.testing.assert_array_equal(outlier_mask(frame, step), expected.any(axis=1))
+
+def test_grouped_bounds_catch_what_global_bounds_miss(frame):
+    # 40 °C é normal para nenhum dos equipamentos, mas fica dentro dos limites globais
+    frame.loc[0, ['equipamento', 'temperatura']] = ['Bomba', 40.0]
+    global_step = plan_outliers(frame, "Remover", ['temperatura'])
+    grouped_step = plan_outliers(frame, "Remover", ['temperatura'], group_by=['equipamento'])
+
+    assert not outlier_mask(frame.iloc[:1], global_step)[0]
+    assert outlier_mask(frame.iloc[:1], grouped_step)[0]
+
+def test_clip_by_group_matches_pandas_and_skips_unknown_groups(frame):
+    step = plan_outliers(frame, "Limitar aos limites (capping)", ['temperatura'], group_by=['equipamento'])
+    # Grupo sem limites calculados (ex.: dados acrescentados depois do plano)
+    novo = pd.DataFrame({'equipamento': ['Valvula', 'Bomba'], 'temperatura': [500.0, 500.0]})
+
+    clipped = clip_to_bounds(novo, step)
+    bomba = frame.loc[frame['equipamento'] == 'Bomba', 'temperatura']
+    q1, q3 = bomba.quantile([0.25, 0.75])
+    assert clipped['temperatura'].tolist() == pytest.approx([500.0, q3 + 1.5 * (q3 - q1)])
+    assert not outlier_mask(novo.iloc[:1], step)[0]
+
+def test_robust_covariance_finds_multivariate_outliers():
+    rng = np.random.default_rng(23)
+    cov = np.array([[4.0, 3.0], [3.0, 4.0]])
+    inliers = rng.multivariate_normal([10.0, 50.0], cov, 4000)
+    # Dentro da faixa de cada coluna, mas contra a correlação: só o modo multivariado detecta
+    # (distância ao quadrado 2·t² contra o quantil 97,5% da qui-quadrado com 2 graus, ~7,4)
+    t = np.concatenate([np.linspace(-3.5, -2.5, 10), np.linspace(2.5, 3.5, 10)])
+    outliers = np.column_stack([10.0 + t, 50.0 - t])
+    df = pd.DataFrame(np.vstack([inliers, outliers]), columns=['a', 'b'])
+    df.loc[len(df)] = [np.nan, 500.0]
+
+    fit = fit_robust_covariance(df, ['a', 'b'])
+    step = {'method': 'robust_covariance', 'columns': ['a', 'b'], **fit}
+    mask = outlier_mask(df, step)
+
+    assert mask[len(inliers):len(inliers) + len(outliers)].all()
+    assert mask[:len(inliers)].mean() < 0.05
+    assert not mask[-1]
+    # Centro e covariância próximos dos calculados pelo pandas só com as linhas normais
+    clean = pd.DataFrame(inliers, columns=['a', 'b'])
+    np.testing.assert_allclose(fit['location'], clean.mean().to_numpy(), atol=0.2)
+    np.testing.assert_allclose(np.linalg.inv(fit['precision']), clean.cov().to_numpy(), rtol=0.2, atol=0.3)
+
+def test_robust_covariance_cannot_clip(frame):
+    with pytest.raises(ValueError):
+        plan_outliers(frame, "Limitar aos limites (capping)", ['temperatura', 'vibracao'], method='robust_covariance')
\ No newline at end of file
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from components.file_processor import process_csv_stream
+from components.query_engine import ArrowQueryBackend, ChartQuery
+
+@pytest.fixture
+def dataset(tmp_path):
+    rng = np.random.default_rng(21)
+    n = 5000
+    df = pd.DataFrame({
+        'temperatura': rng.normal(25, 4, n).round(3),
+        'pressao': rng.exponential(2.0, n).round(3),
+        'equipamento': rng.choice(['Bomba', 'Turbina', 'Compressor', 'Valvula'], n),
+        'local': rng.choice(['Recife', 'Natal', 'Salvador'], n)
+    })
+    df.loc[rng.choice(n, 300, replace=False), 'temperatura'] = np.nan
+    df.loc[rng.choice(n, 100, replace=False), 'equipamento'] = np.nan
+    # Grupo sem nenhum valor numérico (soma zero, média e extremos nulos)
+    df.loc[df['equipamento'] == 'Valvula', 'temperatura'] = np.nan
+    csv_path = tmp_path / "sensores.csv"
+    df.to_csv(csv_path, index=False)
+    # Blocos pequenos: várias partições e lotes combinados pelo backend
+    path, _ = process_csv_stream(str(csv_path), "sensores.csv", chunksize=700)
+    return path, pd.read_csv(csv_path)
+
+@pytest.fixture
+def backend():
+    backend = ArrowQueryBackend()
+    backend._COMBINE_ROWS = 10
+    return backend
+
+@pytest.mark.parametrize("function", ['sum', 'mean', 'count', 'min', 'max'])
+@pytest.mark.parametrize("filters", [None, {'local': ['Recife', 'Natal']}])
+def test_grouping_matches_pandas(dataset, backend, function, filters):
+    path, df = dataset
+    query = ChartQuery.for_aggregation({'group_by': 'equipamento', 'column': 'temperatura', 'function': function}, filters)
+    result = backend.execute(path, query)
+
+    if filters:
+        df = df[df['local'].isin(filters['local'])]
+    expected = df.groupby('equipamento')['temperatura'].agg(function).reset_index()
+    result['equipamento'] = result['equipamento'].astype(str)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, rtol=1e-9)
+
+def test_empty_filter_selects_nothing(dataset, backend):
+    path, _ = dataset
+    query = ChartQuery.for_aggregation({'group_by': 'equipamento', 'column': 'temperatura', 'function': 'mean'}, {'local': []})
+
+    result = backend.execute(path, query)
+    assert result.empty
+    assert list(result.columns) == ['equipamento', 'temperatura']
+
+def test_chart_query_drops_nulls_and_filters(dataset, backend):
+    path, df = dataset
+    query = ChartQuery.for_chart('temperatura', 'pressao', 'equipamento', filters={'local': ['Salvador']})
+    result = backend.execute(path, query)
+
+    expected = df[df['local'] == 'Salvador'].dropna(subset=['temperatura', 'pressao', 'equipamento'])
+    expected = expected[['temperatura', 'pressao', 'equipamento']].reset_index(drop=True)
+    result['equipamento'] = result['equipamento'].astype(str)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+def test_sample_is_repeatable_subset_in_original_order(dataset, backend):
+    path, df = dataset
+    query = ChartQuery.for_chart('temperatura', 'pressao', sample_size=400)
+    first = backend.execute(path, query)
+    second = backend.execute(path, query)
+
+    assert len(first) == 400
+    pd.testing.assert_frame_equal(first, second)
+    # Cada linha da amostra existe nos dados filtrados, na mesma ordem relativa
+    rows = df.dropna(subset=['temperatura', 'pressao'])[['temperatura', 'pressao']].reset_index(drop=True)
+    positions = [
+        rows.index[(rows['temperatura'] == t) & (rows['pressao'] == p)][0]
+        for t, p in first.itertuples(index=False)
+    ]
+    assert positions == sorted(positions)
+
+def test_sample_larger_than_data_returns_everything(dataset, backend):
+    path, df = dataset
+    query = ChartQuery.for_chart('temperatura', 'pressao', sample_size=len(df) * 2)
+
+    result = backend.execute(path, query)
+    assert len(result) == len(df.dropna(subset=['temperatura', 'pressao']))
+
+def test_unsupported_function_is_rejected():
+    with pytest.raises(ValueError):
+        ChartQuery.for_aggregation({'group_by': 'equipamento', 'column': 'temperatura', 'function': 'median'})
\ No newline at end of file
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+from components.file_processor import process_csv_stream
+from components.rollup import query_rollup
+
+def _expected(df, group_by, column, function, filters=None):
+    for col, values in (filters or {}).items():
+        df = df[df[col].isin(values)]
+    return df.groupby(group_by)[column].agg(function).reset_index()
+
+def _normalize(df, group_by):
+    df = df.copy()
+    for col in group_by:
+        df[col] = df[col].astype(str)
+    return df.sort_values(group_by, ignore_index=True)
+
+@pytest.fixture
+def dataset(sensor_csv):
+    path, _ = process_csv_stream(sensor_csv, "sensores.csv")
+    return path, pd.read_csv(sensor_csv)
+
+@pytest.mark.parametrize("function", ['sum', 'mean', 'count', 'min', 'max'])
+def test_query_rollup_matches_pandas(dataset, function):
+    path, df = dataset
+    result = query_rollup(path, ['equipamento'], 'temperatura', function)
+
+    expected = _expected(df, ['equipamento'], 'temperatura', function)
+    pd.testing.assert_frame_equal(_normalize(result, ['equipamento']), expected, check_dtype=False)
+
+def test_query_rollup_with_filters_and_two_dimensions(dataset):
+    path, df = dataset
+    filters = {'local': ['Recife']}
+    result = query_rollup(path, ['equipamento', 'local'], 'pressao', 'mean', filters)
+
+    expected = _expected(df, ['equipamento', 'local'], 'pressao', 'mean', filters)
+    pd.testing.assert_frame_equal(_normalize(result, ['equipamento', 'local']), expected, check_dtype=False)
+
+def test_query_rollup_rejects_measure_used_as_dimension(dataset):
+    path, _ = dataset
+    assert query_rollup(path, ['equipamento'], 'equipamento', 'sum') is None
+
+def test_heatmap_without_color_column_shows_guidance(dataset):
+    # O heatmap sem coluna de cor não consulta os cubos: o usuário recebe a orientação, sem exceção
+    from streamlit.testing.v1 import AppTest
+    from components.dataset_registry import get_dataset_registry
+
+    path, df = dataset
+    get_dataset_registry().register('ana', 'sensores.csv', path, {'rows': len(df), 'columns': 4, 'missing_values': {}})
+
+    def script():
+        from pages.dashboard_page import dashboard_page
+        dashboard_page()
+
+    at = AppTest.from_function(script, default_timeout=60)
+    at.session_state['logged_in'] = True
+    at.session_state['user_info'] = {'name': 'Ana', 'role': 'user'}
+    at.session_state['username'] = 'ana'
+    at.session_state['charts'] = [{
+        'id': 'heat0001', 'visible': True, 'order': 0,
+        'config': {'type': 'Barra', 'title': 'g1', 'theme': 'plotly', 'height': 500,
+                   'x_col': 'equipamento', 'y_col': 'temperatura'}
+    }]
+    at.run()
+    # Com a cor "nenhuma" no gráfico de barras, a troca para heatmap mantém a coluna de cor vazia
+    at.selectbox(key='chart_type_heat0001').set_value('Heatmap').run()
+
+    assert at.selectbox(key='color_col_heat0001').value is None
+    assert not at.exception
+    assert "Para criar um heatmap, selecione uma coluna para colorir." in [e.value for e in at.error]
\ No newline at end of file
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from components.statistics import TDigest, NumericStats, iqr_bounds, save_numeric_stats, load_numeric_stats
+from components.storage import write_dataset
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        'temperatura': rng.normal(25, 4, 3000),
+        'pressao': rng.exponential(2.0, 3000),
+        'contagem': rng.integers(0, 50, 3000)
+    })
+    df.loc[rng.choice(3000, 200, replace=False), 'temperatura'] = np.nan
+    return df
+
+def _assert_matches_pandas(stats, df):
+    metadata = stats.to_metadata()
+    for col in df.columns:
+        assert metadata[col]['min'] == pytest.approx(df[col].min())
+        assert metadata[col]['max'] == pytest.approx(df[col].max())
+        assert metadata[col]['mean'] == pytest.approx(df[col].mean())
+        assert metadata[col]['std'] == pytest.approx(df[col].std())
+        assert metadata[col]['median'] == pytest.approx(df[col].median())
+
+def test_chunked_stats_match_pandas(frame):
+    stats = NumericStats()
+    for start in range(0, len(frame), 700):
+        stats.update(frame.iloc[start:start + 700])
+
+    _assert_matches_pandas(stats, frame)
+
+def test_merged_partitions_match_pandas(frame):
+    # Partições com colunas diferentes (ex.: coluna nova num acréscimo)
+    first = NumericStats.from_frame(frame.iloc[:1000][['temperatura', 'pressao']])
+    second = NumericStats.from_frame(frame.iloc[1000:])
+    merged = first.merge(second)
+
+    expected = frame.assign(contagem=frame['contagem'].where(frame.index >= 1000))
+    _assert_matches_pandas(merged, expected)
+
+def test_state_round_trip_continues_accumulating(frame):
+    path = write_dataset(frame.iloc[:1500], "data/sensores.csv")
+    save_numeric_stats(NumericStats.from_frame(frame.iloc[:1500]), path)
+
+    stats = load_numeric_stats(path).update(frame.iloc[1500:])
+    _assert_matches_pandas(stats, frame)
+
+def test_columns_without_values_have_no_stats():
+    stats = NumericStats.from_frame(pd.DataFrame({'vazia': [np.nan, np.nan], 'x': [1.0, 2.0]}))
+    metadata = stats.to_metadata(['vazia', 'x', 'ausente'])
+
+    assert metadata['vazia']['mean'] is None
+    assert metadata['ausente']['median'] is None
+    assert metadata['x']['std'] == pytest.approx(np.std([1.0, 2.0], ddof=1))
+
+@pytest.mark.parametrize("q", [0.0, 0.01, 0.25, 0.5, 0.75, 0.99, 1.0])
+def test_small_digest_quantiles_are_exact(frame, q):
+    values = frame['pressao']
+    digest = TDigest().update(values.iloc[:1000]).merge(TDigest().update(values.iloc[1000:]))
+
+    assert digest.quantile(q) == pytest.approx(values.quantile(q))
+
+def test_compressed_digest_quantiles_are_close():
+    # Acima do limite de valores exatos: centroides comprimidos, erro pequeno de posição (rank)
+    rng = np.random.default_rng(11)
+    values = rng.lognormal(0, 1, 200000)
+    digest = TDigest()
+    for part in np.array_split(values, 8):
+        digest.merge(TDigest().update(part))
+    assert digest.means.size < values.size
+
+    qs = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+    sorted_values = np.sort(values)
+    ranks = np.searchsorted(sorted_values, digest.quantile(qs)) / values.size
+    np.testing.assert_allclose(ranks, qs, atol=0.005)
+    assert digest.quantile(0.0) == values.min()
+    assert digest.quantile(1.0) == values.max()
+
+def test_empty_digest_returns_nan():
+    assert np.isnan(TDigest().update([np.nan]).quantile(0.5))
+
+def test_iqr_bounds_match_pandas(frame):
+    q1, q3 = frame['pressao'].quantile([0.25, 0.75])
+    lower, upper = iqr_bounds(frame['pressao'])
+
+    assert lower == pytest.approx(q1 - 1.5 * (q3 - q1))
+    assert upper == pytest.approx(q3 + 1.5 * (q3 - q1))
\ No newline at end of file
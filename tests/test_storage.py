@@ -0,0 +1,53 @@
+import io
+import numpy as np
+import pandas as pd
+from components.file_processor import process_csv_stream, append_csv_stream
+from components.storage import ChunkedDatasetWriter, write_dataset, read_dataset, read_dataset_schema
+
+def test_write_and_read_dataset_round_trip():
+    df = pd.DataFrame({
+        'valor': [1.5, 2.25, None],
+        'quantidade': [1, 2, 3],
+        'categoria': pd.Categorical(["a", "b", "a"]),
+        'data': pd.to_datetime(["2024-01-01", "2024-01-02", "2024-01-03"])
+    })
+    path = write_dataset(df, "data/exemplo.csv")
+
+    assert path.endswith(".parquet")
+    pd.testing.assert_frame_equal(read_dataset(path), df)
+    pd.testing.assert_frame_equal(read_dataset(path, columns=['quantidade']), df[['quantidade']])
+
+def test_chunked_writer_promotes_float32_when_later_chunk_needs_precision():
+    writer = ChunkedDatasetWriter("data/blocos.parquet")
+    writer.write_chunk(pd.DataFrame({'x': np.array([0.5, 1.5], dtype='float32')}))
+    writer.write_chunk(pd.DataFrame({'x': [0.1, 123456.789]}))
+    path = writer.close()
+
+    result = read_dataset(path)
+    assert result['x'].dtype == np.float64
+    assert result['x'].tolist() == [0.5, 1.5, 0.1, 123456.789]
+
+def test_process_csv_stream_keeps_values_across_chunks(sensor_csv):
+    # O último bloco tem um valor que não cabe em float32 sem perda
+    with open(sensor_csv, 'a') as f:
+        f.write("0.1,5,Bomba,Recife\n")
+    path, metadata = process_csv_stream(sensor_csv, "sensores.csv", chunksize=16)
+
+    expected = pd.read_csv(sensor_csv)
+    result = read_dataset(path)
+    assert metadata['rows'] == len(expected)
+    np.testing.assert_array_equal(result['temperatura'].to_numpy(), expected['temperatura'].to_numpy())
+    assert result['equipamento'].astype(str).tolist() == expected['equipamento'].tolist()
+
+def test_append_csv_stream_promotes_schema(sensor_csv):
+    path, metadata = process_csv_stream(sensor_csv, "sensores.csv", chunksize=16)
+    extra = io.StringIO("temperatura,pressao,equipamento,local\n0.1,2.5,Bomba,Recife\n")
+
+    path, metadata = append_csv_stream(extra, path, metadata, chunksize=16)
+
+    result = read_dataset(path)
+    assert metadata['rows'] == 61
+    assert metadata['partitions'] == 2
+    assert result['temperatura'].iloc[-1] == 0.1
+    assert result['pressao'].iloc[-1] == 2.5
+    assert str(read_dataset_schema(path).field('temperatura').type) == 'double'
\ No newline at end of file
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from components.timeseries import resample_time_series, apply_window, build_time_series, get_resample_cache
+
+@pytest.fixture
+def gapped():
+    # Três dias com dados e um dia sem leituras (02/01); o grupo "b" só tem o dia 03/01
+    return pd.DataFrame({
+        'ts': pd.to_datetime(['2024-01-01 08:00', '2024-01-01 20:00', '2024-01-03 10:00', '2024-01-04 09:00', '2024-01-03 12:00']),
+        'v': [1.0, 3.0, 5.0, 7.0, 11.0],
+        'eq': ['a', 'a', 'a', 'a', 'b']
+    })
+
+@pytest.mark.parametrize("function", ['mean', 'sum', 'count', 'max'])
+def test_grouped_resample_keeps_empty_buckets(gapped, function):
+    ungrouped = resample_time_series(gapped, 'ts', 'v', 'D', function)
+    grouped = resample_time_series(gapped, 'ts', 'v', 'D', function, group_col='eq')
+
+    assert len(ungrouped) == 4
+    assert len(grouped) == 2 * len(ungrouped)
+    for group, rows in gapped.groupby('eq'):
+        expected = rows.set_index('ts')['v'].resample('D').agg(function)
+        expected = expected.reindex(ungrouped['ts'], fill_value=0 if function in ('sum', 'count') else None)
+        result = grouped[grouped['eq'] == group].set_index('ts')['v']
+        pd.testing.assert_series_equal(result, expected, check_dtype=False, check_names=False, check_freq=False)
+@pytest.fixture
+def readings():
+    # Leituras irregulares de três equipamentos, fora de ordem, com valores e datas ausentes
+    rng = np.random.default_rng(29)
+    n = 5000
+    ts = pd.Timestamp('2024-01-01') + pd.to_timedelta(np.sort(rng.uniform(0, 40 * 86400, n)), unit='s')
+    df = pd.DataFrame({'ts': ts, 'v': rng.normal(10, 3, n), 'eq': rng.choice(['a', 'b', 'c'], n)})
+    df.loc[rng.choice(n, 200, replace=False), 'v'] = np.nan
+    df = df.sample(frac=1.0, random_state=2, ignore_index=True)
+    df['ts_texto'] = df['ts'].dt.strftime('%d/%m/%Y %H:%M:%S')
+    df.loc[[5, 50], 'ts_texto'] = None
+    return df
+
+@pytest.mark.parametrize("rule", ['h', 'D', 'W', 'MS'])
+@pytest.mark.parametrize("function", ['mean', 'sum', 'min', 'max', 'count'])
+def test_resample_matches_pandas(readings, rule, function):
+    result = resample_time_series(readings, 'ts', 'v', rule, function)
+
+    expected = readings.set_index('ts').sort_index()['v'].resample(rule).agg(function).reset_index()
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+def test_resample_parses_text_dates_and_skips_missing(readings):
+    result = resample_time_series(readings, 'ts_texto', 'v', 'D', 'sum', date_format='%d/%m/%Y %H:%M:%S')
+
+    valid = readings[readings['ts_texto'].notna()]
+    expected = valid.set_index('ts').sort_index()['v'].resample('D').sum()
+    np.testing.assert_allclose(result['v'].to_numpy(), expected.to_numpy())
+    assert result['ts_texto'].tolist() == expected.index.tolist()
+
+@pytest.mark.parametrize("window", ['rolling_mean', 'rolling_std', 'ewm'])
+def test_windows_match_pandas_per_group(readings, window):
+    resampled = resample_time_series(readings, 'ts', 'v', 'D', 'mean', group_col='eq')
+    result = apply_window(resampled, 'v', window, window_size=5, group_col='eq')
+
+    for group, rows in resampled.groupby('eq'):
+        values = rows['v']
+        if window == 'ewm':
+            expected = values.ewm(span=5, ignore_na=True).mean()
+        elif window == 'rolling_std':
+            expected = values.rolling(5, min_periods=1).std()
+        else:
+            expected = values.rolling(5, min_periods=1).mean()
+        pd.testing.assert_series_equal(result.loc[rows.index, 'v'], expected)
+    # A série agrupada (em cache) não é alterada
+    assert not resampled['v'].equals(result['v'])
+
+def test_cached_series_is_reused_per_data_version(readings):
+    first = build_time_series(readings, 'ts', 'v', 'D', cache_key='dados-v1')
+    assert resample_time_series(readings.iloc[:10], 'ts', 'v', 'D', cache_key='dados-v1') is first
+    assert resample_time_series(readings.iloc[:10], 'ts', 'v', 'D', cache_key='dados-v2') is not first
+    assert get_resample_cache().get(('dados-v1', 'ts', 'v', None, 'D', 'mean', None)) is first
+
+    windowed = build_time_series(readings, 'ts', 'v', 'D', window='rolling_mean', window_size=3, cache_key='dados-v1')
+    pd.testing.assert_series_equal(windowed['v'], first['v'].rolling(3, min_periods=1).mean())
\ No newline at end of file